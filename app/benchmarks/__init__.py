@@ -0,0 +1,4 @@
+from .backends import BACKENDS, Backend, MemoryRedis
+from .runner import benchmark, compare, run
+
+__all__ = ["BACKENDS", "Backend", "MemoryRedis", "benchmark", "compare", "run"]
@@ -0,0 +1,93 @@
+"""
+ベンチマーク
+使用例:
+python -m benchmarks                                   # インメモリの代替で実行
+python -m benchmarks --backend live --filter redis     # 設定されたPostgres・Redisで実行
+python -m benchmarks --save-baseline baseline.json
+python -m benchmarks --baseline baseline.json --threshold 0.2   # 退行があれば終了コード1
+"""
+
+import argparse
+import logging
+import sys
+
+import benchmarks.suites  # noqa: F401  ベンチマークの登録
+from benchmarks import runner
+from benchmarks.backends import BACKENDS
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="memory")
+    parser.add_argument("--filter", help="run only benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, help="override the number of rounds")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--save-baseline", help="write the results as a new baseline")
+    parser.add_argument("--baseline", help="compare the medians against this baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown treated as a regression (default: 0.1 = 10%%)",
+    )
+    return parser.parse_args(argv)
+
+
+def _print_result(name: str, result: dict) -> None:
+    print(
+        f"{name:<52} {result['median'] * 1000:>10.3f} ms "
+        f"(min {result['min'] * 1000:.3f}, ±{result['stdev'] * 1000:.3f}) "
+        f"{result['ops_per_sec']:>10.1f} ops/s"
+    )
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(
+        level=logging.WARNING, format="[%(asctime)s][%(levelname)s] %(message)s"
+    )
+    args = _parse_args(argv)
+
+    backend = BACKENDS[args.backend]()
+    try:
+        results = runner.run(
+            backend,
+            name_filter=args.filter,
+            rounds=args.rounds,
+            progress=_print_result,
+        )
+    finally:
+        backend.close()
+
+    if args.save_baseline:
+        runner.save(args.save_baseline, results)
+
+    regressions = []
+    if args.baseline:
+        baseline = runner.load(args.baseline)
+        recorded_with = baseline.get("meta", {}).get("backend")
+        if recorded_with != args.backend:
+            print(
+                f"warning: baseline was recorded with backend {recorded_with!r}",
+                file=sys.stderr,
+            )
+        rows = runner.compare(results, baseline, args.threshold)
+        print()
+        for row in rows:
+            ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+            print(f"{row['name']:<52} {ratio:>8}  {row['status']}")
+        results["comparison"] = rows
+        regressions = [row["name"] for row in rows if row["status"] == "regression"]
+
+    if args.output:
+        runner.save(args.output, results)
+    if regressions:
+        print(
+            f"{len(regressions)} regression(s): {', '.join(regressions)}",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import fnmatch
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import redis
+from sqlalchemy import Column, MetaData, create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import DefaultClause
+
+from core import get_settings
+from db.models import Base
+
+# ベンチマークが作るRedisキーの名前空間
+KEY_PREFIX = "bench:"
+
+
+class MemoryRedis:
+    """
+    ベンチマーク用のプロセス内Redis代替（RedisCrud・SessionCrudが使うコマンドのみ）
+    """
+
+    def __init__(self):
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+
+    @staticmethod
+    def _key(key) -> bytes:
+        return key if isinstance(key, bytes) else str(key).encode("utf-8")
+
+    def _alive(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key):
+        return self._alive(self._key(key))
+
+    def set(self, key, value, ex: Optional[int] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        expires_at = time.monotonic() + ex if ex is not None else None
+        self._data[self._key(key)] = (value, expires_at)
+        return True
+
+    def delete(self, *keys) -> int:
+        return sum(self._data.pop(self._key(key), None) is not None for key in keys)
+
+    unlink = delete
+
+    def expire(self, key, ttl: int, xx: bool = False) -> bool:
+        key = self._key(key)
+        value = self._alive(key)
+        if value is None or (xx and self._data[key][1] is None):
+            return False
+        self._data[key] = (value, time.monotonic() + ttl)
+        return True
+
+    def memory_usage(self, key) -> Optional[int]:
+        value = self._alive(self._key(key))
+        return None if value is None else len(value) + len(self._key(key))
+
+    def scan_iter(
+        self, match: Optional[str] = None, count: int = 10
+    ) -> Iterator[bytes]:
+        for key in list(self._data):
+            if match is None or fnmatch.fnmatchcase(key.decode("utf-8"), match):
+                if self._alive(key) is not None:
+                    yield key
+
+    def pipeline(self, transaction: bool = True) -> "_MemoryPipeline":
+        return _MemoryPipeline(self)
+
+    def close(self):
+        pass
+
+
+class _MemoryPipeline:
+    def __init__(self, client: MemoryRedis):
+        self._client = client
+        self._calls: List[Callable[[], Any]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._calls = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append(lambda: method(*args, **kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> List[Any]:
+        results = [call() for call in self._calls]
+        self._calls = []
+        return results
+
+
+@dataclass
+class Backend:
+    """
+    ベンチマークの実行先
+    """
+
+    name: str
+    engine: Engine
+    session_factory: sessionmaker
+    redis: Any
+
+    def session(self) -> Session:
+        return self.session_factory()
+
+    def close(self) -> None:
+        for key in list(self.redis.scan_iter(match=f"{KEY_PREFIX}*")):
+            self.redis.delete(key)
+        self.redis.close()
+        self.engine.dispose()
+
+
+def _sqlite_now():
+    return datetime.now(timezone.utc).isoformat(" ")
+
+
+def _sqlite_metadata() -> MetaData:
+    """
+    モデルのテーブル定義をSQLiteで作成できる形に変換する
+    - now() の既定値をCURRENT_TIMESTAMPに置き換える
+    - GIN・式インデックスなどPostgres専用のインデックスを除く
+    """
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        copy = table.to_metadata(metadata)
+        for column in copy.columns:
+            default = column.server_default
+            if default is not None and "now()" in str(getattr(default, "arg", "")):
+                column.server_default = DefaultClause(text("CURRENT_TIMESTAMP"))
+        copy.indexes = {
+            index
+            for index in copy.indexes
+            if all(isinstance(e, Column) for e in index.expressions)
+            and not index.dialect_options["postgresql"].get("using")
+        }
+    return metadata
+
+
+def memory_backend() -> Backend:
+    """
+    SQLite（インメモリ）とプロセス内Redis代替
+    ネットワークを挟まないため、ORM・シリアライズ処理自体の変化を検出するのに向く
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _register_functions(dbapi_connection, connection_record):
+        # ORMのonupdate=now()をSQLiteで実行できるようにする
+        dbapi_connection.create_function("now", 0, _sqlite_now)
+
+    _sqlite_metadata().create_all(engine)
+    return Backend(
+        name="memory",
+        engine=engine,
+        session_factory=sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        redis=MemoryRedis(),
+    )
+
+
+def live_backend() -> Backend:
+    """
+    設定されたPostgres・Redis（使い捨ての環境で実行すること）
+    """
+    settings = get_settings()
+    engine = create_engine(settings.DATABASE_URI)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.create_all(engine)
+    return Backend(
+        name="live",
+        engine=engine,
+        session_factory=sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        redis=redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0),
+    )
+
+
+BACKENDS = {"memory": memory_backend, "live": live_backend}
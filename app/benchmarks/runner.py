@@ -0,0 +1,190 @@
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Sequence
+
+from benchmarks.backends import Backend
+
+# 1回の計測で呼び出すcallableを返すコンテキストマネージャ（後処理はyieldの後に書く）
+CaseFactory = Callable[..., ContextManager[Callable[[], Any]]]
+
+
+@dataclass
+class Benchmark:
+    group: str
+    name: str
+    factory: CaseFactory
+    params: Dict[str, Sequence[Any]] = field(default_factory=dict)
+    number: int = 100
+    rounds: int = 5
+
+    def cases(self):
+        keys = list(self.params)
+        for values in itertools.product(*(self.params[key] for key in keys)):
+            yield dict(zip(keys, values))
+
+
+_registry: List[Benchmark] = []
+
+
+def benchmark(
+    group: str,
+    *,
+    params: Optional[Dict[str, Sequence[Any]]] = None,
+    number: int = 100,
+    rounds: int = 5,
+):
+    """
+    ベンチマークを登録するデコレーター
+    関数は (backend, **params) を受け取り、計測対象のcallableをyieldするジェネレーター
+    使用例:
+    @benchmark("redis", params={"size": [100, 10000]})
+    def get(backend, size):
+        ...準備...
+        yield lambda: crud.get("key")
+        ...後処理...
+    """
+
+    def decorator(func):
+        _registry.append(
+            Benchmark(
+                group=group,
+                name=func.__name__,
+                factory=contextmanager(func),
+                params=params or {},
+                number=number,
+                rounds=rounds,
+            )
+        )
+        return func
+
+    return decorator
+
+
+def _case_name(bench: Benchmark, case: Dict[str, Any]) -> str:
+    name = f"{bench.group}.{bench.name}"
+    if case:
+        name += "[" + ",".join(f"{key}={value}" for key, value in case.items()) + "]"
+    return name
+
+
+def _summarize(per_op: List[float], number: int, rounds: int) -> Dict[str, float]:
+    median = statistics.median(per_op)
+    return {
+        "number": number,
+        "rounds": rounds,
+        "min": min(per_op),
+        "median": median,
+        "mean": statistics.fmean(per_op),
+        "stdev": statistics.stdev(per_op) if len(per_op) > 1 else 0.0,
+        "ops_per_sec": 1 / median if median else 0.0,
+    }
+
+
+def run(
+    backend: Backend,
+    *,
+    name_filter: Optional[str] = None,
+    rounds: Optional[int] = None,
+    progress: Optional[Callable[[str, Dict[str, float]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    登録済みのベンチマークを実行し、JSONに書き出せる結果を返す
+    各ケースは1回のウォームアップの後、number回呼び出しをrounds回計測する（値は1回あたりの秒数）
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    for bench in _registry:
+        for case in bench.cases():
+            name = _case_name(bench, case)
+            if name_filter and name_filter not in name:
+                continue
+            bench_rounds = rounds or bench.rounds
+            with bench.factory(backend, **case) as target:
+                target()
+                per_op = []
+                for _ in range(bench_rounds):
+                    started_at = time.perf_counter()
+                    for _ in range(bench.number):
+                        target()
+                    per_op.append((time.perf_counter() - started_at) / bench.number)
+            results[name] = _summarize(per_op, bench.number, bench_rounds)
+            if progress is not None:
+                progress(name, results[name])
+    return {"meta": _meta(backend), "results": results}
+
+
+def _version(package: str) -> Optional[str]:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _meta(backend: Backend) -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "backend": backend.name,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": revision or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": {
+            package: _version(package)
+            for package in (
+                "py-cord",
+                "sqlalchemy",
+                "pydantic",
+                "redis",
+                "psycopg2-binary",
+            )
+        },
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[Dict[str, Any]]:
+    """
+    中央値をベースラインと比較する
+    threshold（例: 0.1 = 10%）を超えて遅くなったものを regression とする
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            rows.append({"name": name, "status": "new", "ratio": None})
+            continue
+        ratio = result["median"] / base["median"] if base["median"] else float("inf")
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        rows.append({"name": name, "status": status, "ratio": ratio})
+    return rows
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(path: str, results: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,224 @@
+import asyncio
+import os
+
+from sqlalchemy import delete, insert
+
+from benchmarks.backends import KEY_PREFIX, Backend
+from benchmarks.runner import benchmark
+from core.bot import COGS_DIR, create_bot
+from db import crud
+from db.models import Item
+from db.schemas.item import Item as ItemSchema
+from db.schemas.item import ItemCreate
+from utils import job_queue
+from utils.redis import RedisCrud
+from utils.schemas import SessionSchema
+from utils.session import SessionCrud, session_refresher
+
+# ベンチマークが作成する行の所有者ID（liveバックエンドでの後片付けに使用）
+BENCH_OWNER_ID = 999_000_001
+
+PAGINATION_ROWS = 20_000
+
+
+def _rows(count: int, start: int = 0) -> list:
+    return [
+        {
+            "title": f"bench item {start + i}",
+            "description": "x" * 64,
+            "owner_id": BENCH_OWNER_ID,
+        }
+        for i in range(count)
+    ]
+
+
+def _cleanup_items(backend: Backend) -> None:
+    with backend.session() as db:
+        db.execute(delete(Item).where(Item.owner_id == BENCH_OWNER_ID))
+        db.commit()
+
+
+def _redis_crud(backend: Backend) -> RedisCrud:
+    crud_ = RedisCrud(db=0)
+    crud_.connect = backend.redis
+    return crud_
+
+
+# ---------- CRUD: 1件ずつ vs 一括 ----------
+
+
+@benchmark("crud", params={"rows": [100]}, number=5)
+def create_single(backend: Backend, rows: int):
+    """
+    crud.item.create_with_owner をrows回（1件ごとにcommit・refresh）
+    """
+    db = backend.session()
+    schemas = [
+        ItemCreate(title=row["title"], description=row["description"])
+        for row in _rows(rows)
+    ]
+
+    def target():
+        for obj_in in schemas:
+            crud.item.create_with_owner(db, obj_in=obj_in, owner_id=BENCH_OWNER_ID)
+
+    yield target
+    db.close()
+    _cleanup_items(backend)
+
+
+@benchmark("crud", params={"rows": [100]}, number=5)
+def create_bulk(backend: Backend, rows: int):
+    """
+    rows件を1回のexecutemany（INSERT ... VALUES）と1回のcommitで挿入
+    """
+    db = backend.session()
+    values = _rows(rows)
+
+    def target():
+        db.execute(insert(Item.__table__), values)
+        db.commit()
+
+    yield target
+    db.close()
+    _cleanup_items(backend)
+
+
+# ---------- ページング: OFFSETの深さ ----------
+
+
+def _seed_pagination(backend: Backend) -> None:
+    with backend.session() as db:
+        for start in range(0, PAGINATION_ROWS, 1000):
+            db.execute(insert(Item.__table__), _rows(1000, start))
+        db.commit()
+
+
+@benchmark(
+    "pagination",
+    params={"offset": [0, 1000, 10000], "mode": ["orm", "schema"]},
+    number=50,
+)
+def get_page(backend: Backend, offset: int, mode: str):
+    """
+    100件のページ取得
+    orm: get_multi_by_owner（ORMオブジェクト）
+    schema: get_multi_by_owner_as（必要な列のみSELECTしてスキーマで検証）
+    """
+    _seed_pagination(backend)
+    db = backend.session()
+
+    if mode == "orm":
+
+        def target():
+            db.expunge_all()
+            crud.item.get_multi_by_owner(
+                db, owner_id=BENCH_OWNER_ID, skip=offset, limit=100
+            )
+
+    else:
+
+        def target():
+            crud.item.get_multi_by_owner_as(
+                db, ItemSchema, owner_id=BENCH_OWNER_ID, skip=offset, limit=100
+            )
+
+    yield target
+    db.close()
+    _cleanup_items(backend)
+
+
+# ---------- Redis: ペイロードサイズ別 ----------
+
+PAYLOAD_SIZES = {"100B": 100, "10KB": 10 * 1024, "1MB": 1024 * 1024}
+
+
+def _payload(size: int) -> dict:
+    return {"data": "x" * size}
+
+
+@benchmark("redis", params={"size": list(PAYLOAD_SIZES)}, number=50)
+def set_value(backend: Backend, size: str):
+    crud_ = _redis_crud(backend)
+    value = _payload(PAYLOAD_SIZES[size])
+    key = f"{KEY_PREFIX}redis:{size}"
+    yield lambda: crud_.set(key, value, expire=60)
+    backend.redis.delete(key)
+
+
+@benchmark("redis", params={"size": list(PAYLOAD_SIZES)}, number=50)
+def get_value(backend: Backend, size: str):
+    crud_ = _redis_crud(backend)
+    key = f"{KEY_PREFIX}redis:{size}"
+    crud_.set(key, _payload(PAYLOAD_SIZES[size]), expire=60)
+    yield lambda: crud_.get(key)
+    backend.redis.delete(key)
+
+
+# ---------- セッション: 取得と検証 ----------
+
+SESSION_SIZES = {"small": 5, "large": 500}
+
+
+def _session_data(fields: int) -> SessionSchema:
+    return SessionSchema(
+        data={f"field{i}": {"value": i, "tags": ["a", "b", "c"]} for i in range(fields)}
+    )
+
+
+@benchmark(
+    "session",
+    params={"size": list(SESSION_SIZES), "refresh": [False, True]},
+    number=200,
+)
+def get_session(backend: Backend, size: str, refresh: bool):
+    """
+    SessionCrud.get（JSONデコード＋SessionSchemaの検証、refresh=TrueはTTL延長の予約を含む）
+    """
+    sessions = SessionCrud()
+    sessions.crud.connect = backend.redis
+    original = session_refresher._crud.connect
+    session_refresher._crud.connect = backend.redis
+    key = f"{KEY_PREFIX}{size}"
+    sessions.set(key, _session_data(SESSION_SIZES[size]), expire=sessions.ttl)
+    yield lambda: sessions.get(key, refresh=refresh)
+    session_refresher.flush()
+    session_refresher._crud.connect = original
+    sessions.delete(key)
+
+
+# ---------- Cogの読み込み ----------
+
+
+def _cog_names() -> list:
+    return sorted(
+        file.removesuffix(".py")
+        for file in os.listdir(COGS_DIR)
+        if file.endswith(".py") and not file.startswith("__") and file != "template.py"
+    )
+
+
+@benchmark("cogs", params={"cog": _cog_names()}, number=10, rounds=3)
+def load_cog(backend: Backend, cog: str):
+    """
+    Cogの読み込みと解放（setup・コマンド登録・タスク開始を含む）
+    モジュールのimportは初回（ウォームアップ）で済むため計測に含まれない
+    """
+    loop = asyncio.new_event_loop()
+    bot = create_bot(loop=loop)
+    name = f"cogs.{cog}"
+    # アンロード時のジョブキュー停止（ハートビート削除）もバックエンドに向ける
+    original = job_queue._crud.connect
+    job_queue._crud.connect = backend.redis
+
+    async def cycle():
+        bot.load_extension(name)
+        bot.unload_extension(name)
+        # cog_unloadがスケジュールした後処理の完了まで含める
+        current = asyncio.current_task()
+        pending = [task for task in asyncio.all_tasks() if task is not current]
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    yield lambda: loop.run_until_complete(cycle())
+    job_queue._crud.connect = original
+    loop.close()
@@ -1,3 +1,5 @@
+import io
+import json
 import logging
 import platform
 import re
@@ -7,12 +9,27 @@ from datetime import datetime
 from typing import Optional, Type, Any
 
 import discord
-import psutil
 from discord import slash_command
 from discord.ext import commands
 
 from core import get_settings
-from utils import DiscordUtil
+from core.bot import Draining
+from db import query_stats
+from utils import (
+    CircuitOpenError,
+    DiscordUtil,
+    RateLimited,
+    all_breakers,
+    bot_stats,
+    defer_watchdog,
+    get_executor,
+    listener_scheduler,
+    memory_usage_mb,
+    metrics,
+    run_blocking,
+    tracer,
+)
+from utils.rest import Priority, rest
 
 
 class Admin(commands.Cog):
@@ -68,11 +85,35 @@ class Admin(commands.Cog):
         """
         コマンド実行時のエラーハンドラー
         """
+        # レート制限はユーザーに通知するのみ
+        if isinstance(error, RateLimited):
+            await ctx.respond(
+                f"実行回数の上限に達しました。{error.retry_after:.0f}秒後に再度お試しください",
+                ephemeral=True,
+            )
+            return
+
+        # シャットダウン処理中
+        if isinstance(error, Draining):
+            await ctx.respond(
+                "再起動中です。数秒後に再度お試しください",
+                ephemeral=True,
+            )
+            return
+
         # 元のエラーを取得（CommandInvokeErrorの場合）
         original_error = error
         if isinstance(error, commands.CommandInvokeError):
             original_error = error.original
 
+        # 依存サービスの障害中は即座に失敗させ、通知は行わない（サーキットの遷移はログに出力済み）
+        if isinstance(original_error, CircuitOpenError):
+            await ctx.respond(
+                "一時的にサービスを利用できません。しばらくしてから再度お試しください",
+                ephemeral=True,
+            )
+            return
+
         # エラーをログに記録
         self.logger.error(f"Command error in {ctx.command}: {original_error}")
         self.logger.error("".join(traceback.format_tb(original_error.__traceback__)))
@@ -182,13 +223,14 @@ class Admin(commands.Cog):
         )
         uptime_str = str(uptime).split(".")[0] if uptime else "Unknown"
 
-        # サーバー数、ユーザー数などの統計
-        guilds_count = len(self.bot.guilds)
-        users_count = sum(g.member_count for g in self.bot.guilds)
+        # サーバー数、ユーザー数などの統計（StatsCollectorが差分で保持している値）
+        stats = bot_stats.snapshot()
+        day_ago = bot_stats.since(86400)
 
-        # システム情報
-        process = psutil.Process()
-        memory_usage = process.memory_info().rss / (1024 * 1024)  # MB単位
+        # システム情報（記録前はpsutilをスレッドで実行）
+        memory_usage = stats["memory_mb"]
+        if memory_usage is None:
+            memory_usage = await run_blocking(memory_usage_mb)  # MB単位
 
         # Embedを作成
         embed = discord.Embed(
@@ -207,8 +249,32 @@ class Admin(commands.Cog):
         embed.add_field(name="Uptime", value=uptime_str, inline=True)
 
         # 統計情報
-        embed.add_field(name="Guilds", value=str(guilds_count), inline=True)
-        embed.add_field(name="Users", value=str(users_count), inline=True)
+        embed.add_field(name="Guilds", value=str(stats["guilds"]), inline=True)
+        embed.add_field(name="Users", value=str(stats["members"]), inline=True)
+        embed.add_field(name="Channels", value=str(stats["channels"]), inline=True)
+        if day_ago is not None:
+            # 起動から24時間未満の場合は記録のある期間の変化を表示する
+            covered = discord.utils.utcnow().timestamp() - day_ago.timestamp
+            window = (
+                f"{covered / 3600:.0f}h" if covered >= 3600 else f"{covered / 60:.0f}m"
+            )
+            embed.add_field(
+                name=f"Change ({window})",
+                value=(
+                    f"guilds: {stats['guilds'] - day_ago.guilds:+d}\n"
+                    f"users: {stats['members'] - day_ago.members:+d}"
+                ),
+                inline=True,
+            )
+        if len(stats["shards"]) > 1:
+            embed.add_field(
+                name="Shards",
+                value="\n".join(
+                    f"#{shard_id}: {shard['guilds']} guilds / {shard['members']} users"
+                    for shard_id, shard in stats["shards"].items()
+                )[:1024],
+                inline=False,
+            )
         embed.add_field(
             name="Commands", value=str(len(self.bot.application_commands)), inline=True
         )
@@ -218,6 +284,17 @@ class Admin(commands.Cog):
         embed.add_field(name="Discord.py", value=discord.__version__, inline=True)
         embed.add_field(name="Memory", value=f"{memory_usage:.2f} MB", inline=True)
 
+        # 依存サービスのサーキット状態
+        circuits = all_breakers()
+        if circuits:
+            embed.add_field(
+                name="Circuits",
+                value="\n".join(
+                    f"{name}: {breaker.state}" for name, breaker in circuits.items()
+                ),
+                inline=False,
+            )
+
         # フッター
         embed.set_footer(
             text=f"Requested by {ctx.author}", icon_url=ctx.author.display_avatar.url
@@ -225,9 +302,149 @@ class Admin(commands.Cog):
 
         await ctx.respond(embed=embed)
 
+    @slash_command(name="metrics", description="メトリクスを出力します")
+    @commands.is_owner()
+    async def show_metrics(self, ctx: discord.ApplicationContext):
+        """プロセス内メトリクスをPrometheusテキスト形式で出力します"""
+        await ctx.defer(ephemeral=True)
+
+        embed = discord.Embed(title="Executor", color=discord.Color.blue())
+        for name, stats in get_executor().stats().items():
+            embed.add_field(
+                name=name,
+                value="\n".join(f"{key}: {value}" for key, value in stats.items()),
+                inline=True,
+            )
+
+        embed.add_field(
+            name="REST",
+            value="\n".join(f"{key}: {value}" for key, value in rest.stats().items()),
+            inline=True,
+        )
+
+        deferred = sorted(
+            defer_watchdog.stats().items(), key=lambda item: -item[1]["deferred"]
+        )
+        if deferred and deferred[0][1]["deferred"]:
+            embed.add_field(
+                name="Auto defer",
+                value="\n".join(
+                    f"/{command}: {counts['deferred']}/{counts['invoked']}"
+                    for command, counts in deferred[:10]
+                    if counts["deferred"]
+                ),
+                inline=True,
+            )
+
+        listeners = sorted(
+            listener_scheduler.stats().items(),
+            key=lambda item: -(item[1]["queued"] + item[1]["dropped"]),
+        )
+        if listeners:
+            embed.add_field(
+                name="Listeners",
+                value="\n".join(
+                    f"{name}: queued {counts['queued']}, dropped {counts['dropped']}"
+                    for name, counts in listeners[:10]
+                ),
+                inline=False,
+            )
+
+        file = discord.File(
+            io.BytesIO(metrics.render().encode("utf-8")), filename="metrics.txt"
+        )
+        await ctx.respond(embed=embed, file=file)
+
+    @slash_command(name="queries", description="SQLクエリの実行統計を表示します")
+    @commands.is_owner()
+    async def show_queries(
+        self,
+        ctx: discord.ApplicationContext,
+        sort: discord.Option(
+            str,
+            "並び順",
+            choices=["total", "count", "max"],
+            default="total",
+        ),
+        reset: discord.Option(bool, "表示後に統計をリセット", default=False),
+    ):
+        """正規化SQLごとの実行回数・所要時間・N+1検出回数を表示します"""
+        await ctx.defer(ephemeral=True)
+
+        top = query_stats.top(10, sort=sort)
+        embed = discord.Embed(
+            title=f"Queries (by {sort})",
+            color=discord.Color.blue(),
+            timestamp=discord.utils.utcnow(),
+        )
+        if not top:
+            embed.description = "No queries recorded"
+        for stats in top:
+            value = (
+                f"count: {stats['count']} / total: {stats['total'] * 1000:.1f} ms\n"
+                f"avg: {stats['avg'] * 1000:.2f} ms / max: {stats['max'] * 1000:.1f} ms\n"
+                f"slow: {stats['slow']} / N+1: {stats['n_plus_one']}"
+            )
+            if stats["last_site"]:
+                value += f"\nsite: `{stats['last_site']}`"
+            value += f"\n```sql\n{stats['sql'][:700]}\n```"
+            embed.add_field(name=stats["fingerprint"], value=value[:1024], inline=False)
+
+        if reset:
+            query_stats.reset()
+        await ctx.respond(embed=embed)
+
+    @slash_command(name="traces", description="直近の遅いトレースを表示します")
+    @commands.is_owner()
+    async def show_traces(
+        self,
+        ctx: discord.ApplicationContext,
+        limit: discord.Option(int, "件数", min_value=1, max_value=50, default=10),
+        clear: discord.Option(bool, "表示後にトレースを削除", default=False),
+    ):
+        """遅いトレースの内訳を表示し、Chrome trace形式のJSONを添付します"""
+        await ctx.defer(ephemeral=True)
+
+        traces = tracer.recent(limit)
+        embed = discord.Embed(
+            title=f"Slow traces (>= {tracer.slow_ms} ms)",
+            color=discord.Color.blue(),
+            timestamp=discord.utils.utcnow(),
+        )
+        if not tracer.enabled:
+            embed.description = "Tracing is disabled (TRACE_SAMPLE_RATE=0)"
+        elif not traces:
+            embed.description = "No slow traces recorded"
+        for trace in traces[:10]:
+            breakdown = " / ".join(
+                f"{kind}: {ms:.0f} ms"
+                for kind, ms in sorted(trace.breakdown().items(), key=lambda i: -i[1])
+            )
+            value = (
+                f"<t:{int(trace.started_at)}:T> / spans: {len(trace.spans)}\n"
+                f"{breakdown or 'no child spans'}"
+            )
+            embed.add_field(
+                name=f"{trace.name[:200]} ({trace.duration_ms:.0f} ms)",
+                value=value[:1024],
+                inline=False,
+            )
+
+        files = []
+        if traces:
+            data = json.dumps(tracer.export_chrome(traces))
+            files.append(
+                discord.File(io.BytesIO(data.encode("utf-8")), filename="traces.json")
+            )
+        if clear:
+            tracer.clear()
+        await ctx.respond(embed=embed, files=files)
+
     async def autocomplete_guilds(self, ctx: discord.AutocompleteContext):
+        # 所有者がキャッシュにない場合（RESUME直後など）はIDを表示する
         guilds = [
-            f"{guild.name}({guild.id}/{guild.owner.display_name})"
+            f"{guild.name}({guild.id}/"
+            f"{guild.owner.display_name if guild.owner else guild.owner_id})"
             for guild in self.bot.guilds
         ]
         return [value for value in guilds if value.startswith(ctx.value)]
@@ -252,7 +469,11 @@ class Admin(commands.Cog):
             await ctx.respond("サーバーが見つかりませんでした", ephemeral=True)
 
         try:
-            await guild.leave()
+            await rest.call(
+                guild.leave,
+                priority=Priority.NORMAL,
+                route=("DELETE", f"/users/@me/guilds/{guild.id}"),
+            )
             await ctx.respond(f"{guild.name} から退出しました", ephemeral=True)
         except Exception as e:
             await ctx.respond(f"エラーが発生しました: {e}", ephemeral=True)
@@ -0,0 +1,56 @@
+import logging
+from datetime import datetime
+
+from discord.ext import commands
+
+from core import get_settings
+from db import ChangeEvent, change_feed, guild_config_cache
+
+
+class ChangeFeedListener(commands.Cog):
+    """
+    テーブルの変更通知を受信し、ボットのイベントとキャッシュの無効化に変換する
+    itemsの変更は on_item_change(event: ChangeEvent) として各Cogに配信される
+    再接続で通知を取りこぼした可能性がある場合は on_change_feed_resync が発火する
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.settings = get_settings()
+        self.logger = logging.getLogger("discord")
+        change_feed.subscribe("items", self._on_item_change)
+        change_feed.subscribe("guild_configs", self._on_guild_config_change)
+        change_feed.on_resync(self._on_resync)
+        # CogManagerからのリロード時は接続済みのため即座に受信を再開する
+        if bot.is_ready() and self.settings.CHANGE_FEED_ENABLED:
+            change_feed.start()
+
+    def cog_unload(self):
+        change_feed.unsubscribe("items", self._on_item_change)
+        change_feed.unsubscribe("guild_configs", self._on_guild_config_change)
+        change_feed.remove_resync(self._on_resync)
+        change_feed.stop()
+
+    @commands.Cog.listener()
+    async def on_connect(self):
+        if self.settings.CHANGE_FEED_ENABLED:
+            change_feed.start()
+
+    def _on_item_change(self, event: ChangeEvent):
+        self.bot.dispatch("item_change", event)
+
+    def _on_guild_config_change(self, event: ChangeEvent):
+        # 他プロセスやSQLで直接変更された設定もキャッシュに反映する
+        updated_at = event.values.get("updated_at")
+        guild_config_cache.on_change(
+            event.values["guild_id"],
+            datetime.fromisoformat(updated_at) if updated_at else None,
+        )
+
+    def _on_resync(self):
+        guild_config_cache.invalidate_all()
+        self.bot.dispatch("change_feed_resync")
+
+
+def setup(bot):
+    return bot.add_cog(ChangeFeedListener(bot))
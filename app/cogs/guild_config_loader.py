@@ -0,0 +1,48 @@
+import logging
+
+import discord
+from discord.ext import commands
+
+from db import guild_config_cache
+
+
+class GuildConfigLoader(commands.Cog):
+    """
+    利用可能になったサーバーの設定をキャッシュに読み込み、他プロセスからの無効化通知を購読する
+    設定の参照は db.guild_config_cache.get(guild_id) で行う
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.logger = logging.getLogger("discord")
+        # CogManagerからのリロード時は接続済みのため即座に購読を再開する
+        if bot.is_ready():
+            guild_config_cache.start()
+
+    def cog_unload(self):
+        guild_config_cache.stop()
+
+    @commands.Cog.listener()
+    async def on_connect(self):
+        guild_config_cache.start()
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild):
+        guild_config_cache.preload(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        guild_config_cache.preload(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        guild_config_cache.evict(guild.id)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # RESUME後の再構築などイベントなしで追加されたサーバーも読み込む
+        guild_config_cache.preload_many(guild.id for guild in self.bot.guilds)
+
+
+def setup(bot):
+    return bot.add_cog(GuildConfigLoader(bot))
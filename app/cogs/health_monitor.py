@@ -15,7 +15,7 @@ class HealthMonitor(commands.Cog):
     def __init__(self, bot: commands.Bot, status_file="/tmp/bot_status.txt"):  # nosec B108
         self.bot = bot
         self.status_file = status_file
-        self.running = True
+        self._stop = threading.Event()
         self.thread = threading.Thread(target=self._monitor, daemon=True)
         self.thread.start()
         logger.info(f"Health monitoring started with status file: {status_file}")
@@ -24,9 +24,9 @@ class HealthMonitor(commands.Cog):
         """
         定期的にボットの状態をチェックしてファイルに書き込む
         """
-        while self.running:
+        while not self._stop.is_set():
             self._update_status()
-            time.sleep(30)
+            self._stop.wait(30)
 
     def _update_status(self):
         """
@@ -60,7 +60,7 @@ class HealthMonitor(commands.Cog):
         """
         コグアンロード時にモニタリングを停止する
         """
-        self.running = False
+        self._stop.set()
         if self.thread.is_alive():
             self.thread.join(timeout=1.0)
 
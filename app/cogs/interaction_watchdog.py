@@ -0,0 +1,47 @@
+import logging
+
+import discord
+from discord.ext import commands
+
+from core import get_settings
+from utils import defer_watchdog
+
+
+class InteractionWatchdog(commands.Cog):
+    """
+    アプリケーションコマンドの応答を監視し、猶予時間を過ぎたものを自動でdeferする
+    個別のコマンドは utils.no_auto_defer / utils.auto_defer で対象外・設定変更できる
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.settings = get_settings()
+        self.logger = logging.getLogger("discord")
+        self.enabled = self.settings.INTERACTION_AUTO_DEFER
+        if self.enabled:
+            defer_watchdog.install()
+
+    def cog_unload(self):
+        if self.enabled:
+            defer_watchdog.uninstall()
+
+    @commands.Cog.listener()
+    async def on_application_command(self, ctx: discord.ApplicationContext):
+        if self.enabled:
+            defer_watchdog.track(ctx)
+
+    @commands.Cog.listener()
+    async def on_application_command_completion(self, ctx: discord.ApplicationContext):
+        if self.enabled:
+            defer_watchdog.finish(ctx)
+
+    @commands.Cog.listener()
+    async def on_application_command_error(
+        self, ctx: discord.ApplicationContext, error: discord.DiscordException
+    ):
+        if self.enabled:
+            defer_watchdog.finish(ctx)
+
+
+def setup(bot):
+    return bot.add_cog(InteractionWatchdog(bot))
@@ -0,0 +1,35 @@
+import logging
+
+from discord.ext import commands
+
+from core import get_settings
+from utils import job_queue
+
+
+class JobWorker(commands.Cog):
+    """
+    バックグラウンドジョブキューのワーカーを管理する
+    ハンドラーは各Cogから job_queue.register() で登録する
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.settings = get_settings()
+        self.logger = logging.getLogger("discord")
+        # CogManagerからのリロード時は接続済みのため即座に起動する（前の停止の完了を待つ）
+        if bot.is_ready():
+            bot.loop.create_task(job_queue.start(bot))
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await job_queue.start(self.bot)
+
+    def cog_unload(self):
+        """
+        コグアンロード時にワーカーを停止する（処理中のジョブはキューに戻る）
+        """
+        job_queue.stop()
+
+
+def setup(bot):
+    return bot.add_cog(JobWorker(bot))
@@ -0,0 +1,33 @@
+import logging
+
+from discord.ext import commands
+
+from utils.rest import rest
+
+
+class RestScheduling(commands.Cog):
+    """
+    REST呼び出しスケジューラーをbotのHTTPセッションに接続する
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.logger = logging.getLogger("discord")
+        # CogManagerからのリロード時は接続済みのため即座に登録する
+        if bot.is_ready():
+            rest.attach(bot)
+
+    @commands.Cog.listener()
+    async def on_connect(self):
+        # 再接続時はHTTPセッションが作り直されるため毎回登録する
+        rest.attach(self.bot)
+
+    def cog_unload(self):
+        """
+        コグアンロード時にワーカーを停止する（キュー内の呼び出しはキャンセルされる）
+        """
+        rest.stop()
+
+
+def setup(bot):
+    return bot.add_cog(RestScheduling(bot))
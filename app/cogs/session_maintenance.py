@@ -0,0 +1,99 @@
+import logging
+
+import discord
+from discord.ext import commands, tasks
+
+from core import get_settings
+from utils import SessionCrud, metrics, run_blocking
+from utils.session import session_refresher
+
+settings = get_settings()
+
+
+class SessionMaintenance(commands.Cog):
+    """
+    セッションのTTL延長の一括送信と、SCANによる集計・削除を行う
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.logger = logging.getLogger("discord")
+        self.sessions = SessionCrud()
+        self.refresh_ttl.start()
+        self.collect_stats.start()
+
+    def cog_unload(self):
+        """
+        コグアンロード時にループを停止し、未送信のTTL延長を送信する
+        """
+        self.refresh_ttl.cancel()
+        self.collect_stats.cancel()
+        try:
+            session_refresher.flush()
+        except Exception as e:
+            self.logger.warning(f"Session TTL refresh failed: {e}")
+
+    @tasks.loop(seconds=settings.SESSION_REFRESH_INTERVAL)
+    async def refresh_ttl(self):
+        try:
+            await run_blocking(session_refresher.flush, pool="db")
+        except Exception as e:
+            self.logger.warning(f"Session TTL refresh failed: {e}")
+
+    @tasks.loop(seconds=settings.SESSION_MAINTENANCE_INTERVAL)
+    async def collect_stats(self):
+        try:
+            stats = await run_blocking(self.sessions.stats, pool="io", timeout=None)
+        except Exception as e:
+            self.logger.warning(f"Session stats collection failed: {e}")
+            return
+        metrics.set_gauge("sessions_total", stats["count"])
+        metrics.set_gauge("sessions_bytes", stats["bytes"])
+
+    @collect_stats.before_loop
+    async def before_collect_stats(self):
+        await self.bot.wait_until_ready()
+
+    sessions_group = discord.SlashCommandGroup("sessions", "セッション管理")
+
+    @sessions_group.command(
+        name="stats", description="セッション数と使用メモリを表示します"
+    )
+    @commands.is_owner()
+    async def sessions_stats(
+        self,
+        ctx: discord.ApplicationContext,
+        prefix: discord.Option(str, "キーのプレフィックス", default=""),
+    ):
+        """SCANでセッションを列挙し、件数と使用メモリを表示します"""
+        await ctx.defer(ephemeral=True)
+        stats = await run_blocking(self.sessions.stats, prefix, pool="io", timeout=None)
+        await ctx.respond(
+            f"`{SessionCrud.key(prefix)}*`: {stats['count']} sessions, "
+            f"{stats['bytes'] / 1024 / 1024:.2f} MB",
+            ephemeral=True,
+        )
+
+    @sessions_group.command(
+        name="purge", description="指定プレフィックスのセッションを削除します"
+    )
+    @commands.is_owner()
+    async def sessions_purge(
+        self,
+        ctx: discord.ApplicationContext,
+        prefix: discord.Option(str, "キーのプレフィックス"),
+    ):
+        """SCANとUNLINKで指定プレフィックスのセッションを削除します"""
+        await ctx.defer(ephemeral=True)
+        deleted = await run_blocking(
+            self.sessions.purge, prefix, pool="io", timeout=None
+        )
+        self.logger.info(f"Purged {deleted} sessions with prefix '{prefix}'")
+        await ctx.respond(
+            f"`{SessionCrud.key(prefix)}*` から {deleted} 件削除しました",
+            ephemeral=True,
+        )
+
+
+def setup(bot):
+    return bot.add_cog(SessionMaintenance(bot))
@@ -0,0 +1,101 @@
+import logging
+
+import discord
+from discord.ext import commands, tasks
+
+from core import get_settings
+from utils import bot_stats, listener_policy, memory_usage_mb, metrics, run_blocking
+from utils.rest import Priority
+
+settings = get_settings()
+
+
+class StatsCollector(commands.Cog):
+    """
+    ゲートウェイイベントからサーバー・メンバー・チャンネル数を差分で更新し、
+    定期的に時系列へ記録・キャッシュ全体と突き合わせる
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.logger = logging.getLogger("discord")
+        self.sample_stats.start()
+        self.reconcile_stats.start()
+
+    def cog_unload(self):
+        self.sample_stats.cancel()
+        self.reconcile_stats.cancel()
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild):
+        bot_stats.update_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        bot_stats.update_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_unavailable(self, guild: discord.Guild):
+        bot_stats.remove_guild(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        bot_stats.remove_guild(guild.id)
+
+    # 大量参加（レイド等）ではサーバーごとに1回の更新にまとめる
+    @commands.Cog.listener()
+    @listener_policy(
+        overflow="coalesce",
+        key=lambda member: member.guild.id,
+        priority=Priority.BACKGROUND,
+    )
+    async def on_member_join(self, member: discord.Member):
+        bot_stats.update_guild(member.guild)
+
+    @commands.Cog.listener()
+    @listener_policy(
+        overflow="coalesce",
+        key=lambda payload: payload.guild_id,
+        priority=Priority.BACKGROUND,
+    )
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent):
+        # メンバーがキャッシュにない場合も届くrawイベントを使う
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild is not None:
+            bot_stats.update_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        bot_stats.update_guild(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        bot_stats.update_guild(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        bot_stats.reconcile(self.bot.guilds)
+
+    @tasks.loop(seconds=settings.STATS_SAMPLE_INTERVAL)
+    async def sample_stats(self):
+        try:
+            memory_mb = await run_blocking(memory_usage_mb, pool="io")
+        except Exception as e:
+            self.logger.warning(f"Memory usage sampling failed: {e}")
+            memory_mb = None
+        bot_stats.sample(memory_mb)
+
+    @tasks.loop(seconds=settings.STATS_RECONCILE_INTERVAL)
+    async def reconcile_stats(self):
+        drift = bot_stats.reconcile(self.bot.guilds)
+        if drift:
+            self.logger.info(f"Stats reconciled: member count drift {drift:+d}")
+            metrics.inc("bot_stats_drift_total", abs(drift))
+
+    @reconcile_stats.before_loop
+    async def before_reconcile_stats(self):
+        await self.bot.wait_until_ready()
+
+
+def setup(bot):
+    return bot.add_cog(StatsCollector(bot))
@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import os
+import pathlib
+import signal
+from typing import Any, Dict, Iterable, List, Optional
+
+import discord
+import discord.client
+from discord.ext import commands
+from discord.gateway import DiscordWebSocket
+from discord.http import API_VERSION
+
+from core import get_settings
+from utils import run_blocking
+from utils.listeners import get_listener_policy, listener_scheduler
+from utils.tracing import tracer
+from utils.gateway_session import get_session_store
+
+logger = logging.getLogger("discord")
+
+COGS_DIR = pathlib.Path(__file__).resolve().parents[1] / "cogs"
+
+
+class Draining(discord.CheckFailure):
+    """
+    シャットダウン処理中のため新しいコマンドを受け付けない
+    """
+
+    def __init__(self):
+        super().__init__("The bot is shutting down")
+
+
+class _ResumableWebSocket(DiscordWebSocket):
+    """
+    保存されたセッションでRESUMEし、終了時にセッションを無効化しないゲートウェイ接続
+    """
+
+    keep_session = False
+
+    @classmethod
+    async def from_client(cls, client, **kwargs):
+        previous = getattr(client, "ws", None)
+        saved = getattr(client, "_pending_resume", None)
+        if saved is not None and not kwargs.get("initial"):
+            saved = None
+        if saved is not None:
+            client._pending_resume = None
+            kwargs.update(
+                gateway=(
+                    f"{saved['resume_gateway_url']}"
+                    f"?encoding=json&v={API_VERSION}&compress=zlib-stream"
+                ),
+                session=saved["session_id"],
+                sequence=saved["sequence"],
+                resume=True,
+            )
+            logger.info(f"Resuming gateway session {saved['session_id']}")
+        ws = await super().from_client(client, **kwargs)
+        # resume_gateway_url はREADYでしか設定されないため、RESUMEした接続では引き継ぐ
+        # （引き継がないと終了時にセッションを保存できず、次回の起動がIDENTIFYになる）
+        if saved is not None:
+            ws.resume_gateway_url = saved["resume_gateway_url"]
+        elif kwargs.get("resume") and previous is not None:
+            ws.resume_gateway_url = ws.resume_gateway_url or getattr(
+                previous, "resume_gateway_url", None
+            )
+        return ws
+
+    async def close(self, code=4000):
+        # 1000/1001で閉じるとDiscord側でセッションが破棄され、RESUMEできなくなる
+        if self.keep_session and code in (1000, 1001):
+            code = 4000
+        await super().close(code)
+
+
+class ResumableBot(commands.Bot):
+    """
+    SIGTERMで新しいコマンドの受付を止めて処理中の作業を終えてから終了するボット
+    GATEWAY_RESUME が有効な場合は終了時にゲートウェイのセッションを保存し、
+    次回起動時にIDENTIFYの代わりにRESUMEを試みる（失敗した場合は通常どおりIDENTIFYする）
+    """
+
+    def __init__(self, *args: Any, **options: Any):
+        super().__init__(*args, **options)
+        self.settings = get_settings()
+        self.draining = False
+        self._shutdown_task: Optional[asyncio.Task] = None
+        self._pending_resume: Optional[Dict[str, Any]] = None
+        self._cold_resume = False
+        self._session_store = None
+        if self.settings.GATEWAY_RESUME:
+            self._session_store = get_session_store()
+        self.add_check(self._reject_while_draining)
+
+    async def _reject_while_draining(self, ctx) -> bool:
+        if self.draining:
+            raise Draining()
+        return True
+
+    def _schedule_event(self, coro, event_name: str, *args: Any, **kwargs: Any):
+        policy = get_listener_policy(coro)
+        if policy is None:
+            return super()._schedule_event(coro, event_name, *args, **kwargs)
+        # タスクを作らずリスナーごとの有限キューに入れる（溢れた分は方針に従って捨てる）
+        listener_scheduler.submit(
+            coro.__qualname__,
+            policy,
+            lambda: self._run_event(coro, event_name, *args, **kwargs),
+            args,
+        )
+
+    async def _run_event(self, coro, event_name: str, *args: Any, **kwargs: Any):
+        # on_interaction はコマンド自体のトレース（invoke_application_command）をルートにするため除外する
+        if not tracer.enabled or event_name == "on_interaction":
+            return await super()._run_event(coro, event_name, *args, **kwargs)
+        with tracer.trace(f"{event_name} ({coro.__qualname__})", "listener"):
+            await super()._run_event(coro, event_name, *args, **kwargs)
+
+    async def invoke_application_command(self, ctx: discord.ApplicationContext):
+        if not tracer.enabled:
+            return await super().invoke_application_command(ctx)
+        with tracer.trace(
+            f"/{ctx.command.qualified_name}", "command", guild_id=ctx.guild_id
+        ):
+            await super().invoke_application_command(ctx)
+
+    async def start(self, token: str, *, reconnect: bool = True) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self._on_signal)
+            except (NotImplementedError, RuntimeError):
+                pass
+        await super().start(token, reconnect=reconnect)
+
+    def _on_signal(self) -> None:
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.ensure_future(self.shutdown())
+        else:
+            # 2回目のシグナルでは待たずに終了する
+            logger.warning("Second signal received; stopping immediately")
+            asyncio.get_running_loop().stop()
+
+    async def connect(self, *, reconnect: bool = True) -> None:
+        if self._session_store is not None:
+            saved = await run_blocking(
+                self._session_store.pop, self.shard_id, pool="io"
+            )
+            if saved is not None:
+                self._pending_resume = saved
+                self._cold_resume = True
+                # 通常はREADYで設定される値を復元する
+                if self._connection.application_id is None:
+                    self._connection.application_id = saved.get("application_id")
+            discord.client.DiscordWebSocket = _ResumableWebSocket
+        await super().connect(reconnect=reconnect)
+
+    async def on_resumed(self):
+        if not self._cold_resume:
+            return
+        self._cold_resume = False
+        if not self.is_ready():
+            # 別プロセスのセッションを再開した場合はキャッシュが空のため、RESTで再構築する
+            self.loop.create_task(self._hydrate_guilds())
+
+    def _owns_guild(self, guild_id: int) -> bool:
+        shard_count = self.shard_count or 1
+        return (guild_id >> 22) % shard_count == (self.shard_id or 0)
+
+    async def _hydrate_guilds(self) -> None:
+        """
+        RESUME後にサーバー・チャンネル・ロールをRESTから読み込み、on_readyを発火する
+        メンバーは guild.me と guild.owner のためにボット自身と所有者のみ読み込む（member_countは概算値）
+        """
+        state = self._connection
+        partials: List[dict] = []
+        after = None
+        while True:
+            page = await self.http.get_guilds(200, after=after)
+            partials.extend(p for p in page if self._owns_guild(int(p["id"])))
+            if len(page) < 200:
+                break
+            after = page[-1]["id"]
+
+        semaphore = asyncio.Semaphore(self.settings.RESUME_HYDRATE_CONCURRENCY)
+
+        async def load(partial: dict):
+            guild_id = partial["id"]
+            async with semaphore:
+                data = await self.http.get_guild(guild_id, with_counts=True)
+                data["channels"] = await self.http.get_all_guild_channels(guild_id)
+                members = [await self.http.get_member(guild_id, state.self_id)]
+                owner_id = int(data["owner_id"])
+                if owner_id != state.self_id:
+                    try:
+                        members.append(await self.http.get_member(guild_id, owner_id))
+                    except discord.HTTPException as e:
+                        logger.debug(f"Failed to load owner of guild {guild_id}: {e}")
+            data.setdefault("member_count", data.get("approximate_member_count"))
+            guild = state._add_guild_from_data(data)
+            for member in members:
+                guild._add_member(discord.Member(data=member, guild=guild, state=state))
+
+        results = await asyncio.gather(
+            *(load(partial) for partial in partials), return_exceptions=True
+        )
+        failed = {
+            partial["id"]: result
+            for partial, result in zip(partials, results)
+            if isinstance(result, Exception)
+        }
+        logger.info(
+            f"Hydrated {len(partials) - len(failed)}/{len(partials)} guilds after resume"
+        )
+        if failed:
+            logger.warning(
+                f"Failed to hydrate {len(failed)} guilds after resume: "
+                + ", ".join(
+                    f"{guild_id} ({error!r})" for guild_id, error in failed.items()
+                )
+            )
+        self._handle_ready()
+        self.dispatch("ready")
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """
+        新しいコマンドの受付を止め、処理中のイベントハンドラーの完了を待ってから全Cogをアンロードする
+        Cogの後処理（ジョブキューの停止、TTL延長・書き込みバッファのフラッシュ等）はcog_unloadで行われる
+        """
+        if self.draining:
+            return
+        self.draining = True
+        logger.info("Draining: new commands are rejected")
+        self.dispatch("drain")
+
+        current = asyncio.current_task()
+        in_flight = [task for task in self._tasks if task is not current]
+        if in_flight:
+            _, pending = await asyncio.wait(in_flight, timeout=timeout)
+            if pending:
+                logger.warning(f"Draining: {len(pending)} handlers did not finish")
+        if not await listener_scheduler.join(timeout=timeout):
+            logger.warning("Draining: queued listeners did not finish")
+
+        before = asyncio.all_tasks()
+        for extension in list(self.extensions):
+            try:
+                self.unload_extension(extension)
+            except Exception as e:
+                logger.error(f"Failed to unload {extension} while draining: {e}")
+        # cog_unloadがスケジュールした後処理の完了を待つ
+        cleanup = asyncio.all_tasks() - before
+        if cleanup:
+            await asyncio.wait(cleanup, timeout=timeout)
+        logger.info("Draining finished")
+
+    async def shutdown(self) -> None:
+        """
+        ドレインしてから接続を閉じる（SIGTERM・SIGINTで呼ばれる）
+        """
+        try:
+            await self.drain(timeout=self.settings.DRAIN_TIMEOUT)
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        ws = self.ws
+        resumable = (
+            self._session_store is not None
+            and not self.is_closed()
+            and isinstance(ws, _ResumableWebSocket)
+            and ws.session_id is not None
+            and ws.resume_gateway_url is not None
+        )
+        if resumable:
+            ws.keep_session = True
+        await super().close()
+        if resumable:
+            data = {
+                "session_id": ws.session_id,
+                "sequence": ws.sequence,
+                "resume_gateway_url": ws.resume_gateway_url,
+                "application_id": self._connection.application_id,
+            }
+            try:
+                await run_blocking(self._session_store.save, self.shard_id, data)
+                logger.info(f"Saved gateway session {ws.session_id} for resume")
+            except Exception as e:
+                logger.warning(f"Failed to save gateway session: {e}")
+
+
+def create_bot(**options: Any) -> commands.Bot:
+    """
+    ボットインスタンスを生成
+    options で既定のオプションを上書きできる（負荷試験ハーネスなどで使用）
+    """
+    defaults = dict(
+        help_command=None,
+        case_insensitive=True,
+        activity=discord.Game("©ukwhatn"),
+        intents=discord.Intents.all(),
+    )
+    defaults.update(options)
+    return ResumableBot(**defaults)
+
+
+def load_cogs(bot: commands.Bot, exclude: Iterable[str] = ()) -> List[str]:
+    """
+    template以外の全Cogを読み込み、読み込んだCog名を返す
+    """
+    excluded = set(exclude)
+    loaded = []
+    for file in sorted(os.listdir(COGS_DIR)):
+        if file.endswith(".py") and not file.startswith("__") and file != "template.py":
+            cog_name = file.removesuffix(".py")
+            if cog_name in excluded:
+                continue
+            logger.info(f"Loading cog: {cog_name}")
+            bot.load_extension(f"cogs.{cog_name}")
+            loaded.append(cog_name)
+    return loaded
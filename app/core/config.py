@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -33,6 +33,7 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "main"
     POSTGRES_HOST: str = "db"
     POSTGRES_PORT: str = "5432"
+    DB_CONNECT_TIMEOUT: int = 3
 
     @property
     def DATABASE_URI(self) -> str:
@@ -44,9 +45,133 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    # リードレプリカ設定（"host" または "host:port" のカンマ区切り、空なら無効）
+    POSTGRES_REPLICA_HOSTS: str = ""
+    # 接続に失敗したレプリカを除外する秒数
+    DB_REPLICA_RETRY_INTERVAL: float = 30.0
+
+    @property
+    def DATABASE_REPLICA_URIS(self) -> List[str]:
+        """
+        リードレプリカの接続URL一覧を取得
+        """
+        uris = []
+        for host in self.POSTGRES_REPLICA_HOSTS.split(","):
+            host = host.strip()
+            if not host:
+                continue
+            if ":" not in host:
+                host = f"{host}:{self.POSTGRES_PORT}"
+            uris.append(
+                f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+                f"@{host}/{self.POSTGRES_DB}"
+            )
+        return uris
+
+    # クエリ計測設定
+    DB_INSTRUMENTATION: bool = True
+    DB_SLOW_QUERY_MS: int = 200
+    # 1セッション内で同じクエリがこの回数実行されたらN+1として警告
+    DB_N_PLUS_ONE_THRESHOLD: int = 10
+
+    # 検索設定
+    # オートコンプリートはDiscordの応答期限（3秒）内に返す必要がある
+    SEARCH_AUTOCOMPLETE_TIMEOUT_MS: int = 1000
+
+    # REST呼び出しスケジューラー設定
+    # Discordのグローバルレート制限（リクエスト/秒）
+    REST_GLOBAL_RATE: float = 50.0
+    # BACKGROUND優先度が使用できるグローバル予算の割合（残りはインタラクション等に確保）
+    REST_BACKGROUND_SHARE: float = 0.5
+    REST_SCHEDULER_WORKERS: int = 4
+
+    # イベントリスナー設定
+    # listener_policy を指定したリスナーを実行するワーカー数（同時実行数の上限）
+    LISTENER_WORKERS: int = 32
+
+    # トレース設定
+    # コマンド・リスナー実行をトレースする割合（0で無効）
+    TRACE_SAMPLE_RATE: float = 0.0
+    # この時間以上かかったトレースを直近TRACE_BUFFER_SIZE件保持する
+    TRACE_SLOW_MS: int = 500
+    TRACE_BUFFER_SIZE: int = 50
+    # 1トレースあたりのスパン数の上限
+    TRACE_MAX_SPANS: int = 500
+
+    # ゲートウェイ再開・ドレイン設定
+    # 終了時にセッションを保存し、次回起動時にRESUMEを試みる（redis または file に保存）
+    GATEWAY_RESUME: bool = False
+    GATEWAY_SESSION_STORE: str = "redis"
+    GATEWAY_SESSION_FILE: str = "/tmp/gateway_session"  # nosec B108
+    GATEWAY_SESSION_TTL: int = 120
+    # RESUME後にRESTでサーバー情報を読み込む際の同時実行数
+    RESUME_HYDRATE_CONCURRENCY: int = 5
+    # SIGTERM受信後、処理中のハンドラー・後処理の完了を待つ最大秒数
+    DRAIN_TIMEOUT: float = 20.0
+
+    # インタラクション自動defer設定
+    # 猶予秒数内に応答のないコマンドを自動でdeferする（Discordの応答期限は3秒）
+    INTERACTION_AUTO_DEFER: bool = True
+    INTERACTION_DEFER_BUDGET: float = 2.0
+    INTERACTION_DEFER_EPHEMERAL: bool = True
+
+    # ボット統計設定
+    # 時系列の記録間隔（秒）と保持件数（既定: 1分間隔で24時間分）
+    STATS_SAMPLE_INTERVAL: int = 60
+    STATS_HISTORY_SIZE: int = 1440
+    # キャッシュ全体からの数え直し間隔（秒）
+    STATS_RECONCILE_INTERVAL: int = 900
+
+    # テーブル変更通知（LISTEN/NOTIFY）設定
+    CHANGE_FEED_ENABLED: bool = True
+    # 切断時の再接続間隔の上限（秒）
+    CHANGE_FEED_RECONNECT_MAX: float = 30.0
+
+    # サーバー設定キャッシュ設定
+    # この秒数内の読み込み要求を1回のクエリにまとめる（起動時のguild_availableなど）
+    GUILD_CONFIG_PRELOAD_DELAY: float = 0.05
+    GUILD_CONFIG_BATCH_SIZE: int = 500
+
+    # 一括DM設定
+    DM_SEND_CONCURRENCY: int = 5
+
     # Redis設定
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    REDIS_CONNECT_TIMEOUT: float = 1.0
+    # Redis障害時にローカルキャッシュの古い値を返す最大経過秒数
+    REDIS_STALE_TTL: int = 300
+    LOCAL_CACHE_MAX_SIZE: int = 10000
+
+    # セッション設定
+    # 読み取りのたびに延長される有効期限（秒）
+    SESSION_TTL: int = 86400
+    # TTL延長をまとめて送信する間隔（秒）
+    SESSION_REFRESH_INTERVAL: float = 5.0
+    SESSION_SCAN_BATCH: int = 100
+    SESSION_MAINTENANCE_INTERVAL: int = 600
+
+    # サーキットブレーカー設定
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RECOVERY_TIMEOUT: float = 30.0
+
+    # レート制限設定
+    # Redis障害時にコマンドを許可するかどうか
+    RATE_LIMIT_FAIL_OPEN: bool = True
+
+    # ブロッキング処理オフロード設定
+    EXECUTOR_DB_WORKERS: int = 8
+    EXECUTOR_IO_WORKERS: int = 4
+    EXECUTOR_CPU_WORKERS: int = 2
+    EXECUTOR_MAX_QUEUE: int = 1000
+    EXECUTOR_DEFAULT_TIMEOUT: Optional[float] = 30.0
+
+    # バックグラウンドジョブ設定
+    JOB_MAX_CONCURRENCY: int = 4
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_WORKER_HEARTBEAT: int = 10
+    JOB_RESULT_TTL: int = 86400
 
     # Sentry設定
     SENTRY_DSN: Optional[str] = None
@@ -1,3 +1,29 @@
-from .connection import SessionLocal, engine, get_db, db_session
+from .change_feed import ChangeEvent, ChangeFeed, change_feed
+from .connection import (
+    SessionLocal,
+    engine,
+    get_db,
+    db_session,
+    replicas,
+    run_in_db_session,
+)
+from .guild_config_cache import GuildConfigCache, guild_config_cache
+from .instrumentation import QueryStats, query_stats
+from .write_buffer import WriteBehindBuffer
 
-__all__ = ["SessionLocal", "engine", "get_db", "db_session"]
+__all__ = [
+    "ChangeEvent",
+    "ChangeFeed",
+    "change_feed",
+    "SessionLocal",
+    "engine",
+    "get_db",
+    "db_session",
+    "replicas",
+    "run_in_db_session",
+    "GuildConfigCache",
+    "guild_config_cache",
+    "QueryStats",
+    "query_stats",
+    "WriteBehindBuffer",
+]
@@ -0,0 +1,207 @@
+import asyncio
+import inspect
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+from core import get_settings
+from utils.executor import run_blocking
+from utils.metrics import metrics
+
+settings = get_settings()
+
+logger = logging.getLogger("discord")
+
+ChangeHandler = Callable[["ChangeEvent"], Any]
+ResyncHandler = Callable[[], Any]
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """
+    テーブルの変更通知
+    op: "INSERT" / "UPDATE" / "DELETE"
+    values: トリガーで指定した列の値（DELETEでは削除前の値）
+    old: UPDATEでの変更前の値（それ以外は空）
+    """
+
+    table: str
+    op: str
+    id: int
+    values: Dict[str, Any] = field(default_factory=dict)
+    old: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "ChangeEvent":
+        data = json.loads(payload)
+        return cls(
+            table=data.pop("table"),
+            op=data.pop("op"),
+            id=int(data.pop("id")),
+            old=data.pop("old", None) or {},
+            values=data,
+        )
+
+
+class ChangeFeed:
+    """
+    PostgresのLISTEN/NOTIFYでテーブルの変更を受け取り、購読しているハンドラーに配信する
+    他プロセス（Webダッシュボード・移行ジョブ・他シャード）による変更もポーリングなしで受け取れる
+    通知はイベントループで専用の接続のソケットを監視して受信する
+    切断中の通知は失われるため、再接続時に resync ハンドラーを呼ぶ（キャッシュの全破棄などを行う）
+    """
+
+    CHANNEL = "table_changes"
+
+    def __init__(self, dsn: str, reconnect_max: float = 30.0):
+        self.dsn = dsn
+        self.reconnect_max = reconnect_max
+        self._handlers: Dict[str, List[ChangeHandler]] = {}
+        self._resync_handlers: List[ResyncHandler] = []
+        self._conn: Optional[psycopg2.extensions.connection] = None
+        # 切断後は connection.fileno() が失敗するため、監視中のfdを保持しておく
+        self._fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lost = asyncio.Event()
+
+    def subscribe(self, table: str, handler: ChangeHandler) -> None:
+        """
+        テーブルの変更ハンドラーを登録（同期関数・コルーチン関数のどちらでもよい）
+        """
+        self._handlers.setdefault(table, []).append(handler)
+
+    def unsubscribe(self, table: str, handler: ChangeHandler) -> None:
+        handlers = self._handlers.get(table, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def on_resync(self, handler: ResyncHandler) -> None:
+        """
+        再接続時（通知を取りこぼした可能性がある場合）に呼ばれるハンドラーを登録
+        """
+        self._resync_handlers.append(handler)
+
+    def remove_resync(self, handler: ResyncHandler) -> None:
+        if handler in self._resync_handlers:
+            self._resync_handlers.remove(handler)
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None
+
+    def start(self) -> None:
+        """
+        受信を開始する（イベントループ内から呼ぶ）
+        """
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._lost = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    def stop(self) -> None:
+        """
+        受信を停止する
+        直後に start() を呼んでも再開できるよう、タスクの終了を待たずに切断する
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._disconnect()
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        first = True
+        while True:
+            try:
+                self._conn = await run_blocking(self._connect, pool="io")
+            except psycopg2.Error as e:
+                logger.warning(f"Change feed connection failed: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.reconnect_max)
+                continue
+            backoff = 1.0
+            self._lost.clear()
+            self._fd = self._conn.fileno()
+            self._loop.add_reader(self._fd, self._on_readable)
+            logger.info(f"Listening for table changes on {self.CHANNEL}")
+            if not first:
+                metrics.inc("change_feed_resyncs_total")
+                self._resync()
+            first = False
+            await self._lost.wait()
+            self._disconnect()
+
+    def _connect(self) -> psycopg2.extensions.connection:
+        conn = psycopg2.connect(
+            self.dsn,
+            connect_timeout=settings.DB_CONNECT_TIMEOUT,
+            # 無通信の切断を検知するためにTCPキープアライブを有効にする
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+            keepalives_count=3,
+        )
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.CHANNEL}")
+        return conn
+
+    def _disconnect(self) -> None:
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+        if self._conn is None:
+            return
+        try:
+            self._conn.close()
+        except psycopg2.Error:
+            pass
+        self._conn = None
+
+    def _on_readable(self) -> None:
+        try:
+            self._conn.poll()
+        except psycopg2.Error as e:
+            # 後片付けより先に再接続を要求し、後片付けが失敗しても再接続されるようにする
+            self._lost.set()
+            logger.warning(f"Change feed disconnected: {e}")
+            if self._fd is not None:
+                self._loop.remove_reader(self._fd)
+                self._fd = None
+            return
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            try:
+                event = ChangeEvent.from_payload(notify.payload)
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"Invalid change notification: {notify.payload!r}")
+                continue
+            metrics.inc("change_feed_events_total", table=event.table, op=event.op)
+            self._dispatch(event)
+
+    def _dispatch(self, event: ChangeEvent) -> None:
+        for handler in list(self._handlers.get(event.table, ())):
+            self._call(handler, event)
+
+    def _resync(self) -> None:
+        for handler in list(self._resync_handlers):
+            self._call(handler)
+
+    def _call(self, handler: Callable[..., Any], *args: Any) -> None:
+        try:
+            result = handler(*args)
+            if inspect.isawaitable(result):
+                self._loop.create_task(result)
+        except Exception as e:
+            logger.error(f"Change feed handler {handler!r} failed: {e}")
+
+
+change_feed = ChangeFeed(
+    settings.DATABASE_URI, reconnect_max=settings.CHANGE_FEED_RECONNECT_MAX
+)
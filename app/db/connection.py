@@ -1,17 +1,149 @@
-from contextlib import contextmanager
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.selectable import Select
 
 try:
     from core import get_settings
 except ImportError:
     from core.config import get_settings
 
+from db.instrumentation import instrument_engine, query_scope
+from utils.circuit_breaker import get_breaker
+from utils.executor import run_blocking
+from utils.metrics import metrics
+
+T = TypeVar("T")
+
+logger = logging.getLogger("discord")
+
 settings = get_settings()
 
-engine = create_engine(settings.DATABASE_URI)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_CONNECT_ARGS = {"connect_timeout": settings.DB_CONNECT_TIMEOUT}
+
+
+def _is_db_failure(e: BaseException) -> bool:
+    """
+    接続障害をDBの障害とみなす
+    statement_timeoutによるキャンセル（57014）と、デッドロック・直列化失敗などの
+    トランザクションのロールバック（クラス40）はクエリ側の問題のため除く
+    """
+    if not isinstance(e, (OperationalError, InterfaceError)):
+        return False
+    pgcode = getattr(e.orig, "pgcode", None) or ""
+    return pgcode != "57014" and not pgcode.startswith("40")
+
+
+db_breaker = get_breaker("postgres", is_failure=_is_db_failure)
+
+engine = create_engine(settings.DATABASE_URI, connect_args=_CONNECT_ARGS)
+if settings.DB_INSTRUMENTATION:
+    instrument_engine(engine)
+
+
+class ReplicaPool:
+    """
+    リードレプリカのエンジン群
+    ラウンドロビンで選択し、接続に失敗したレプリカは一定時間除外する
+    """
+
+    def __init__(self, uris: List[str], retry_interval: float):
+        self.retry_interval = retry_interval
+        self.engines: List[Engine] = []
+        self._unhealthy_until: Dict[int, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for index, uri in enumerate(uris):
+            replica = create_engine(uri, pool_pre_ping=True, connect_args=_CONNECT_ARGS)
+            if settings.DB_INSTRUMENTATION:
+                instrument_engine(replica)
+            event.listen(replica, "handle_error", self._on_error(index))
+            self.engines.append(replica)
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def _on_error(self, index: int):
+        def handle_error(context):
+            if context.is_disconnect:
+                self.mark_unhealthy(index)
+
+        return handle_error
+
+    def mark_unhealthy(self, index: int):
+        with self._lock:
+            self._unhealthy_until[index] = time.monotonic() + self.retry_interval
+        metrics.inc("db_replica_unhealthy_total", replica=str(index))
+        logger.warning(
+            f"Read replica {index} marked unhealthy for {self.retry_interval}s"
+        )
+
+    def connect(self) -> Optional[Connection]:
+        """
+        正常なレプリカへの接続を取得する。全て利用できない場合はNone
+        """
+        if not self.engines:
+            return None
+        start = next(self._counter)
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self._unhealthy_until.get(index, 0.0) > time.monotonic():
+                continue
+            try:
+                connection = self.engines[index].connect()
+            except DBAPIError:
+                self.mark_unhealthy(index)
+                continue
+            metrics.inc("db_session_reads_total", target=f"replica{index}")
+            return connection
+        metrics.inc("db_session_reads_total", target="primary_fallback")
+        return None
+
+    def status(self) -> Dict[str, bool]:
+        now = time.monotonic()
+        return {
+            f"replica{index}": self._unhealthy_until.get(index, 0.0) <= now
+            for index in range(len(self.engines))
+        }
+
+
+replicas = ReplicaPool(
+    settings.DATABASE_REPLICA_URIS, settings.DB_REPLICA_RETRY_INTERVAL
+)
+
+
+class RoutingSession(Session):
+    """
+    readonlyセッションの読み取りをレプリカへ、書き込み・フラッシュ・行ロックをプライマリへ振り分ける
+    一度書き込んだセッションは、レプリカの遅延で自分の書き込みが見えなくならないよう以降もプライマリを使う
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None or self.info.get("wrote"):
+            return engine
+        if (
+            self._flushing
+            or isinstance(clause, UpdateBase)
+            or (isinstance(clause, Select) and clause._for_update_arg is not None)
+        ):
+            self.info["wrote"] = True
+            return engine
+        return replica
+
+
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, class_=RoutingSession
+)
 
 
 def get_db():
@@ -21,25 +153,56 @@ def get_db():
     """
     db = SessionLocal()
     try:
-        yield db
+        with query_scope():
+            yield db
     finally:
         db.close()
 
 
 @contextmanager
-def db_session():
+def db_session(readonly: bool = False):
     """
     with句で使用できるデータベースセッションのコンテキストマネージャ
+    readonly=True の場合、読み取りはリードレプリカに送られる（レプリカ未設定・全滅時はプライマリ）
+    プライマリのサーキットが開いている間は接続を待たずにCircuitOpenErrorを送出する
     使用例:
     with db_session() as db:
         user = db.query(User).filter(User.id == user_id).first()
     """
-    db = SessionLocal()
+    replica = replicas.connect() if readonly else None
+    guard = db_breaker.guard() if replica is None else nullcontext()
+    db = SessionLocal(info={"replica": replica})
     try:
-        yield db
-        db.commit()
+        with guard, query_scope():
+            yield db
+            db.commit()
     except Exception as e:
         db.rollback()
         raise e
     finally:
         db.close()
+        if replica is not None:
+            replica.close()
+
+
+async def run_in_db_session(
+    func: Callable[..., T], *args: Any, readonly: bool = False, **kwargs: Any
+) -> T:
+    """
+    db_session内でfunc(db, *args, **kwargs)をDB用スレッドプールで実行する
+    使用例:
+    items = await run_in_db_session(crud_item.get_multi, readonly=True, limit=10)
+    """
+
+    def call() -> T:
+        try:
+            with db_session(readonly=readonly) as db:
+                return func(db, *args, **kwargs)
+        except DBAPIError as e:
+            if not readonly or not e.connection_invalidated:
+                raise
+        # 実行中にレプリカが切断された場合はプライマリで再試行する
+        with db_session() as db:
+            return func(db, *args, **kwargs)
+
+    return await run_blocking(call, pool="db")
@@ -1,3 +1,4 @@
+from .guild_config import guild_config
 from .item import item
 
-__all__ = ["item"]
+__all__ = ["guild_config", "item"]
@@ -1,13 +1,25 @@
+from functools import lru_cache
 from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Select, delete, inspect, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
 from db.models.base import BaseModel as DBBaseModel
 
 ModelType = TypeVar("ModelType", bound=DBBaseModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
+SchemaType = TypeVar("SchemaType", bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[SchemaType]) -> TypeAdapter:
+    """
+    スキーマごとのリスト用TypeAdapterを取得（キャッシュ）
+    """
+    return TypeAdapter(List[schema])
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
@@ -35,6 +47,40 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         return db.query(self.model).offset(skip).limit(limit).all()
 
+    def get_multi_as(
+        self,
+        db: Session,
+        schema: Type[SchemaType],
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        trusted: bool = False,
+    ) -> List[SchemaType]:
+        """
+        複数件をスキーマのリストとして取得（ページング対応）
+        スキーマが必要とする列のみをSELECTし、キャッシュしたTypeAdapterで一括検証する
+        trusted=True の場合はDBの値を信頼して検証を省略する
+        """
+        stmt = select(*self._schema_columns(schema)).offset(skip).limit(limit)
+        return self._rows_as(db, schema, stmt, trusted=trusted)
+
+    def _schema_columns(self, schema: Type[SchemaType]) -> list:
+        columns = self.model.__table__.columns
+        return [columns[name] for name in schema.model_fields if name in columns]
+
+    def _rows_as(
+        self,
+        db: Session,
+        schema: Type[SchemaType],
+        stmt: Select,
+        *,
+        trusted: bool = False,
+    ) -> List[SchemaType]:
+        rows = db.execute(stmt).mappings().all()
+        if trusted:
+            return [schema.model_construct(**row) for row in rows]
+        return _list_adapter(schema).validate_python([dict(row) for row in rows])
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         """
         新規作成
@@ -48,6 +94,17 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db.refresh(db_obj)
         return db_obj
 
+    def _to_update_dict(
+        self, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        if isinstance(obj_in, dict):
+            return obj_in
+        return (
+            obj_in.model_dump(exclude_unset=True)
+            if hasattr(obj_in, "model_dump")
+            else obj_in.dict(exclude_unset=True)
+        )
+
     def update(
         self,
         db: Session,
@@ -58,34 +115,105 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         更新
         """
-        obj_data = {
-            column.name: getattr(db_obj, column.name)
-            for column in db_obj.__table__.columns
-        }
-
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = (
-                obj_in.model_dump(exclude_unset=True)
-                if hasattr(obj_in, "model_dump")
-                else obj_in.dict(exclude_unset=True)
-            )
+        update_data = self._to_update_dict(obj_in)
+        columns = db_obj.__table__.columns.keys()
 
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        for field, value in update_data.items():
+            if field in columns:
+                setattr(db_obj, field, value)
 
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
-    def remove(self, db: Session, *, id: int) -> ModelType:
+    def update_by_id(
+        self,
+        db: Session,
+        *,
+        id: int,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        expected_version: Optional[int] = None,
+    ) -> Optional[ModelType]:
         """
-        削除
+        事前のSELECTなしで、UPDATE ... RETURNING 1回で更新
+        モデルにversion列があれば自動で加算し、expected_versionを指定すると
+        楽観的排他制御を行う（不一致の場合はStaleDataError）
+        返されるオブジェクトはセッションから切り離される
+        対象が存在しない場合はNoneを返す
+        """
+        columns = self.model.__table__.columns.keys()
+        values = {
+            field: value
+            for field, value in self._to_update_dict(obj_in).items()
+            if field in columns
+        }
+        stmt = update(self.model).where(self.model.id == id)
+        stmt = self._apply_version(stmt, values, expected_version)
+        obj = self._execute_returning(db, stmt.values(**values))
+        if obj is None and expected_version is not None:
+            raise StaleDataError(
+                f"{self.model.__name__} {id} was not found or version "
+                f"{expected_version} is stale"
+            )
+        return obj
+
+    def delete_by_id(
+        self, db: Session, *, id: int, expected_version: Optional[int] = None
+    ) -> Optional[ModelType]:
+        """
+        事前のSELECTなしで、DELETE ... RETURNING 1回で削除
+        対象が存在しない場合はNoneを返す
         """
-        obj = db.query(self.model).get(id)
-        db.delete(obj)
+        stmt = delete(self.model).where(self.model.id == id)
+        stmt = self._apply_version(stmt, None, expected_version)
+        obj = self._execute_returning(db, stmt)
+        if obj is None and expected_version is not None:
+            raise StaleDataError(
+                f"{self.model.__name__} {id} was not found or version "
+                f"{expected_version} is stale"
+            )
+        return obj
+
+    def _apply_version(
+        self,
+        stmt,
+        values: Optional[Dict[str, Any]],
+        expected_version: Optional[int],
+    ):
+        version = getattr(self.model, "version", None)
+        if version is None:
+            if expected_version is not None:
+                raise ValueError(f"{self.model.__name__} has no version column")
+            return stmt
+        if values is not None:
+            values["version"] = version + 1
+        if expected_version is not None:
+            stmt = stmt.where(version == expected_version)
+        return stmt
+
+    def _execute_returning(self, db: Session, stmt) -> Optional[ModelType]:
+        """
+        RETURNINGで結果の行を取得してコミットする
+        呼び出し元が同じ行をセッション内に保持していた場合はその（最新の値に更新された）
+        インスタンスを返し、セッションから切り離さない
+        """
+        existing = set(db.identity_map.keys())
+        obj = db.scalars(
+            stmt.returning(self.model),
+            execution_options={
+                "synchronize_session": False,
+                "populate_existing": True,
+            },
+        ).first()
+        if obj is not None and inspect(obj).identity_key not in existing:
+            # commit時にexpireされて再SELECTが走らないよう切り離す
+            db.expunge(obj)
         db.commit()
         return obj
+
+    def remove(self, db: Session, *, id: int) -> Optional[ModelType]:
+        """
+        削除
+        """
+        return self.delete_by_id(db, id=id)
@@ -0,0 +1,70 @@
+from typing import Any, Dict, Iterable, List, Optional, Type, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from db.crud.base import CRUDBase, SchemaType
+from db.models.guild_config import GuildConfig
+from db.schemas.guild_config import GuildConfigCreate, GuildConfigUpdate
+
+
+class CRUDGuildConfig(CRUDBase[GuildConfig, GuildConfigCreate, GuildConfigUpdate]):
+    """
+    サーバー設定のCRUD操作
+    """
+
+    def get_by_guild(self, db: Session, *, guild_id: int) -> Optional[GuildConfig]:
+        """
+        サーバーIDで1件取得
+        """
+        return db.scalars(
+            select(GuildConfig).where(GuildConfig.guild_id == guild_id)
+        ).first()
+
+    def get_by_guilds_as(
+        self,
+        db: Session,
+        schema: Type[SchemaType],
+        *,
+        guild_ids: Iterable[int],
+        trusted: bool = False,
+    ) -> List[SchemaType]:
+        """
+        複数サーバーの設定をスキーマのリストとして1回のクエリで取得
+        設定が保存されていないサーバーは含まれない
+        """
+        stmt = select(*self._schema_columns(schema)).where(
+            GuildConfig.guild_id.in_(list(guild_ids))
+        )
+        return self._rows_as(db, schema, stmt, trusted=trusted)
+
+    def upsert(
+        self,
+        db: Session,
+        *,
+        guild_id: int,
+        obj_in: Union[GuildConfigUpdate, Dict[str, Any]],
+    ) -> GuildConfig:
+        """
+        INSERT ... ON CONFLICT DO UPDATE 1回で作成または更新
+        返されるオブジェクトはセッションから切り離される
+        """
+        columns = self.model.__table__.columns.keys()
+        values = {
+            field: value
+            for field, value in self._to_update_dict(obj_in).items()
+            if field in columns and field not in ("id", "guild_id")
+        }
+        stmt = (
+            insert(GuildConfig)
+            .values(guild_id=guild_id, **values)
+            .on_conflict_do_update(
+                index_elements=[GuildConfig.guild_id],
+                set_={**values, "updated_at": func.now()},
+            )
+        )
+        return self._execute_returning(db, stmt)
+
+
+guild_config = CRUDGuildConfig(GuildConfig)
@@ -1,9 +1,19 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from sqlalchemy import func, literal_column, or_, select, text
 from sqlalchemy.orm import Session
 
-from db.crud.base import CRUDBase
-from db.models.item import Item
+from core import get_settings
+from db.crud.base import CRUDBase, SchemaType
+from db.models.item import Item, ItemOwnerCount
 from db.schemas.item import ItemCreate, ItemUpdate
 
+settings = get_settings()
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
 
 class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
     """
@@ -40,5 +50,122 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
             .all()
         )
 
+    def get_multi_by_owner_as(
+        self,
+        db: Session,
+        schema: Type[SchemaType],
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        trusted: bool = False,
+    ) -> List[SchemaType]:
+        """
+        所有者IDで複数件をスキーマのリストとして取得
+        """
+        stmt = (
+            select(*self._schema_columns(schema))
+            .where(Item.owner_id == owner_id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return self._rows_as(db, schema, stmt, trusted=trusted)
+
+    def search(
+        self,
+        db: Session,
+        *,
+        query: str,
+        owner_id: Optional[int] = None,
+        limit: int = 25,
+    ) -> List[Tuple[Item, float]]:
+        """
+        タイトルの全文検索＋あいまい検索
+        全文検索のランクとトライグラム類似度の高い方でスコア付けし、降順で返す
+        """
+        vector = func.to_tsvector(literal_column("'simple'"), Item.title)
+        tsquery = func.websearch_to_tsquery(literal_column("'simple'"), query)
+        score = func.greatest(
+            func.ts_rank(vector, tsquery), func.similarity(Item.title, query)
+        ).label("score")
+
+        stmt = (
+            select(Item, score)
+            .where(or_(vector.op("@@")(tsquery), Item.title.op("%")(query)))
+            .order_by(score.desc(), Item.id)
+            .limit(limit)
+        )
+        if owner_id is not None:
+            stmt = stmt.where(Item.owner_id == owner_id)
+        return [(row.Item, row.score) for row in db.execute(stmt)]
+
+    def autocomplete(
+        self,
+        db: Session,
+        *,
+        prefix: str,
+        owner_id: Optional[int] = None,
+        limit: int = 25,
+    ) -> List[Tuple[int, str]]:
+        """
+        タイトルの前方一致検索（スラッシュコマンドのオートコンプリート用）
+        (id, title) のみを返し、応答期限を超えないようstatement_timeoutを設定する
+        （タイムアウトは同一トランザクション内の以降のクエリにも適用される）
+        """
+        db.execute(
+            text("SELECT set_config('statement_timeout', :timeout, true)"),
+            {"timeout": str(settings.SEARCH_AUTOCOMPLETE_TIMEOUT_MS)},
+        )
+        key = func.lower(Item.title).collate("C")
+        stmt = (
+            select(Item.id, Item.title)
+            .where(key.like(_escape_like(prefix.lower()) + "%", escape="!"))
+            .order_by(key)
+            .limit(limit)
+        )
+        if owner_id is not None:
+            stmt = stmt.where(Item.owner_id == owner_id)
+        return [(row.id, row.title) for row in db.execute(stmt)]
+
+    def count_by_owner(self, db: Session, *, owner_id: int) -> int:
+        """
+        所有者のアイテム数（集計テーブルから取得するためテーブルの大きさに依存しない）
+        """
+        count = db.scalar(
+            select(ItemOwnerCount.item_count).where(ItemOwnerCount.owner_id == owner_id)
+        )
+        return count or 0
+
+    def counts_for_owners(
+        self, db: Session, *, owner_ids: Iterable[int]
+    ) -> Dict[int, int]:
+        """
+        複数の所有者のアイテム数を1回のクエリで取得（アイテムがない所有者は0）
+        """
+        owner_ids = list(owner_ids)
+        counts = dict.fromkeys(owner_ids, 0)
+        if owner_ids:
+            rows = db.execute(
+                select(ItemOwnerCount.owner_id, ItemOwnerCount.item_count).where(
+                    ItemOwnerCount.owner_id.in_(owner_ids)
+                )
+            )
+            counts.update(rows.tuples().all())
+        return counts
+
+    def top_owners(
+        self, db: Session, *, limit: int = 10, skip: int = 0
+    ) -> List[Tuple[int, int]]:
+        """
+        アイテム数の多い順に (所有者ID, アイテム数) を取得（ランキング用）
+        """
+        stmt = (
+            select(ItemOwnerCount.owner_id, ItemOwnerCount.item_count)
+            .order_by(ItemOwnerCount.item_count.desc(), ItemOwnerCount.owner_id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(db.execute(stmt).tuples())
+
 
 item = CRUDItem(Item)
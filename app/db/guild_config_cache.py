@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+import redis
+
+from core import get_settings
+from db.connection import run_in_db_session
+from db.crud.guild_config import guild_config as crud_guild_config
+from db.schemas.guild_config import GuildConfigBase, GuildConfigUpdate
+from utils.circuit_breaker import CircuitOpenError
+from utils.executor import run_blocking
+from utils.metrics import metrics
+from utils.redis import RedisCrud
+
+settings = get_settings()
+
+logger = logging.getLogger("discord")
+
+
+class GuildConfigCache:
+    """
+    サーバー設定をプロセス内に保持し、メッセージ処理などのホットパスでは辞書の参照のみで返す
+    サーバーが利用可能になった時点でまとめて読み込み、更新時はRedisのPub/Subで
+    他プロセスのキャッシュを無効化する
+    無効化された設定は読み込み直すまで古い値を返し続ける（既定値に戻って見えることはない）
+    返される設定は共有オブジェクトのため、読み取り専用として扱うこと
+    """
+
+    CHANNEL = "guild_config:invalidate"
+
+    def __init__(self, preload_delay: float = 0.05, batch_size: int = 500):
+        self.preload_delay = preload_delay
+        self.batch_size = batch_size
+        self._configs: Dict[int, GuildConfigBase] = {}
+        # 無効化・更新のたびに進める（読み込み中に更新された値で上書きしないため）
+        self._epochs: Dict[int, int] = {}
+        self._pending: Set[int] = set()
+        # 無効化済みで読み込み直し待ちのサーバー（値は古いまま返す）
+        self._stale: Set[int] = set()
+        # このプロセスが保存した行の updated_at（自身の更新による変更通知を無視するため）
+        self._saved_at: Dict[int, datetime] = {}
+        self._flush_scheduled = False
+        self._origin = uuid.uuid4().hex
+        self._crud = RedisCrud(db=0)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[threading.Thread] = None
+        # 停止後すぐに再開しても古いスレッドが終了するよう、スレッドごとに作り直す
+        self._stop = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._configs
+
+    def get(self, guild_id: int) -> GuildConfigBase:
+        """
+        サーバー設定を取得（クエリは実行しない）
+        未読み込みの場合は既定値を返し、バックグラウンドで読み込む
+        """
+        config = self._configs.get(guild_id)
+        if config is not None:
+            return config
+        metrics.inc("guild_config_cache_misses_total")
+        try:
+            self.preload(guild_id)
+        except RuntimeError:
+            # イベントループ外からの呼び出し
+            pass
+        return GuildConfigBase(guild_id=guild_id)
+
+    def preload(self, guild_id: int) -> None:
+        """
+        読み込みを予約する。preload_delay秒以内の予約は1回のクエリにまとめる
+        """
+        self._pending.add(guild_id)
+        if self._flush_scheduled:
+            return
+        loop = asyncio.get_running_loop()
+        self._flush_scheduled = True
+        loop.call_later(self.preload_delay, lambda: loop.create_task(self._flush()))
+
+    def preload_many(self, guild_ids: Iterable[int]) -> None:
+        for guild_id in guild_ids:
+            if guild_id not in self._configs:
+                self.preload(guild_id)
+
+    async def _flush(self) -> None:
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, set()
+        if pending:
+            await self.load(pending)
+
+    async def load(self, guild_ids: Iterable[int]) -> None:
+        """
+        指定したサーバーの設定をbatch_size件ずつまとめて読み込む
+        設定が保存されていないサーバーは既定値をキャッシュする
+        """
+        guild_ids = list(guild_ids)
+        for start in range(0, len(guild_ids), self.batch_size):
+            chunk = guild_ids[start : start + self.batch_size]
+            epochs = {guild_id: self._epochs.get(guild_id, 0) for guild_id in chunk}
+            try:
+                # 更新直後の無効化でも古い値を読まないよう、レプリカではなくプライマリから読む
+                rows: List[GuildConfigBase] = await run_in_db_session(
+                    crud_guild_config.get_by_guilds_as,
+                    GuildConfigBase,
+                    guild_ids=chunk,
+                    trusted=True,
+                )
+            except Exception as e:
+                logger.warning(f"Failed to load guild configs: {e}")
+                metrics.inc("guild_config_load_errors_total")
+                continue
+            found = {row.guild_id: row for row in rows}
+            for guild_id in chunk:
+                if self._epochs.get(guild_id, 0) != epochs[guild_id]:
+                    continue
+                self._configs[guild_id] = found.get(
+                    guild_id, GuildConfigBase(guild_id=guild_id)
+                )
+                self._stale.discard(guild_id)
+            metrics.inc("guild_config_loads_total")
+        metrics.set_gauge("guild_config_cache_size", len(self._configs))
+
+    async def update(
+        self,
+        guild_id: int,
+        obj_in: Union[GuildConfigUpdate, Dict[str, Any]],
+    ) -> GuildConfigBase:
+        """
+        設定を保存してキャッシュを更新し、他プロセスに無効化を通知する
+        """
+        row = await run_in_db_session(
+            crud_guild_config.upsert, guild_id=guild_id, obj_in=obj_in
+        )
+        config = GuildConfigBase.model_validate(row)
+        self._saved_at[guild_id] = row.updated_at
+        self._bump(guild_id)
+        self._configs[guild_id] = config
+        self._stale.discard(guild_id)
+        try:
+            await run_blocking(self._publish, guild_id, pool="io")
+        except (CircuitOpenError, redis.RedisError) as e:
+            logger.warning(f"Failed to publish guild config invalidation: {e}")
+        return config
+
+    def invalidate(self, guild_id: int) -> None:
+        """
+        読み込み直す。読み込みが終わるまでは古い値を返す
+        """
+        self._bump(guild_id)
+        if guild_id in self._configs:
+            self._stale.add(guild_id)
+            self.preload(guild_id)
+
+    def on_change(self, guild_id: int, updated_at: Optional[datetime]) -> None:
+        """
+        DBの変更通知を反映する。このプロセスが update() で保存した変更であれば何もしない
+        """
+        if updated_at is not None and self._saved_at.get(guild_id) == updated_at:
+            return
+        self.invalidate(guild_id)
+
+    def evict(self, guild_id: int) -> None:
+        """
+        キャッシュから削除する（サーバーから退出した場合など）
+        """
+        self._bump(guild_id)
+        self._configs.pop(guild_id, None)
+        self._pending.discard(guild_id)
+        self._stale.discard(guild_id)
+        self._saved_at.pop(guild_id, None)
+
+    def _bump(self, guild_id: int) -> None:
+        self._epochs[guild_id] = self._epochs.get(guild_id, 0) + 1
+
+    def _publish(self, guild_id: int) -> None:
+        message = json.dumps({"guild_id": guild_id, "origin": self._origin})
+        self._crud.connect.publish(self.CHANNEL, message)
+
+    def start(self) -> None:
+        """
+        無効化通知の購読を開始する（イベントループ内から呼ぶ）
+        """
+        if (
+            self._listener is not None
+            and self._listener.is_alive()
+            and not self._stop.is_set()
+        ):
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stop = threading.Event()
+        self._listener = threading.Thread(
+            target=self._listen, args=(self._stop,), daemon=True
+        )
+        self._listener.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _listen(self, stop: threading.Event) -> None:
+        backoff = 1.0
+        reconnecting = False
+        while not stop.is_set():
+            pubsub = self._crud.connect.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.CHANNEL)
+                if reconnecting:
+                    # 切断中の通知は失われるため、キャッシュ済みの設定を全て読み込み直す
+                    logger.info("Guild config listener reconnected; reloading cache")
+                    self._loop.call_soon_threadsafe(self.invalidate_all)
+                    reconnecting = False
+                backoff = 1.0
+                while not stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._on_message(message["data"])
+            except redis.RedisError as e:
+                logger.warning(f"Guild config listener disconnected: {e}")
+                reconnecting = True
+                stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                pubsub.close()
+
+    def _on_message(self, data: bytes) -> None:
+        try:
+            message = json.loads(data)
+            guild_id = int(message["guild_id"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Invalid guild config invalidation: {data!r}")
+            return
+        if message.get("origin") == self._origin:
+            return
+        metrics.inc("guild_config_invalidations_total")
+        self._loop.call_soon_threadsafe(self.invalidate, guild_id)
+
+    def invalidate_all(self) -> None:
+        """
+        キャッシュ済みの設定を全て読み込み直す（変更通知を取りこぼした可能性がある場合）
+        """
+        for guild_id in list(self._configs):
+            self.invalidate(guild_id)
+
+
+guild_config_cache = GuildConfigCache(
+    preload_delay=settings.GUILD_CONFIG_PRELOAD_DELAY,
+    batch_size=settings.GUILD_CONFIG_BATCH_SIZE,
+)
@@ -0,0 +1,227 @@
+import hashlib
+import logging
+import pathlib
+import re
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Literal, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core import get_settings
+from utils.metrics import metrics
+from utils.tracing import tracer
+
+logger = logging.getLogger("discord")
+settings = get_settings()
+
+_APP_DIR = str(pathlib.Path(__file__).resolve().parents[1])
+_IGNORED_FILES = {
+    str(pathlib.Path(__file__).resolve()),
+    str(pathlib.Path(__file__).resolve().with_name("connection.py")),
+}
+
+# db_session()スコープ内での正規化SQLごとの実行回数
+_scope: ContextVar[Optional[Dict[str, int]]] = ContextVar(
+    "db_query_scope", default=None
+)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+# :name はPostgresのキャスト（::text）を除く
+_PARAM_RE = re.compile(r"%\([^)]+\)s|%s|\?|(?<!:):(?!:)\w+")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_VALUES_RE = re.compile(r"\bVALUES\s*(\((?:\s*\?\s*,?)+\)\s*,?\s*)+", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    """
+    リテラルとパラメータを ? に置き換え、同じ形のSQLを同一視できるようにする
+    """
+    sql = _STRING_RE.sub("?", statement)
+    sql = _PARAM_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (?)", sql)
+    sql = _VALUES_RE.sub("VALUES (?) ", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(normalized: str) -> str:
+    """
+    メトリクスのラベル用に正規化SQLを短いハッシュにする
+    """
+    return hashlib.md5(normalized.encode("utf-8"), usedforsecurity=False).hexdigest()[
+        :12
+    ]
+
+
+def _call_site() -> str:
+    """
+    クエリを発行したアプリケーション側の呼び出し元を特定する
+    """
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(_APP_DIR) and frame.filename not in _IGNORED_FILES:
+            path = frame.filename.removeprefix(_APP_DIR).lstrip("/")
+            return f"{path}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class _StatementStats:
+    __slots__ = ("sql", "count", "total", "max", "slow", "n_plus_one", "last_site")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.n_plus_one = 0
+        self.last_site: Optional[str] = None
+
+
+class QueryStats:
+    """
+    正規化SQLごとの実行統計
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _StatementStats] = {}
+
+    def _get(self, sql: str) -> _StatementStats:
+        stats = self._stats.get(sql)
+        if stats is None:
+            stats = self._stats[sql] = _StatementStats(sql)
+        return stats
+
+    def record(self, sql: str, duration: float, slow_site: Optional[str] = None):
+        with self._lock:
+            stats = self._get(sql)
+            stats.count += 1
+            stats.total += duration
+            stats.max = max(stats.max, duration)
+            if slow_site is not None:
+                stats.slow += 1
+                stats.last_site = slow_site
+
+    def record_n_plus_one(self, sql: str, site: str):
+        with self._lock:
+            stats = self._get(sql)
+            stats.n_plus_one += 1
+            stats.last_site = site
+
+    def top(
+        self, n: int = 10, sort: Literal["total", "count", "max"] = "total"
+    ) -> List[Dict[str, object]]:
+        """
+        指定した指標の上位n件を取得
+        """
+        with self._lock:
+            ranked = sorted(
+                self._stats.values(), key=lambda s: getattr(s, sort), reverse=True
+            )[:n]
+            return [
+                {
+                    "sql": s.sql,
+                    "fingerprint": fingerprint(s.sql),
+                    "count": s.count,
+                    "total": s.total,
+                    "avg": s.total / s.count if s.count else 0.0,
+                    "max": s.max,
+                    "slow": s.slow,
+                    "n_plus_one": s.n_plus_one,
+                    "last_site": s.last_site,
+                }
+                for s in ranked
+            ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStats()
+
+
+@contextmanager
+def query_scope():
+    """
+    N+1検出の単位となるスコープ（db_session()ごとに1つ）
+    ネストした場合は外側のスコープに合算する
+    """
+    if _scope.get() is not None:
+        yield
+        return
+    token = _scope.set({})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started_at = time.perf_counter()
+    context._trace_span = None
+    if tracer.active():
+        context._trace_span = tracer.start_span(
+            normalize_sql(statement)[:80], "sql", executemany=executemany
+        )
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    if context is not None:
+        tracer.finish_span(
+            getattr(context, "_trace_span", None),
+            error=type(exception_context.original_exception).__name__,
+        )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, "_query_started_at", None)
+    if started_at is None:
+        return
+    duration = time.perf_counter() - started_at
+    sql = normalize_sql(statement)
+    label = fingerprint(sql)
+    tracer.finish_span(getattr(context, "_trace_span", None), statement=label)
+
+    slow_site = None
+    if duration * 1000 >= settings.DB_SLOW_QUERY_MS:
+        slow_site = _call_site()
+        metrics.inc("db_slow_queries_total", statement=label)
+        logger.warning(
+            f"Slow query ({duration * 1000:.1f} ms) at {slow_site}: {sql[:500]}"
+        )
+    query_stats.record(sql, duration, slow_site)
+    metrics.observe("db_query_seconds", duration, statement=label)
+
+    scope = _scope.get()
+    if scope is not None and not executemany:
+        count = scope.get(sql, 0) + 1
+        scope[sql] = count
+        if count == settings.DB_N_PLUS_ONE_THRESHOLD:
+            site = _call_site()
+            query_stats.record_n_plus_one(sql, site)
+            metrics.inc("db_n_plus_one_total", statement=label)
+            logger.warning(
+                f"Possible N+1: same query executed {count} times in one session "
+                f"at {site}: {sql[:500]}"
+            )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    エンジンにクエリ計測用のイベントフックを登録
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -1,4 +1,13 @@
-from .base import Base, BaseModel, TimeStampMixin
-from .item import Item
+from .base import Base, BaseModel, TimeStampMixin, VersionMixin
+from .guild_config import GuildConfig
+from .item import Item, ItemOwnerCount
 
-__all__ = ["Base", "BaseModel", "TimeStampMixin", "Item"]
+__all__ = [
+    "Base",
+    "BaseModel",
+    "TimeStampMixin",
+    "VersionMixin",
+    "GuildConfig",
+    "Item",
+    "ItemOwnerCount",
+]
@@ -20,6 +20,17 @@ class TimeStampMixin:
     )
 
 
+class VersionMixin:
+    """
+    楽観的排他制御用のバージョン列Mixin
+    CRUDBase.update_by_id / delete_by_id の expected_version で使用する
+    """
+
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default=text("1")
+    )
+
+
 class BaseModel(Base, TimeStampMixin):
     """
     ベースモデル
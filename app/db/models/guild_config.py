@@ -0,0 +1,29 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import JSON, BigInteger, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import text
+
+from .base import BaseModel
+
+
+class GuildConfig(BaseModel):
+    """
+    サーバーごとの設定
+    """
+
+    __tablename__ = "guild_configs"
+
+    guild_id: Mapped[int] = mapped_column(BigInteger, unique=True, index=True)
+    prefix: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)
+    locale: Mapped[str] = mapped_column(
+        String(10), default="ja", server_default=text("'ja'")
+    )
+    log_channel_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    # 個別の列を追加するほどではない設定値
+    settings: Mapped[Dict[str, Any]] = mapped_column(
+        JSON().with_variant(JSONB(), "postgresql"),
+        default=dict,
+        server_default=text("'{}'"),
+    )
@@ -1,7 +1,7 @@
-from sqlalchemy import String
+from sqlalchemy import Index, Integer, String, func, literal_column
 from sqlalchemy.orm import Mapped, mapped_column
 
-from .base import BaseModel
+from .base import Base, BaseModel
 
 
 class Item(BaseModel):
@@ -14,3 +14,47 @@ class Item(BaseModel):
     title: Mapped[str] = mapped_column(String(100), index=True)
     description: Mapped[str] = mapped_column(String(255), nullable=True)
     owner_id: Mapped[int] = mapped_column(index=True)
+
+    __table_args__ = (
+        # 部分一致・あいまい検索用（pg_trgm）
+        Index(
+            "ix_items_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        # 全文検索用
+        Index(
+            "ix_items_title_fts",
+            func.to_tsvector(literal_column("'simple'"), literal_column("title")),
+            postgresql_using="gin",
+        ),
+        # 前方一致（オートコンプリート）用
+        # COLLATE "C" によりLIKE 'prefix%'とORDER BYの両方でインデックスを使える
+        Index(
+            "ix_items_title_prefix", func.lower(literal_column("title")).collate("C")
+        ),
+        Index(
+            "ix_items_owner_title_prefix",
+            "owner_id",
+            func.lower(literal_column("title")).collate("C"),
+        ),
+    )
+
+
+class ItemOwnerCount(Base):
+    """
+    所有者ごとのアイテム数（集計テーブル）
+    itemsのトリガーで更新されるため、アプリケーションからは書き込まない
+    アイテムが0件の所有者の行は削除される
+    """
+
+    __tablename__ = "item_owner_counts"
+
+    owner_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    item_count: Mapped[int] = mapped_column(Integer)
+
+    __table_args__ = (
+        # ランキング（上位N件）用
+        Index("ix_item_owner_counts_rank", item_count.desc(), "owner_id"),
+    )
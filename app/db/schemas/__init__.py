@@ -1,10 +1,20 @@
 from .base import BaseSchema, TimestampSchema, BaseModelSchema
+from .guild_config import (
+    GuildConfig,
+    GuildConfigBase,
+    GuildConfigCreate,
+    GuildConfigUpdate,
+)
 from .item import Item, ItemCreate, ItemUpdate
 
 __all__ = [
     "BaseSchema",
     "TimestampSchema",
     "BaseModelSchema",
+    "GuildConfig",
+    "GuildConfigBase",
+    "GuildConfigCreate",
+    "GuildConfigUpdate",
     "Item",
     "ItemCreate",
     "ItemUpdate",
@@ -0,0 +1,44 @@
+from typing import Any, Dict, Optional
+
+from pydantic import Field
+
+from .base import BaseModelSchema, BaseSchema
+
+
+class GuildConfigBase(BaseSchema):
+    """
+    GuildConfigの基本スキーマ（キャッシュの値としても使用）
+    """
+
+    guild_id: int
+    prefix: Optional[str] = None
+    locale: str = "ja"
+    log_channel_id: Optional[int] = None
+    settings: Dict[str, Any] = Field(default_factory=dict)
+
+
+class GuildConfigCreate(GuildConfigBase):
+    """
+    GuildConfig作成時のスキーマ
+    """
+
+    pass
+
+
+class GuildConfigUpdate(BaseSchema):
+    """
+    GuildConfig更新時のスキーマ（指定した項目のみ更新）
+    """
+
+    prefix: Optional[str] = None
+    locale: Optional[str] = None
+    log_channel_id: Optional[int] = None
+    settings: Optional[Dict[str, Any]] = None
+
+
+class GuildConfig(GuildConfigBase, BaseModelSchema):
+    """
+    GuildConfig取得時のスキーマ
+    """
+
+    pass
@@ -0,0 +1,323 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Dict, Generic, List, Optional, Set, Tuple, Type, TypeVar
+
+from sqlalchemy import bindparam, insert, update
+
+from db.connection import _is_db_failure, db_session
+from db.models.base import BaseModel as DBBaseModel
+from utils.circuit_breaker import CircuitOpenError
+from utils.executor import run_blocking
+from utils.metrics import metrics
+
+ModelType = TypeVar("ModelType", bound=DBBaseModel)
+
+logger = logging.getLogger("discord")
+
+metrics.set_buckets(
+    "write_buffer_batch_size", (1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+)
+
+_buffers: "weakref.WeakSet[WriteBehindBuffer]" = weakref.WeakSet()
+
+
+def _is_transient(e: BaseException) -> bool:
+    """
+    時間をおけば成功しうる失敗か（接続障害・サーキットオープン・デッドロック・直列化失敗）
+    それ以外（制約違反・型の不一致など）は同じバッチを何度送っても失敗する
+    """
+    if isinstance(e, CircuitOpenError) or _is_db_failure(e):
+        return True
+    pgcode = getattr(getattr(e, "orig", None), "pgcode", None) or ""
+    return pgcode.startswith("40")
+
+
+class _Pending:
+    """
+    フラッシュ待ちの書き込み
+    """
+
+    def __init__(self):
+        self.inserts: List[Dict[str, Any]] = []
+        self.updates: Dict[int, Dict[str, Any]] = {}
+        self.increments: Dict[int, Dict[str, Any]] = {}
+        self.rows: Set[int] = set()
+        self.oldest: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.inserts) + len(self.rows)
+
+    def absorb(self, newer: "_Pending"):
+        """
+        フラッシュに失敗したバッチ（self）の後ろに、その間の新しい書き込みを重ねる
+        """
+        self.inserts.extend(newer.inserts)
+        for row_id, values in newer.updates.items():
+            self.updates.setdefault(row_id, {}).update(values)
+            increments = self.increments.get(row_id)
+            if increments:
+                for column in values:
+                    increments.pop(column, None)
+        for row_id, amounts in newer.increments.items():
+            self._add_increments(row_id, amounts)
+        self.rows |= newer.rows
+        if self.oldest is None:
+            self.oldest = newer.oldest
+
+    def _add_increments(self, row_id: int, amounts: Dict[str, Any]):
+        updates = self.updates.get(row_id, {})
+        increments = self.increments.setdefault(row_id, {})
+        for column, amount in amounts.items():
+            if column in updates:
+                # 値の設定後の加算は設定値に畳み込む
+                updates[column] += amount
+            else:
+                increments[column] = increments.get(column, 0) + amount
+
+
+class WriteBehindBuffer(Generic[ModelType]):
+    """
+    高頻度のDB書き込みをメモリ上で集約し、まとめてフラッシュするバッファ
+    - add: INSERTを蓄積し、executemanyで一括挿入
+    - update: 同じ行への更新は後勝ちでマージ
+    - increment: 同じ行・列への加算は合計してから1回のUPDATEにまとめる
+    件数がflush_sizeに達するか、最古の書き込みからflush_interval秒経過でフラッシュする
+    一時的な障害で失敗したバッチは次回に再送し、それ以外の失敗は1行ずつ書き込み直して
+    失敗する行のみをログに出力して破棄する
+    Cogで使う場合は cog_unload で close() を呼ぶこと
+    """
+
+    def __init__(
+        self,
+        model: Type[ModelType],
+        *,
+        name: Optional[str] = None,
+        flush_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.model = model
+        self.name = name or model.__tablename__
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._pending = _Pending()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        _buffers.add(self)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, **values: Any) -> None:
+        """
+        INSERTを追加
+        """
+        with self._lock:
+            self._pending.inserts.append(values)
+            self._touch()
+        self._after_write()
+
+    def update(self, id: int, **values: Any) -> None:
+        """
+        指定IDの行の更新を追加
+        """
+        with self._lock:
+            self._pending.updates.setdefault(id, {}).update(values)
+            increments = self._pending.increments.get(id)
+            if increments:
+                for column in values:
+                    increments.pop(column, None)
+            self._pending.rows.add(id)
+            self._touch()
+        self._after_write()
+
+    def increment(self, id: int, **amounts: Any) -> None:
+        """
+        指定IDの行の数値列への加算を追加
+        """
+        with self._lock:
+            self._pending._add_increments(id, amounts)
+            self._pending.rows.add(id)
+            self._touch()
+        self._after_write()
+
+    def _touch(self):
+        if self._pending.oldest is None:
+            self._pending.oldest = time.monotonic()
+
+    def _after_write(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._interval_loop())
+        if len(self._pending) >= self.flush_size and (
+            self._flush_task is None or self._flush_task.done()
+        ):
+            self._flush_task = loop.create_task(self._flush_logged())
+
+    async def _interval_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            metrics.set_gauge("write_buffer_pending", len(self), buffer=self.name)
+            oldest = self._pending.oldest
+            if oldest is not None and time.monotonic() - oldest >= self.flush_interval:
+                await self._flush_logged()
+
+    async def _flush_logged(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Write buffer {self.name} flush failed: {e}")
+
+    def close(self) -> int:
+        """
+        定期フラッシュを停止し、残りを同期的にフラッシュする（cog_unload用）
+        """
+        for task in (self._task, self._flush_task):
+            if task is not None:
+                task.cancel()
+        self._task = None
+        self._flush_task = None
+        return self.flush_sync()
+
+    async def flush(self) -> int:
+        """
+        蓄積した書き込みをスレッドプールでフラッシュし、書き込み件数を返す
+        """
+        return await run_blocking(self.flush_sync, pool="db")
+
+    def flush_sync(self) -> int:
+        """
+        蓄積した書き込みを同期的にフラッシュする（cog_unload・終了時用）
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, _Pending()
+            size = len(batch)
+            if size == 0:
+                return 0
+
+            started_at = time.monotonic()
+            try:
+                with db_session() as db:
+                    self._write(db, batch)
+            except Exception as e:
+                metrics.inc("write_buffer_flush_errors_total", buffer=self.name)
+                if _is_transient(e):
+                    self._requeue(batch)
+                    raise
+                logger.warning(
+                    f"Write buffer {self.name} batch failed, retrying row by row: {e}"
+                )
+                try:
+                    with db_session() as db:
+                        size -= self._write_each(db, batch)
+                except Exception:
+                    self._requeue(batch)
+                    raise
+
+            finished_at = time.monotonic()
+            metrics.observe("write_buffer_batch_size", size, buffer=self.name)
+            metrics.observe(
+                "write_buffer_flush_seconds", finished_at - started_at, buffer=self.name
+            )
+            metrics.observe(
+                "write_buffer_lag_seconds", finished_at - batch.oldest, buffer=self.name
+            )
+            return size
+
+    def _requeue(self, batch: _Pending):
+        with self._lock:
+            batch.absorb(self._pending)
+            self._pending = batch
+
+    def _write(self, db, batch: _Pending):
+        table = self.model.__table__
+        if batch.inserts:
+            # 列構成ごとにexecutemanyでまとめて挿入
+            insert_groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+            for values in batch.inserts:
+                insert_groups.setdefault(tuple(sorted(values)), []).append(values)
+            for rows in insert_groups.values():
+                db.execute(insert(table), rows)
+
+        groups: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], List[Dict]] = {}
+        for row_id in batch.rows:
+            signature, params = self._update_params(batch, row_id)
+            groups.setdefault(signature, []).append(params)
+
+        for (set_columns, inc_columns), rows in groups.items():
+            db.execute(self._update_stmt(set_columns, inc_columns), rows)
+
+    def _write_each(self, db, batch: _Pending) -> int:
+        """
+        1行ずつセーブポイント内で書き込み、失敗した行を破棄して件数を返す
+        一時的な障害の場合は送出し、バッチ全体を再送させる
+        """
+        table = self.model.__table__
+        dropped = 0
+        for values in batch.inserts:
+            if not self._try_write(db, insert(table), values, "insert", values):
+                dropped += 1
+        for row_id in batch.rows:
+            (set_columns, inc_columns), params = self._update_params(batch, row_id)
+            stmt = self._update_stmt(set_columns, inc_columns)
+            if not self._try_write(db, stmt, params, "update", {"id": row_id}):
+                dropped += 1
+        return dropped
+
+    def _try_write(self, db, stmt, params: Dict[str, Any], kind: str, row: Any) -> bool:
+        try:
+            with db.begin_nested():
+                db.execute(stmt, [params])
+            return True
+        except Exception as e:
+            if _is_transient(e):
+                raise
+            metrics.inc("write_buffer_dropped_total", buffer=self.name)
+            # SQLAlchemyの例外メッセージはパラメータ全体を含むため、DBのエラーのみ出力する
+            error = getattr(e, "orig", None) or e
+            logger.error(f"Write buffer {self.name} dropped {kind} {row!r}: {error}")
+            return False
+
+    @staticmethod
+    def _update_params(
+        batch: _Pending, row_id: int
+    ) -> Tuple[Tuple[Tuple[str, ...], Tuple[str, ...]], Dict[str, Any]]:
+        sets = batch.updates.get(row_id, {})
+        increments = batch.increments.get(row_id, {})
+        signature = (tuple(sorted(sets)), tuple(sorted(increments)))
+        params = {"_id": row_id}
+        params.update({f"_set_{column}": value for column, value in sets.items()})
+        params.update({f"_inc_{column}": value for column, value in increments.items()})
+        return signature, params
+
+    def _update_stmt(self, set_columns: Tuple[str, ...], inc_columns: Tuple[str, ...]):
+        table = self.model.__table__
+        values = {column: bindparam(f"_set_{column}") for column in set_columns}
+        values.update(
+            {
+                column: table.c[column] + bindparam(f"_inc_{column}")
+                for column in inc_columns
+            }
+        )
+        return update(table).where(table.c.id == bindparam("_id")).values(values)
+
+
+@atexit.register
+def _flush_all():
+    """
+    プロセス終了時に全バッファをフラッシュする
+    """
+    for buffer in list(_buffers):
+        try:
+            buffer.flush_sync()
+        except Exception as e:
+            logger.error(f"Write buffer {buffer.name} final flush failed: {e}")
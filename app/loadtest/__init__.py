@@ -0,0 +1,12 @@
+from .harness import HandlerStats, LoadTestHarness, LoadTestReport
+from .scenarios import World, load_recording, save_recording, synthetic
+
+__all__ = [
+    "HandlerStats",
+    "LoadTestHarness",
+    "LoadTestReport",
+    "World",
+    "load_recording",
+    "save_recording",
+    "synthetic",
+]
@@ -0,0 +1,131 @@
+"""
+オフライン負荷試験
+使用例:
+python -m loadtest --scenario mixed --events 20000 --rate 500
+python -m loadtest --record events.jsonl --events 1000   # 合成イベントを保存
+python -m loadtest --replay events.jsonl --speed 2       # 記録済みイベントを再生
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import sys
+
+from discord import SlashCommand
+
+from core.bot import create_bot, load_cogs
+from loadtest.harness import LoadTestHarness
+from loadtest.scenarios import (
+    SCENARIOS,
+    SETUP_EVENTS,
+    World,
+    load_recording,
+    save_recording,
+    synthetic,
+)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m loadtest")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="events/s (0 = as fast as possible)"
+    )
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--channels", type=int, default=5)
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--commands",
+        default="",
+        help="comma-separated slash commands to invoke (default: all without required options)",
+    )
+    parser.add_argument(
+        "--exclude-cogs", default="", help="comma-separated cog modules not to load"
+    )
+    parser.add_argument("--rest-latency-ms", type=float, default=0.0)
+    parser.add_argument("--replay", help="JSONL recording to replay")
+    parser.add_argument("--record", help="write the synthetic stream to JSONL and exit")
+    parser.add_argument("--tracemalloc", action="store_true")
+    parser.add_argument("--json", help="write the report as JSON")
+    return parser.parse_args(argv)
+
+
+def _default_commands(bot) -> list:
+    return [
+        command.name
+        for command in bot.pending_application_commands
+        if isinstance(command, SlashCommand)
+        and not any(option.required for option in command.options)
+    ]
+
+
+async def _run(args) -> int:
+    setup_events = None
+    if args.replay:
+        events = load_recording(args.replay)
+        # 記録の先頭のREADY・GUILD_CREATEは準備として流す
+        split = 0
+        while split < len(events) and events[split][0] in SETUP_EVENTS:
+            split += 1
+        setup_events, events = events[:split], events[split:]
+        if not setup_events or setup_events[0][0] != "READY":
+            raise SystemExit("The recording must start with a READY event")
+        world = World.from_ready(setup_events[0][1])
+    else:
+        world = World(
+            guilds=args.guilds,
+            channels=args.channels,
+            members=args.members,
+            seed=args.seed,
+        )
+
+    bot = create_bot(auto_sync_commands=False, chunk_guilds_at_startup=False)
+    bot.owner_id = int(world.owner["id"])
+    load_cogs(bot, exclude=[c for c in args.exclude_cogs.split(",") if c])
+    commands = [c for c in args.commands.split(",") if c] or _default_commands(bot)
+
+    if args.record:
+        save_recording(
+            args.record,
+            itertools.chain(
+                world.setup_events(),
+                synthetic(world, args.scenario, args.events, commands),
+            ),
+        )
+        return 0
+    if not args.replay:
+        events = synthetic(world, args.scenario, args.events, commands)
+
+    harness = LoadTestHarness(
+        bot,
+        world,
+        rest_latency=args.rest_latency_ms / 1000,
+        trace_memory=args.tracemalloc,
+    )
+    await harness.start(setup_events)
+    try:
+        report = await harness.replay(events, rate=args.rate, speed=args.speed)
+    finally:
+        await harness.stop()
+
+    print(report.render())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, indent=2)
+    return 0
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(
+        level=logging.WARNING, format="[%(asctime)s][%(levelname)s] %(message)s"
+    )
+    return asyncio.run(_run(_parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import discord.http
+from aiohttp import web
+
+from loadtest import payloads
+
+_SNOWFLAKE_RE = re.compile(r"/\d{15,}")
+_TOKEN_RE = re.compile(r"^/(webhooks|interactions)/(\d+)/[^/]+")
+
+
+class FakeDiscordServer:
+    """
+    Discord REST APIのローカル代替
+    ボットが送るリクエストに最小限の妥当な応答を返し、ルートごとの件数を記録する
+    latency で各応答に遅延を加えられる
+    """
+
+    def __init__(
+        self,
+        bot_user: payloads.Payload,
+        application_id: str,
+        owner: payloads.Payload,
+        *,
+        latency: float = 0.0,
+    ):
+        self.bot_user = bot_user
+        self.application_id = application_id
+        self.owner = owner
+        self.latency = latency
+        self.requests: Counter = Counter()
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_route("*", "/api/v{version}/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        path = "/" + request.match_info["path"]
+        template = _SNOWFLAKE_RE.sub("/{id}", _TOKEN_RE.sub(r"/\1/\2/{token}", path))
+        self.requests[f"{request.method} {template}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        body: Any = None
+        if request.can_read_body and request.content_type == "application/json":
+            body = await request.json()
+        elif request.can_read_body and request.content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "payload_json":
+                    body = await part.json()
+                else:
+                    await part.release()
+
+        data = self._respond(request.method, path, body or {})
+        headers = {
+            "X-RateLimit-Limit": "50",
+            "X-RateLimit-Remaining": "49",
+            "X-RateLimit-Reset-After": "1.0",
+            "X-RateLimit-Bucket": template,
+        }
+        if data is None:
+            return web.Response(status=204, headers=headers)
+        # py-cordはContent-Typeの完全一致でJSONを判定するためcharsetを付けない
+        headers["Content-Type"] = "application/json"
+        return web.Response(body=json.dumps(data).encode("utf-8"), headers=headers)
+
+    def _respond(self, method: str, path: str, body: Dict[str, Any]) -> Any:
+        if path == "/users/@me" and method == "GET":
+            return self.bot_user
+        if path == "/oauth2/applications/@me":
+            return {
+                "id": self.application_id,
+                "name": "loadtest",
+                "icon": None,
+                "description": "",
+                "bot_public": True,
+                "bot_require_code_grant": False,
+                "owner": self.owner,
+                "verify_key": "",
+                "flags": 0,
+            }
+        if path == "/users/@me/channels" and method == "POST":
+            return payloads.dm_channel(payloads.user(str(body.get("recipient_id"))))
+        if path.startswith("/users/") and method == "GET":
+            return payloads.user(path.rsplit("/", 1)[-1])
+        if path.endswith("/callback") or method == "DELETE":
+            return None
+
+        match = re.match(r"^/channels/(\d+)/messages$", path)
+        if match and method == "POST":
+            return payloads.message(
+                match.group(1), self.bot_user, body.get("content") or ""
+            ) | {"embeds": body.get("embeds") or []}
+        if path.startswith("/webhooks/") and method in ("POST", "PATCH", "GET"):
+            return payloads.message(
+                payloads.snowflake(), self.bot_user, body.get("content") or ""
+            ) | {"webhook_id": self.application_id}
+        if method == "GET":
+            return []
+        return {}
+
+
+@contextmanager
+def patch_api_base(base_url: str):
+    """
+    py-cordのREST・Webhook呼び出しの送信先をローカルサーバーに差し替える
+    （Webhookもdiscord.http.Routeを使用するため、Route.baseの差し替えで両方に効く）
+    """
+    original = discord.http.Route.base
+    discord.http.Route.base = property(
+        lambda self: f"{base_url}/api/v{discord.http.API_VERSION}"
+    )
+    try:
+        yield
+    finally:
+        discord.http.Route.base = original
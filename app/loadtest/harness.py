@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import math
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import psutil
+from discord.ext import commands
+
+from loadtest.fake_discord import FakeDiscordServer, patch_api_base
+from loadtest.scenarios import Event, World
+from utils import listener_scheduler
+
+logger = logging.getLogger("discord")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+@dataclass
+class HandlerStats:
+    """
+    イベントハンドラーごとの計測値
+    queued: スケジュールから実行開始までの待ち時間（イベントループの混雑）
+    """
+
+    durations: List[float] = field(default_factory=list)
+    queued: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": len(self.durations),
+            "errors": self.errors,
+            "p50_ms": _percentile(self.durations, 0.5) * 1000,
+            "p95_ms": _percentile(self.durations, 0.95) * 1000,
+            "p99_ms": _percentile(self.durations, 0.99) * 1000,
+            "max_ms": max(self.durations, default=0.0) * 1000,
+            "queued_p95_ms": _percentile(self.queued, 0.95) * 1000,
+        }
+
+
+@dataclass
+class LoadTestReport:
+    events: int
+    elapsed: float
+    dispatch_elapsed: float
+    handlers: Dict[str, Dict[str, float]]
+    rest_requests: Dict[str, int]
+    loop_lag_max_ms: float
+    rss_start_mb: float
+    rss_end_mb: float
+    rss_peak_mb: float
+    tracemalloc_peak_mb: Optional[float] = None
+
+    @property
+    def throughput(self) -> float:
+        return self.events / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "events": self.events,
+            "elapsed_s": self.elapsed,
+            "dispatch_elapsed_s": self.dispatch_elapsed,
+            "throughput_eps": self.throughput,
+            "handlers": self.handlers,
+            "rest_requests": self.rest_requests,
+            "loop_lag_max_ms": self.loop_lag_max_ms,
+            "rss_start_mb": self.rss_start_mb,
+            "rss_end_mb": self.rss_end_mb,
+            "rss_peak_mb": self.rss_peak_mb,
+            "tracemalloc_peak_mb": self.tracemalloc_peak_mb,
+        }
+
+    def render(self) -> str:
+        lines = [
+            f"events: {self.events} in {self.elapsed:.2f}s "
+            f"({self.throughput:.1f} events/s, dispatch {self.dispatch_elapsed:.2f}s)",
+            f"event loop lag max: {self.loop_lag_max_ms:.1f} ms",
+            f"rss: {self.rss_start_mb:.1f} -> {self.rss_end_mb:.1f} MB "
+            f"(peak {self.rss_peak_mb:.1f} MB)",
+        ]
+        if self.tracemalloc_peak_mb is not None:
+            lines.append(f"tracemalloc peak: {self.tracemalloc_peak_mb:.1f} MB")
+        lines.append("")
+        lines.append(
+            f"{'handler':<48} {'count':>7} {'err':>5} {'p50':>8} {'p95':>8} "
+            f"{'p99':>8} {'max':>8} {'queued95':>9}"
+        )
+        for name, s in sorted(
+            self.handlers.items(), key=lambda item: -item[1]["p95_ms"]
+        ):
+            lines.append(
+                f"{name[:48]:<48} {s['count']:>7} {s['errors']:>5} "
+                f"{s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} "
+                f"{s['max_ms']:>8.2f} {s['queued_p95_ms']:>9.2f}"
+            )
+        if self.rest_requests:
+            lines.append("")
+            lines.append("REST requests:")
+            for route, count in self.rest_requests.most_common():
+                lines.append(f"  {count:>7}  {route}")
+        return "\n".join(lines)
+
+
+class LoadTestHarness:
+    """
+    Discordに接続せずにボットへイベントを流し込む負荷試験ハーネス
+    - REST呼び出しはFakeDiscordServerに送られる
+    - イベントはゲートウェイ受信時と同じ ConnectionState.parsers に渡される
+    - 各ハンドラーの実行時間は Client._run_event を差し替えて計測する
+    """
+
+    def __init__(
+        self,
+        bot: commands.Bot,
+        world: World,
+        *,
+        rest_latency: float = 0.0,
+        trace_memory: bool = False,
+    ):
+        self.bot = bot
+        self.world = world
+        self.server = FakeDiscordServer(
+            world.bot_user, world.application_id, world.owner, latency=rest_latency
+        )
+        self.trace_memory = trace_memory
+        self.stats: Dict[str, HandlerStats] = {}
+        self._process = psutil.Process()
+        self._rss_peak = 0.0
+        self._lag_max = 0.0
+        self._patch = None
+        self._install_timing()
+
+    def _install_timing(self):
+        original = self.bot._run_event
+
+        def run_event(coro, event_name, *args, **kwargs):
+            name = f"{event_name}:{getattr(coro, '__qualname__', repr(coro))}"
+            stats = self.stats.setdefault(name, HandlerStats())
+            scheduled_at = time.perf_counter()
+
+            async def counted(*a, **kw):
+                try:
+                    return await coro(*a, **kw)
+                except Exception:
+                    stats.errors += 1
+                    raise
+
+            async def timed():
+                started_at = time.perf_counter()
+                stats.queued.append(started_at - scheduled_at)
+                try:
+                    await original(counted, event_name, *args, **kwargs)
+                finally:
+                    stats.durations.append(time.perf_counter() - started_at)
+
+            return timed()
+
+        self.bot._run_event = run_event
+
+    def _rss_mb(self) -> float:
+        rss = self._process.memory_info().rss / (1024 * 1024)
+        self._rss_peak = max(self._rss_peak, rss)
+        return rss
+
+    async def _monitor(self, interval: float = 0.1):
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            self._lag_max = max(self._lag_max, time.perf_counter() - expected)
+            self._rss_mb()
+
+    async def start(self, setup_events: Optional[List[Event]] = None) -> None:
+        """
+        偽のRESTサーバーを起動してログインし、READYとGUILD_CREATEを流してon_readyまで待つ
+        """
+        url = await self.server.start()
+        self._patch = patch_api_base(url)
+        self._patch.__enter__()
+        await self.bot.login("loadtest")
+
+        ready = self.bot.wait_for("ready")
+        parsers = self.bot._connection.parsers
+        for name, data, _ in setup_events or self.world.setup_events():
+            parsers[name](data)
+        await asyncio.wait_for(ready, timeout=30)
+        await self.drain()
+
+    async def stop(self) -> None:
+        try:
+            await self.bot.close()
+        finally:
+            await self.server.stop()
+            if self._patch is not None:
+                self._patch.__exit__(None, None, None)
+
+    async def drain(self) -> None:
+        """
+        スケジュール済みの全ハンドラーの完了を待つ
+        listener_policy を指定したリスナーは listener_scheduler のワーカーで実行されるため、
+        その実行待ち・実行中もなくなるまで待つ
+        """
+        while True:
+            if self.bot._tasks:
+                await asyncio.gather(*list(self.bot._tasks), return_exceptions=True)
+                continue
+            await listener_scheduler.join()
+            if not self.bot._tasks:
+                return
+
+    async def replay(
+        self, events: Iterable[Event], *, rate: float = 0.0, speed: float = 1.0
+    ) -> LoadTestReport:
+        """
+        イベントを流し込み、全ハンドラーの完了までを計測する
+        rate > 0: 毎秒rate件の一定レートで送る
+        rate == 0: 記録済みの時刻（at）があればspeed倍速で再現し、なければ最大速度で送る
+        """
+        self.stats.clear()
+        self._lag_max = 0.0
+        self._rss_peak = 0.0
+        self.server.requests.clear()
+        rss_start = self._rss_mb()
+        if self.trace_memory:
+            tracemalloc.start()
+        monitor = asyncio.create_task(self._monitor())
+
+        parsers = self.bot._connection.parsers
+        started_at = time.perf_counter()
+        count = 0
+        for name, data, at in events:
+            if rate > 0:
+                target = started_at + count / rate
+            elif at is not None:
+                target = started_at + at / speed
+            else:
+                target = None
+            delay = target - time.perf_counter() if target is not None else 0
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif count % 100 == 0:
+                # 最大速度でもハンドラーが実行されるようにループへ制御を返す
+                await asyncio.sleep(0)
+            parser = parsers.get(name)
+            if parser is None:
+                logger.warning(f"Unknown event skipped: {name}")
+                continue
+            parser(data)
+            count += 1
+        dispatched_at = time.perf_counter()
+        await self.drain()
+        finished_at = time.perf_counter()
+
+        monitor.cancel()
+        tracemalloc_peak = None
+        if self.trace_memory:
+            tracemalloc_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+
+        return LoadTestReport(
+            events=count,
+            elapsed=finished_at - started_at,
+            dispatch_elapsed=dispatched_at - started_at,
+            handlers={name: s.summary() for name, s in self.stats.items()},
+            rest_requests=self.server.requests.copy(),
+            loop_lag_max_ms=self._lag_max * 1000,
+            rss_start_mb=rss_start,
+            rss_end_mb=self._rss_mb(),
+            rss_peak_mb=self._rss_peak,
+            tracemalloc_peak_mb=tracemalloc_peak,
+        )
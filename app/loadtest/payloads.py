@@ -0,0 +1,195 @@
+import itertools
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Discordのエポック（2015-01-01）
+_DISCORD_EPOCH_MS = 1420070400000
+
+_increment = itertools.count()
+
+Payload = Dict[str, Any]
+
+
+def snowflake() -> str:
+    """
+    現在時刻ベースの一意なスノーフレークIDを生成
+    """
+    timestamp = int(time.time() * 1000) - _DISCORD_EPOCH_MS
+    return str((timestamp << 22) | (next(_increment) & 0x3FFFFF))
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def user(user_id: Optional[str] = None, *, bot: bool = False) -> Payload:
+    user_id = user_id or snowflake()
+    return {
+        "id": user_id,
+        "username": f"user{user_id[-6:]}",
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+def member(user_payload: Payload, roles: Optional[List[str]] = None) -> Payload:
+    return {
+        "user": user_payload,
+        "roles": roles or [],
+        "joined_at": _now_iso(),
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+        "permissions": "0",
+    }
+
+
+def text_channel(guild_id: str, position: int = 0) -> Payload:
+    channel_id = snowflake()
+    return {
+        "id": channel_id,
+        "type": 0,
+        "guild_id": guild_id,
+        "name": f"channel-{position}",
+        "position": position,
+        "permission_overwrites": [],
+        "nsfw": False,
+        "parent_id": None,
+    }
+
+
+def dm_channel(recipient: Payload) -> Payload:
+    return {"id": snowflake(), "type": 1, "recipients": [recipient]}
+
+
+def guild(owner_id: str, *, channels: int = 5, members: int = 50) -> Payload:
+    """
+    GUILD_CREATE用のサーバーデータを生成（@everyoneロール・テキストチャンネル・メンバーを含む）
+    """
+    guild_id = snowflake()
+    return {
+        "id": guild_id,
+        "name": f"guild-{guild_id[-6:]}",
+        "icon": None,
+        "owner_id": owner_id,
+        "unavailable": False,
+        "member_count": members,
+        "large": False,
+        "features": [],
+        "emojis": [],
+        "stickers": [],
+        "roles": [
+            {
+                "id": guild_id,
+                "name": "@everyone",
+                "permissions": "2248473465835073",
+                "position": 0,
+                "color": 0,
+                "hoist": False,
+                "managed": False,
+                "mentionable": False,
+            }
+        ],
+        "channels": [text_channel(guild_id, i) for i in range(channels)],
+        "threads": [],
+        "members": [member(user()) for _ in range(members)],
+        "voice_states": [],
+        "presences": [],
+        "stage_instances": [],
+        "guild_scheduled_events": [],
+        "premium_tier": 0,
+        "preferred_locale": "ja",
+        "joined_at": _now_iso(),
+    }
+
+
+def ready(bot_user: Payload, application_id: str, guilds: List[Payload]) -> Payload:
+    return {
+        "v": 10,
+        "user": bot_user,
+        "guilds": [{"id": g["id"], "unavailable": True} for g in guilds],
+        "session_id": "loadtest",
+        "resume_gateway_url": "ws://127.0.0.1",
+        "application": {"id": application_id, "flags": 0},
+        "private_channels": [],
+        "relationships": [],
+    }
+
+
+def message(
+    channel_id: str,
+    author: Payload,
+    content: str,
+    *,
+    guild_id: Optional[str] = None,
+    message_id: Optional[str] = None,
+) -> Payload:
+    data = {
+        "id": message_id or snowflake(),
+        "channel_id": channel_id,
+        "author": author,
+        "content": content,
+        "timestamp": _now_iso(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+        "flags": 0,
+        "components": [],
+    }
+    if guild_id is not None:
+        data["guild_id"] = guild_id
+        data["member"] = {
+            key: value for key, value in member(author).items() if key != "user"
+        }
+    return data
+
+
+def member_add(guild_id: str, user_payload: Optional[Payload] = None) -> Payload:
+    data = member(user_payload or user())
+    data["guild_id"] = guild_id
+    return data
+
+
+def interaction(
+    application_id: str,
+    guild_id: str,
+    channel_id: str,
+    invoker: Payload,
+    command_name: str,
+    options: Optional[List[Payload]] = None,
+) -> Payload:
+    """
+    スラッシュコマンドのINTERACTION_CREATEデータを生成
+    コマンドIDは名前で解決されるため任意の値でよい
+    """
+    return {
+        "id": snowflake(),
+        "application_id": application_id,
+        "type": 2,
+        "data": {
+            "id": snowflake(),
+            "name": command_name,
+            "type": 1,
+            "options": options or [],
+        },
+        "guild_id": guild_id,
+        "channel_id": channel_id,
+        "member": member(invoker),
+        "token": f"loadtest-{snowflake()}",
+        "version": 1,
+        "locale": "ja",
+        "guild_locale": "ja",
+        "app_permissions": "2248473465835073",
+        "entitlements": [],
+        "authorizing_integration_owners": {"0": guild_id},
+        "context": 0,
+    }
@@ -0,0 +1,131 @@
+import json
+import random
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from loadtest import payloads
+
+# (イベント名, データ, 開始からの秒数（記録済みストリームのみ）)
+Event = Tuple[str, payloads.Payload, Optional[float]]
+
+SCENARIOS = ("messages", "members", "interactions", "mixed")
+
+# on_readyより前に流すイベント
+SETUP_EVENTS = ("READY", "GUILD_CREATE")
+
+
+class World:
+    """
+    合成イベントの送信先となるボット・サーバー・チャンネル・ユーザー
+    """
+
+    def __init__(self, *, guilds: int, channels: int, members: int, seed: int = 0):
+        self.random = random.Random(seed)
+        self.bot_user = payloads.user(bot=True)
+        self.owner = payloads.user()
+        self.application_id = payloads.snowflake()
+        self.guilds = [
+            payloads.guild(self.owner["id"], channels=channels, members=members)
+            for _ in range(guilds)
+        ]
+
+    @classmethod
+    def from_ready(cls, data: payloads.Payload) -> "World":
+        """
+        記録済みのREADYからWorldを復元する（サーバーは続くGUILD_CREATEで作られる）
+        """
+        world = cls(guilds=0, channels=0, members=0)
+        world.bot_user = data["user"]
+        world.application_id = data["application"]["id"]
+        world.owner = data.get("_loadtest", {}).get("owner", world.owner)
+        return world
+
+    def ready(self) -> payloads.Payload:
+        data = payloads.ready(self.bot_user, self.application_id, self.guilds)
+        # 再生時にオーナーを復元するための情報（py-cordは未知のキーを無視する）
+        data["_loadtest"] = {"owner": self.owner}
+        return data
+
+    def setup_events(self) -> List[Event]:
+        """
+        READYと各サーバーのGUILD_CREATE
+        """
+        events: List[Event] = [("READY", self.ready(), None)]
+        events.extend(("GUILD_CREATE", guild, None) for guild in self.guilds)
+        return events
+
+    def _pick(self):
+        guild = self.random.choice(self.guilds)
+        channel = self.random.choice(guild["channels"])
+        author = self.random.choice(guild["members"])["user"]
+        return guild, channel, author
+
+    def message(self) -> Event:
+        guild, channel, author = self._pick()
+        content = " ".join(
+            self.random.choice(("hello", "world", "bot", "test", "!ping", "おはよう"))
+            for _ in range(self.random.randint(1, 12))
+        )
+        data = payloads.message(channel["id"], author, content, guild_id=guild["id"])
+        return "MESSAGE_CREATE", data, None
+
+    def member_join(self) -> Event:
+        guild = self.random.choice(self.guilds)
+        return "GUILD_MEMBER_ADD", payloads.member_add(guild["id"]), None
+
+    def interaction(self, commands: Sequence[str]) -> Event:
+        guild, channel, _ = self._pick()
+        # オーナー限定コマンドも実行されるようにオーナーとして呼び出す
+        data = payloads.interaction(
+            self.application_id,
+            guild["id"],
+            channel["id"],
+            self.owner,
+            self.random.choice(commands),
+        )
+        return "INTERACTION_CREATE", data, None
+
+
+def synthetic(
+    world: World, scenario: str, count: int, commands: Sequence[str]
+) -> Iterator[Event]:
+    """
+    合成イベントストリームを生成
+    mixed はメッセージ:参加:インタラクション = 90:5:5
+    """
+    if scenario == "interactions" and not commands:
+        raise ValueError("No commands available for the interactions scenario")
+    for _ in range(count):
+        if scenario == "messages":
+            yield world.message()
+        elif scenario == "members":
+            yield world.member_join()
+        elif scenario == "interactions":
+            yield world.interaction(commands)
+        else:
+            roll = world.random.random()
+            if roll < 0.05 and commands:
+                yield world.interaction(commands)
+            elif roll < 0.10:
+                yield world.member_join()
+            else:
+                yield world.message()
+
+
+def load_recording(path: str) -> List[Event]:
+    """
+    JSONL形式の記録済みイベントを読み込む
+    各行: {"t": "MESSAGE_CREATE", "d": {...}, "at": 0.123}
+    """
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                events.append((record["t"], record["d"], record.get("at")))
+    return events
+
+
+def save_recording(path: str, events: Iterable[Event]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for name, data, at in events:
+            f.write(json.dumps({"t": name, "d": data, "at": at}) + "\n")
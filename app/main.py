@@ -1,12 +1,9 @@
 import logging
-import os
-import pathlib
 
-import discord
 import sentry_sdk
-from discord.ext import commands
 
 from core import get_settings
+from core.bot import create_bot, load_cogs
 
 config = get_settings()
 
@@ -23,19 +20,9 @@ if config.BOT_TOKEN is None or len(config.BOT_TOKEN) == 0:
     raise ValueError("BOT_TOKEN is not set")
 
 # bot init
-bot = commands.Bot(
-    help_command=None,
-    case_insensitive=True,
-    activity=discord.Game("©ukwhatn"),
-    intents=discord.Intents.all(),
-)
+bot = create_bot()
 
 # Automatically load all cogs except the template
-cogs_dir = pathlib.Path(__file__).parent / "cogs"
-for file in os.listdir(cogs_dir):
-    if file.endswith(".py") and not file.startswith("__") and file != "template.py":
-        cog_name = file.removesuffix(".py")
-        logger.info(f"Loading cog: {cog_name}")
-        bot.load_extension(f"cogs.{cog_name}")
+load_cogs(bot)
 
 bot.run(config.BOT_TOKEN)
@@ -1,5 +1,68 @@
-from .discord import DiscordUtil
-from .schemas import SessionSchema
+from .cache import LocalCache
+from .circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    all_breakers,
+    get_breaker,
+)
+from .discord import BulkDmResult, DiscordUtil
+from .executor import BlockingExecutor, get_executor, run_blocking
+from .interactions import (
+    DeferWatchdog,
+    auto_defer,
+    defer_watchdog,
+    no_auto_defer,
+)
+from .jobs import JobContext, JobQueue, job_queue
+from .listeners import (
+    ListenerPolicy,
+    ListenerScheduler,
+    listener_policy,
+    listener_scheduler,
+)
+from .metrics import MetricsRegistry, metrics
+from .ratelimit import RateLimited, RateLimiter, rate_limit
+from .schemas import JobSchema, SessionSchema
 from .session import SessionCrud
+from .stats import BotStats, StatsSample, bot_stats, memory_usage_mb
+from .tracing import Span, Trace, Tracer, tracer
 
-__all__ = ["DiscordUtil", "SessionCrud", "SessionSchema"]
+__all__ = [
+    "LocalCache",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "all_breakers",
+    "get_breaker",
+    "BulkDmResult",
+    "DiscordUtil",
+    "BlockingExecutor",
+    "get_executor",
+    "run_blocking",
+    "DeferWatchdog",
+    "auto_defer",
+    "defer_watchdog",
+    "no_auto_defer",
+    "JobContext",
+    "JobQueue",
+    "job_queue",
+    "ListenerPolicy",
+    "ListenerScheduler",
+    "listener_policy",
+    "listener_scheduler",
+    "MetricsRegistry",
+    "metrics",
+    "RateLimited",
+    "RateLimiter",
+    "rate_limit",
+    "SessionCrud",
+    "BotStats",
+    "StatsSample",
+    "bot_stats",
+    "memory_usage_mb",
+    "Span",
+    "Trace",
+    "Tracer",
+    "tracer",
+    "JobSchema",
+    "SessionSchema",
+]
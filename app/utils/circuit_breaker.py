@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Literal, Optional, TypeVar
+
+from core import get_settings
+from utils.metrics import metrics
+
+T = TypeVar("T")
+
+logger = logging.getLogger("discord")
+
+State = Literal["closed", "open", "half_open"]
+
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(Exception):
+    """
+    サーキットが開いているため呼び出しを即座に拒否した場合のエラー
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit {name} is open. Retry in {retry_after:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    依存サービスの障害時に呼び出しを即座に失敗させるサーキットブレーカー
+    - closed: 通常状態。連続でfailure_threshold回失敗するとopenへ
+    - open: 全呼び出しをCircuitOpenErrorで拒否。recovery_timeout秒後にhalf_openへ
+    - half_open: half_open_max_calls件だけ試行を通し、成功でclosed・失敗でopenへ戻る
+    is_failure で障害とみなす例外を判定する（アプリケーション側のエラーでは開かない）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        is_failure: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.is_failure = is_failure or (lambda e: isinstance(e, Exception))
+        self._lock = threading.Lock()
+        self._state: State = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._last_error: Optional[str] = None
+        metrics.set_gauge("circuit_state", 0, circuit=name)
+
+    @property
+    def state(self) -> State:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> State:
+        if (
+            self._state == "open"
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._transition("half_open")
+        return self._state
+
+    def _transition(self, state: State):
+        if self._state == state:
+            return
+        logger.warning(f"Circuit {self.name}: {self._state} -> {state}")
+        self._state = state
+        if state == "open":
+            self._opened_at = time.monotonic()
+            metrics.inc("circuit_opened_total", circuit=self.name)
+        elif state == "closed":
+            self._failures = 0
+        self._half_open_calls = 0
+        metrics.set_gauge("circuit_state", _STATE_VALUES[state], circuit=self.name)
+
+    def allow(self) -> None:
+        """
+        呼び出し可否を判定する。拒否する場合はCircuitOpenErrorを送出
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == "closed":
+                return
+            if (
+                state == "half_open"
+                and self._half_open_calls < self.half_open_max_calls
+            ):
+                self._half_open_calls += 1
+                return
+            retry_after = max(
+                0.0, self.recovery_timeout - (time.monotonic() - self._opened_at)
+            )
+        metrics.inc("circuit_rejected_total", circuit=self.name)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == "closed":
+                self._failures = 0
+            else:
+                self._transition("closed")
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self._last_error = f"{type(error).__name__}: {error}"[:200]
+            if self._state == "half_open":
+                self._transition("open")
+                return
+            self._failures += 1
+            if self._state == "closed" and self._failures >= self.failure_threshold:
+                self._transition("open")
+
+    @contextmanager
+    def guard(self):
+        """
+        with句で囲んだ処理の成否を記録する
+        """
+        self.allow()
+        try:
+            yield
+        except BaseException as e:
+            if self.is_failure(e):
+                self.record_failure(e)
+            else:
+                self.record_success()
+            raise
+        else:
+            self.record_success()
+
+    def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self.guard():
+            return func(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "failures": self._failures,
+                "last_error": self._last_error,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(
+    name: str, *, is_failure: Optional[Callable[[BaseException], bool]] = None
+) -> CircuitBreaker:
+    """
+    名前付きのサーキットブレーカーを取得（未作成なら設定値で作成）
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            settings = get_settings()
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                recovery_timeout=settings.CIRCUIT_RECOVERY_TIMEOUT,
+                is_failure=is_failure,
+            )
+        return breaker
+
+
+def all_breakers() -> Dict[str, CircuitBreaker]:
+    with _breakers_lock:
+        return dict(_breakers)
@@ -1,23 +1,154 @@
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Union
 
 import discord
 
+from core import get_settings
+from utils.cache import LocalCache
+from utils.metrics import metrics
+from utils.rest import Priority, rest
+
+logger = logging.getLogger("discord")
+
+settings = get_settings()
+
+ProgressCallback = Callable[[int, int], Union[None, Awaitable[None]]]
+
+
+@dataclass
+class BulkDmResult:
+    """
+    一括DM送信の結果
+    failed: 送信できなかったユーザーIDと理由
+    """
+
+    sent: List[int] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)
+
 
 class DiscordUtil:
+    # ユーザーID -> DMチャンネルID（create_dmのREST呼び出しを省略する）
+    _dm_channels: LocalCache = LocalCache(max_size=settings.LOCAL_CACHE_MAX_SIZE)
+    _owner: Optional[discord.User] = None
+
     @staticmethod
-    async def send_dm(bot: discord.Bot, to: discord.User, **kwargs):
-        dm_channel = await to.create_dm()
-        await dm_channel.send(**kwargs)
+    async def _dm_channel(bot: discord.Bot, to: discord.abc.Snowflake):
+        cached = DiscordUtil._dm_channels.get(str(to.id))
+        if cached is not None:
+            return bot.get_partial_messageable(
+                cached[0], type=discord.ChannelType.private
+            )
+        if isinstance(to, discord.abc.User):
+            dm_channel = await to.create_dm()
+        else:
+            dm_channel = await bot.create_dm(to)
+        DiscordUtil._dm_channels.set(str(to.id), dm_channel.id)
+        return dm_channel
+
+    @staticmethod
+    async def send_dm(bot: discord.Bot, to: discord.abc.Snowflake, **kwargs):
+        dm_channel = await DiscordUtil._dm_channel(bot, to)
+        try:
+            await dm_channel.send(**kwargs)
+        except discord.NotFound:
+            # チャンネルが無効になっている場合のみ次回は作り直す（403や429では破棄しない）
+            DiscordUtil._dm_channels.delete(str(to.id))
+            raise
+
+    @staticmethod
+    async def get_owner(bot: discord.Bot) -> discord.User:
+        """
+        オーナー情報を取得（初回のみREST呼び出し）
+        """
+        if DiscordUtil._owner is None:
+            owner_id = bot.owner_id
+            if not owner_id:
+                app_info = await bot.application_info()
+                DiscordUtil._owner = app_info.owner
+            else:
+                DiscordUtil._owner = bot.get_user(owner_id) or await bot.fetch_user(
+                    owner_id
+                )
+        return DiscordUtil._owner
 
     @staticmethod
     async def send_dm_to_owner(bot: discord.Bot, **kwargs):
-        owner_id = bot.owner_id
-        if not owner_id:
-            app_info = await bot.application_info()
-            owner = app_info.owner
-        else:
-            owner = await bot.fetch_user(owner_id)
-        await DiscordUtil.send_dm(bot, owner, **kwargs)
+        owner = await DiscordUtil.get_owner(bot)
+        try:
+            await DiscordUtil.send_dm(bot, owner, **kwargs)
+        except discord.NotFound:
+            # オーナーが変わった・削除された場合のみ取得し直す（429や5xxでは破棄しない）
+            DiscordUtil._owner = None
+            raise
+
+    @staticmethod
+    async def send_dm_many(
+        bot: discord.Bot,
+        users: Sequence[Union[discord.abc.Snowflake, int]],
+        *,
+        concurrency: Optional[int] = None,
+        priority: Priority = Priority.BACKGROUND,
+        progress: Optional[ProgressCallback] = None,
+        progress_every: int = 50,
+        **kwargs,
+    ) -> BulkDmResult:
+        """
+        複数ユーザーへ同じDMを並行送信する
+        同時送信数をconcurrencyに制限し、RESTスケジューラーの指定優先度（既定はBACKGROUND）で送信する
+        （インタラクション応答の予算を残したまま、グローバルレート制限内に収める）
+        progress(完了数, 総数) はprogress_every件ごとと完了時に呼ばれる
+        使用例:
+        result = await DiscordUtil.send_dm_many(bot, members, content="お知らせ")
+        """
+        concurrency = concurrency or settings.DM_SEND_CONCURRENCY
+        semaphore = asyncio.Semaphore(concurrency)
+        result = BulkDmResult()
+        total = len(users)
+        done = 0
+
+        async def report():
+            if progress is None:
+                return
+            ret = progress(done, total)
+            if inspect.isawaitable(ret):
+                await ret
+
+        async def deliver(user: Union[discord.abc.Snowflake, int]):
+            nonlocal done
+            target = discord.Object(user) if isinstance(user, int) else user
+            async with semaphore:
+                try:
+                    await rest.call(
+                        DiscordUtil.send_dm, bot, target, priority=priority, **kwargs
+                    )
+                    result.sent.append(target.id)
+                    metrics.inc("dm_sent_total")
+                except discord.Forbidden as e:
+                    # DMを受け付けていないユーザー
+                    result.failed[target.id] = f"forbidden: {e.text}"
+                    metrics.inc("dm_failed_total", reason="forbidden")
+                except discord.HTTPException as e:
+                    result.failed[target.id] = f"http {e.status}: {e.text}"
+                    metrics.inc("dm_failed_total", reason=str(e.status))
+                except Exception as e:
+                    # タイムアウト・接続エラーなどは他の宛先の送信を止めずに失敗として記録する
+                    result.failed[target.id] = f"{type(e).__name__}: {e}"
+                    metrics.inc("dm_failed_total", reason=type(e).__name__)
+            done += 1
+            if done % progress_every == 0 and done < total:
+                await report()
+
+        await asyncio.gather(*(deliver(user) for user in users))
+        await report()
+        if result.failed:
+            logger.info(
+                f"Bulk DM finished: {len(result.sent)} sent, {len(result.failed)} failed"
+            )
+        return result
 
     @staticmethod
     async def notify_to_owner(bot: discord.Bot, message: str):
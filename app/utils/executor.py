@@ -0,0 +1,244 @@
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Literal, Optional, TypeVar
+
+from core import get_settings
+from utils.metrics import metrics
+
+T = TypeVar("T")
+PoolName = Literal["db", "io", "cpu"]
+
+_UNSET: Any = object()
+
+
+class ExecutorBusyError(RuntimeError):
+    """
+    待機キューが上限に達している場合のエラー
+    """
+
+
+class _Pool:
+    """
+    名前付きプールと同時実行数制御・統計情報
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Executor],
+        workers: int,
+        max_queue: int,
+        copy_context: bool,
+    ):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.copy_context = copy_context
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    @property
+    def executor(self) -> Executor:
+        # プロセスプールは起動コストが大きいため初回利用時に生成する
+        if self._executor is None:
+            self._executor = self._factory()
+        return self._executor
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        return self._semaphore
+
+    def report(self):
+        metrics.set_gauge("executor_waiting", self.waiting, pool=self.name)
+        metrics.set_gauge("executor_running", self.running, pool=self.name)
+
+    def release(self, future: asyncio.Future):
+        self.running -= 1
+        self.semaphore.release()
+        if future.cancelled() or future.exception() is not None:
+            self.failed += 1
+            metrics.inc("executor_failed_total", pool=self.name)
+        else:
+            self.completed += 1
+        self.report()
+
+    def shutdown(self, wait: bool):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+
+class BlockingExecutor:
+    """
+    ブロッキング処理をイベントループ外で実行するためのプール群
+    - db: DB/Redisアクセス用スレッドプール
+    - io: その他のブロッキングI/O用スレッドプール
+    - cpu: CPU負荷の高い処理用プロセスプール（引数はpickle可能である必要あり）
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.default_timeout = settings.EXECUTOR_DEFAULT_TIMEOUT
+        self._pools: Dict[str, _Pool] = {
+            "db": _Pool(
+                "db",
+                functools.partial(
+                    ThreadPoolExecutor,
+                    max_workers=settings.EXECUTOR_DB_WORKERS,
+                    thread_name_prefix="executor-db",
+                ),
+                workers=settings.EXECUTOR_DB_WORKERS,
+                max_queue=settings.EXECUTOR_MAX_QUEUE,
+                copy_context=True,
+            ),
+            "io": _Pool(
+                "io",
+                functools.partial(
+                    ThreadPoolExecutor,
+                    max_workers=settings.EXECUTOR_IO_WORKERS,
+                    thread_name_prefix="executor-io",
+                ),
+                workers=settings.EXECUTOR_IO_WORKERS,
+                max_queue=settings.EXECUTOR_MAX_QUEUE,
+                copy_context=True,
+            ),
+            "cpu": _Pool(
+                "cpu",
+                functools.partial(
+                    ProcessPoolExecutor, max_workers=settings.EXECUTOR_CPU_WORKERS
+                ),
+                workers=settings.EXECUTOR_CPU_WORKERS,
+                max_queue=settings.EXECUTOR_MAX_QUEUE,
+                copy_context=False,
+            ),
+        }
+
+    async def run(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        pool: PoolName = "io",
+        timeout: Optional[float] = _UNSET,
+        **kwargs: Any,
+    ) -> T:
+        """
+        指定プールで関数を実行し、結果を待機する
+        timeoutは待機時間と実行時間の合計に適用される
+        タイムアウトしても実行中のスレッドは停止できないため、処理自体は継続する
+        """
+        p = self._pools[pool]
+        if timeout is _UNSET:
+            timeout = self.default_timeout
+
+        if p.waiting >= p.max_queue:
+            metrics.inc("executor_rejected_total", pool=p.name)
+            raise ExecutorBusyError(f"Executor pool '{p.name}' queue is full")
+
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        enqueued_at = time.perf_counter()
+
+        p.waiting += 1
+        p.report()
+        try:
+            await asyncio.wait_for(p.semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            p.timed_out += 1
+            metrics.inc("executor_timeout_total", pool=p.name)
+            raise
+        finally:
+            p.waiting -= 1
+
+        p.running += 1
+        p.report()
+        metrics.observe(
+            "executor_queue_wait_seconds",
+            time.perf_counter() - enqueued_at,
+            pool=p.name,
+        )
+
+        call = functools.partial(func, *args, **kwargs)
+        if p.copy_context:
+            # スレッド側でもcontextvars（トレース情報など）を参照できるようにする
+            call = functools.partial(contextvars.copy_context().run, call)
+
+        started_at = time.perf_counter()
+        try:
+            future = loop.run_in_executor(p.executor, call)
+        except Exception:
+            p.running -= 1
+            p.semaphore.release()
+            p.report()
+            raise
+        future.add_done_callback(p.release)
+
+        remaining = None if deadline is None else max(0.0, deadline - loop.time())
+        try:
+            # shieldしないとタイムアウト時に完了前のfutureが解放されてしまう
+            return await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            p.timed_out += 1
+            metrics.inc("executor_timeout_total", pool=p.name)
+            raise
+        finally:
+            metrics.observe(
+                "executor_run_seconds", time.perf_counter() - started_at, pool=p.name
+            )
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        プールごとの統計情報を取得
+        """
+        return {
+            name: {
+                "workers": p.workers,
+                "waiting": p.waiting,
+                "running": p.running,
+                "completed": p.completed,
+                "failed": p.failed,
+                "timed_out": p.timed_out,
+            }
+            for name, p in self._pools.items()
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        全プールを停止
+        """
+        for p in self._pools.values():
+            p.shutdown(wait)
+
+
+@lru_cache
+def get_executor() -> BlockingExecutor:
+    """
+    共有エグゼキューターを取得（キャッシュ）
+    """
+    return BlockingExecutor()
+
+
+async def run_blocking(
+    func: Callable[..., T],
+    *args: Any,
+    pool: PoolName = "io",
+    timeout: Optional[float] = _UNSET,
+    **kwargs: Any,
+) -> T:
+    """
+    ブロッキング関数をイベントループ外で実行する
+    使用例:
+    items = await run_blocking(load_items, owner_id, pool="db")
+    """
+    return await get_executor().run(func, *args, pool=pool, timeout=timeout, **kwargs)
@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import redis
+
+from core import get_settings
+from utils.circuit_breaker import CircuitOpenError
+from utils.redis import RedisCrud
+
+settings = get_settings()
+
+logger = logging.getLogger("discord")
+
+
+class GatewaySessionStore:
+    """
+    ゲートウェイのセッション情報（session_id・シーケンス番号・再開用URL）をシャードごとに保存する
+    読み込みは取り出しと同時に削除するため、同じセッションを複数のプロセスが再開することはない
+    backend: "redis" または "file"
+    """
+
+    NAMESPACE = "gateway:session"
+
+    def __init__(
+        self,
+        backend: str = "redis",
+        path: str = "/tmp/gateway_session",  # nosec B108
+        ttl: int = 120,
+    ):
+        if backend not in ("redis", "file"):
+            raise ValueError(f"Unknown gateway session backend: {backend}")
+        self.backend = backend
+        self.path = path
+        self.ttl = ttl
+        self._crud = RedisCrud(db=0) if backend == "redis" else None
+
+    def _key(self, shard_id: Optional[int]) -> str:
+        return f"{self.NAMESPACE}:{shard_id or 0}"
+
+    def _file(self, shard_id: Optional[int]) -> str:
+        return f"{self.path}.{shard_id or 0}.json"
+
+    def save(self, shard_id: Optional[int], data: Dict[str, Any]) -> None:
+        """
+        セッション情報を保存（TTL秒を過ぎたものは読み込まれない）
+        """
+        data = {**data, "saved_at": time.time()}
+        if self._crud is not None:
+            self._crud.set(self._key(shard_id), data, expire=self.ttl)
+            return
+        tmp = self._file(shard_id) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self._file(shard_id))
+
+    def pop(self, shard_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        """
+        保存されたセッション情報を取り出す（なければNone）
+        """
+        try:
+            if self._crud is not None:
+                raw = self._crud.connect.getdel(self._key(shard_id))
+                data = json.loads(raw) if raw is not None else None
+            else:
+                try:
+                    with open(self._file(shard_id), encoding="utf-8") as f:
+                        data = json.load(f)
+                except FileNotFoundError:
+                    return None
+                os.remove(self._file(shard_id))
+        except (CircuitOpenError, redis.RedisError, OSError, ValueError) as e:
+            logger.warning(f"Failed to load gateway session: {e}")
+            return None
+        if data is None or time.time() - data.get("saved_at", 0) > self.ttl:
+            return None
+        return data
+
+
+def get_session_store() -> GatewaySessionStore:
+    return GatewaySessionStore(
+        backend=settings.GATEWAY_SESSION_STORE,
+        path=settings.GATEWAY_SESSION_FILE,
+        ttl=settings.GATEWAY_SESSION_TTL,
+    )
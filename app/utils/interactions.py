@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Set
+
+import discord
+from discord.errors import InteractionResponded
+from discord.interactions import InteractionResponse
+
+from core import get_settings
+from utils.metrics import metrics
+
+settings = get_settings()
+
+logger = logging.getLogger("discord")
+
+_OPTIONS_ATTR = "__auto_defer__"
+
+
+def _set_options(target: Any, options: Optional[Dict[str, Any]]):
+    # @slash_command の内側・外側どちらに付けても同じコールバックに設定する
+    setattr(getattr(target, "callback", target), _OPTIONS_ATTR, options)
+    return target
+
+
+def no_auto_defer(func):
+    """
+    自動deferの対象外にするデコレーター（モーダルを返すコマンドなど）
+    使用例:
+    @slash_command(name="form")
+    @no_auto_defer
+    async def form(self, ctx): ...
+    """
+    return _set_options(func, None)
+
+
+def auto_defer(*, budget: Optional[float] = None, ephemeral: Optional[bool] = None):
+    """
+    自動deferの猶予秒数や、defer後の応答をエフェメラルにするかをコマンドごとに指定するデコレーター
+    """
+
+    def decorator(func):
+        return _set_options(func, {"budget": budget, "ephemeral": ephemeral})
+
+    return decorator
+
+
+# 自動deferしたインタラクションのID（応答処理の置き換えに使用）
+_auto_deferred: Set[int] = set()
+
+_original_defer = InteractionResponse.defer
+_original_send_message = InteractionResponse.send_message
+
+
+async def _guarded_defer(self: InteractionResponse, *args, **kwargs):
+    if self._parent.id in _auto_deferred:
+        # 自動deferの完了を待ち、既にdefer済みなら何もしない
+        async with self._response_lock:
+            pass
+        if self.is_done():
+            return None
+    return await _original_defer(self, *args, **kwargs)
+
+
+async def _guarded_send_message(self: InteractionResponse, *args, **kwargs):
+    if self._parent.id in _auto_deferred:
+        async with self._response_lock:
+            pass
+        if self.is_done():
+            # defer済みの応答はフォローアップとして送る
+            return await self._parent.followup.send(*args, **kwargs)
+    return await _original_send_message(self, *args, **kwargs)
+
+
+class DeferWatchdog:
+    """
+    実行中のアプリケーションコマンドを追跡し、猶予時間内に応答がなければ自動でdeferする
+    Discordの応答期限（3秒）切れによる「インタラクションに失敗しました」を防ぎ、
+    遅いコマンドをメトリクスとして可視化する
+    自動defer後にハンドラーが呼ぶ defer() は何もせず、send_message() はフォローアップになる
+    """
+
+    def __init__(self, budget: float = 2.0, ephemeral: bool = True):
+        self.budget = budget
+        self.ephemeral = ephemeral
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def install(self) -> None:
+        """
+        応答処理を自動defer対応のものに置き換える
+        """
+        InteractionResponse.defer = _guarded_defer
+        InteractionResponse.send_message = _guarded_send_message
+
+    def uninstall(self) -> None:
+        for handle in self._timers.values():
+            handle.cancel()
+        self._timers.clear()
+        _auto_deferred.clear()
+        InteractionResponse.defer = _original_defer
+        InteractionResponse.send_message = _original_send_message
+
+    def _count(self, command: str, key: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(command, {"invoked": 0, "deferred": 0})
+            counts[key] += 1
+
+    def track(self, ctx: discord.ApplicationContext) -> None:
+        """
+        コマンドの実行開始時に呼ぶ
+        """
+        command = ctx.command.qualified_name if ctx.command else "unknown"
+        self._count(command, "invoked")
+        metrics.inc("interaction_commands_total", command=command)
+
+        callback = getattr(ctx.command, "callback", None)
+        options = getattr(callback, _OPTIONS_ATTR, {})
+        if options is None:
+            return
+        budget = options.get("budget") or self.budget
+        ephemeral = options.get("ephemeral")
+        if ephemeral is None:
+            ephemeral = self.ephemeral
+
+        interaction_id = ctx.interaction.id
+        loop = asyncio.get_running_loop()
+        self._timers[interaction_id] = loop.call_later(
+            budget,
+            lambda: loop.create_task(self._expire(ctx, command, budget, ephemeral)),
+        )
+
+    def finish(self, ctx: discord.ApplicationContext) -> None:
+        """
+        コマンドの完了時（エラー含む）に呼ぶ
+        """
+        interaction_id = ctx.interaction.id
+        handle = self._timers.pop(interaction_id, None)
+        if handle is not None:
+            handle.cancel()
+        _auto_deferred.discard(interaction_id)
+
+    async def _expire(
+        self,
+        ctx: discord.ApplicationContext,
+        command: str,
+        budget: float,
+        ephemeral: bool,
+    ) -> None:
+        interaction = ctx.interaction
+        self._timers.pop(interaction.id, None)
+        if interaction.response.is_done():
+            return
+        _auto_deferred.add(interaction.id)
+        try:
+            await _original_defer(interaction.response, ephemeral=ephemeral)
+        except InteractionResponded:
+            # ハンドラーの応答と競合した場合
+            _auto_deferred.discard(interaction.id)
+            return
+        except discord.HTTPException as e:
+            _auto_deferred.discard(interaction.id)
+            logger.warning(f"Auto defer failed for /{command}: {e}")
+            return
+        self._count(command, "deferred")
+        metrics.inc("interaction_auto_defer_total", command=command)
+        logger.warning(f"/{command} did not respond within {budget:.1f}s; deferred")
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        コマンドごとの実行回数と自動defer回数
+        """
+        with self._lock:
+            return {command: dict(counts) for command, counts in self._counts.items()}
+
+
+defer_watchdog = DeferWatchdog(
+    budget=settings.INTERACTION_DEFER_BUDGET,
+    ephemeral=settings.INTERACTION_DEFER_EPHEMERAL,
+)
@@ -0,0 +1,457 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+from core import get_settings
+from utils.executor import run_blocking
+from utils.metrics import metrics
+from utils.redis import RedisCrud
+from utils.schemas import JobInteractionSchema, JobSchema
+
+logger = logging.getLogger("discord")
+
+# インタラクショントークンの有効期限（Discord側の仕様）
+INTERACTION_TOKEN_TTL = 15 * 60
+
+# 期限の来た遅延ジョブを各タイプのキューへ移動する
+# KEYS[1]: 遅延ジョブのZSET, ARGV: 現在時刻, 最大件数, キュープレフィックス
+PROMOTE_DELAYED_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, member in ipairs(due) do
+    local sep = string.find(member, ':[^:]*$')
+    local job_type = string.sub(member, 1, sep - 1)
+    local job_id = string.sub(member, sep + 1)
+    redis.call('ZREM', KEYS[1], member)
+    redis.call('LPUSH', ARGV[3] .. job_type, job_id)
+end
+return #due
+"""
+
+JobFunc = Callable[["JobContext"], Awaitable[Any]]
+
+
+class JobHandler:
+    """
+    ジョブタイプごとのハンドラー設定
+    """
+
+    def __init__(
+        self,
+        func: JobFunc,
+        concurrency: int,
+        max_retries: int,
+        backoff: float,
+        backoff_max: float,
+        timeout: Optional[float],
+    ):
+        self.func = func
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(self.backoff_max, self.backoff * (2 ** (attempts - 1)))
+
+
+class JobContext:
+    """
+    ハンドラーに渡されるジョブ実行コンテキスト
+    """
+
+    def __init__(self, queue: "JobQueue", job: JobSchema):
+        self.queue = queue
+        self.job = job
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        return self.job.payload
+
+    async def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """
+        進捗を記録し、メッセージがあれば元のインタラクションにフォローアップする
+        """
+        self.job.progress = max(0.0, min(1.0, fraction))
+        self.job.message = message
+        await self.queue._save(self.job)
+        if message is not None:
+            await self.queue._followup(self.job, message)
+
+
+class JobQueue:
+    """
+    Redisに永続化されるバックグラウンドジョブキュー
+    - jobs:{id}: ジョブ本体（JSON）
+    - jobs:queue:{type}: 待機中ジョブIDのリスト
+    - jobs:processing:{worker}: ワーカーが処理中のジョブIDリスト
+    - jobs:delayed: リトライ待ちジョブのZSET
+    ワーカーが異常終了した場合、処理中リストはハートビート切れを検知した
+    他のワーカー（または再起動後の自身）によってキューへ戻される
+    """
+
+    def __init__(self, prefix: str = "jobs"):
+        self.settings = get_settings()
+        self.prefix = prefix
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._crud = RedisCrud(db=0)
+        self._promote = self._crud.register_script(PROMOTE_DELAYED_SCRIPT)
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers: Dict[str, List[asyncio.Task]] = {}
+        self._maintenance: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Task] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.bot: Optional[discord.Bot] = None
+
+    # キー
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:{job_id}"
+
+    def _queue_key(self, job_type: str) -> str:
+        return f"{self.prefix}:queue:{job_type}"
+
+    def _processing_key(self, worker_id: str) -> str:
+        return f"{self.prefix}:processing:{worker_id}"
+
+    def _heartbeat_key(self, worker_id: str) -> str:
+        return f"{self.prefix}:workers:{worker_id}"
+
+    @property
+    def _delayed_key(self) -> str:
+        return f"{self.prefix}:delayed"
+
+    @property
+    def running(self) -> bool:
+        return self._maintenance is not None
+
+    def register(
+        self,
+        job_type: str,
+        func: JobFunc,
+        *,
+        concurrency: int = 1,
+        max_retries: int = 3,
+        backoff: float = 5.0,
+        backoff_max: float = 300.0,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        ジョブタイプのハンドラーを登録
+        キュー稼働中に登録した場合は即座にワーカーを起動する
+        """
+        self._handlers[job_type] = JobHandler(
+            func, max(1, concurrency), max_retries, backoff, backoff_max, timeout
+        )
+        if self.running:
+            self._spawn_workers(job_type)
+
+    def unregister(self, job_type: str) -> None:
+        """
+        ジョブタイプのハンドラーを解除（処理中のジョブはキューに戻される）
+        """
+        self._handlers.pop(job_type, None)
+        for task in self._workers.pop(job_type, []):
+            task.cancel()
+
+    async def enqueue(
+        self,
+        job_type: str,
+        payload: Optional[Dict[str, Any]] = None,
+        *,
+        ctx: Optional[discord.ApplicationContext] = None,
+        max_retries: Optional[int] = None,
+        delay: float = 0,
+    ) -> str:
+        """
+        ジョブを登録してIDを返す
+        ctxを渡すと進捗・結果がそのインタラクションにフォローアップされる
+        """
+        now = time.time()
+        handler = self._handlers.get(job_type)
+        if max_retries is None:
+            max_retries = handler.max_retries if handler else 3
+        job = JobSchema(
+            id=uuid.uuid4().hex,
+            type=job_type,
+            payload=payload or {},
+            max_retries=max_retries,
+            created_at=now,
+            updated_at=now,
+        )
+        if ctx is not None:
+            job.interaction = JobInteractionSchema(
+                application_id=ctx.interaction.application_id,
+                token=ctx.interaction.token,
+                expires_at=now + INTERACTION_TOKEN_TTL,
+            )
+
+        await run_blocking(self._push, job, delay, pool="db")
+        metrics.inc("jobs_enqueued_total", type=job_type)
+        return job.id
+
+    def _push(self, job: JobSchema, delay: float):
+        self._crud.set(self._job_key(job.id), job.model_dump(mode="json"))
+        if delay > 0:
+            self._crud.connect.zadd(
+                self._delayed_key, {f"{job.type}:{job.id}": time.time() + delay}
+            )
+        else:
+            self._crud.connect.lpush(self._queue_key(job.type), job.id)
+
+    async def get(self, job_id: str) -> Optional[JobSchema]:
+        """
+        ジョブの状態を取得
+        """
+        raw = await run_blocking(self._crud.get, self._job_key(job_id), pool="db")
+        return JobSchema.model_validate(raw) if raw is not None else None
+
+    async def _save(self, job: JobSchema, expire: Optional[int] = None):
+        job.updated_at = time.time()
+        await run_blocking(
+            self._crud.set,
+            self._job_key(job.id),
+            job.model_dump(mode="json"),
+            expire,
+            pool="db",
+        )
+
+    async def start(self, bot: discord.Bot) -> None:
+        """
+        ワーカーとメンテナンスタスクを起動
+        停止処理中の場合は完了を待ってから起動する（停止直後の再起動でハートビートを消されないため）
+        """
+        if self._stopping is not None:
+            await self._stopping
+        if self.running:
+            return
+        self.bot = bot
+        self._semaphore = asyncio.Semaphore(self.settings.JOB_MAX_CONCURRENCY)
+        await run_blocking(self._heartbeat, pool="db")
+        await run_blocking(self._recover_orphans, pool="db")
+        self._maintenance = asyncio.create_task(self._maintenance_loop())
+        for job_type in self._handlers:
+            self._spawn_workers(job_type)
+        logger.info(f"Job queue started as worker {self.worker_id}")
+
+    def stop(self) -> asyncio.Task:
+        """
+        全ワーカーを停止（処理中のジョブはキューに戻され、再起動後に再実行される）
+        ワーカーは即座に切り離し、停止の完了は戻り値のタスクで待つ
+        """
+        tasks = [task for tasks in self._workers.values() for task in tasks]
+        if self._maintenance is not None:
+            tasks.append(self._maintenance)
+        self._workers.clear()
+        self._maintenance = None
+        for task in tasks:
+            task.cancel()
+        if self._stopping is None:
+            self._stopping = asyncio.get_running_loop().create_task(
+                self._finish_stop(tasks)
+            )
+        return self._stopping
+
+    async def _finish_stop(self, tasks: List[asyncio.Task]) -> None:
+        try:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await run_blocking(
+                self._crud.delete, self._heartbeat_key(self.worker_id), pool="db"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to remove job worker heartbeat: {e}")
+        finally:
+            self._stopping = None
+
+    def _spawn_workers(self, job_type: str):
+        for task in self._workers.pop(job_type, []):
+            task.cancel()
+        handler = self._handlers[job_type]
+        self._workers[job_type] = [
+            asyncio.create_task(self._worker(job_type))
+            for _ in range(handler.concurrency)
+        ]
+
+    def _heartbeat(self):
+        self._crud.connect.set(
+            self._heartbeat_key(self.worker_id),
+            int(time.time()),
+            ex=self.settings.JOB_WORKER_HEARTBEAT * 3,
+        )
+
+    def _recover_orphans(self) -> int:
+        """
+        ハートビートが途絶えたワーカーの処理中ジョブをキューへ戻す
+        """
+        recovered = 0
+        for key in self._crud.connect.scan_iter(
+            match=self._processing_key("*"), count=100
+        ):
+            key = key.decode("utf-8")
+            worker_id = key.removeprefix(self._processing_key(""))
+            if self._crud.connect.exists(self._heartbeat_key(worker_id)):
+                continue
+            while (job_id := self._crud.connect.rpop(key)) is not None:
+                job_id = job_id.decode("utf-8")
+                raw = self._crud.get(self._job_key(job_id))
+                if raw is None:
+                    continue
+                # 先頭側に戻して優先的に再実行する
+                self._crud.connect.rpush(self._queue_key(raw["type"]), job_id)
+                recovered += 1
+        if recovered:
+            logger.warning(f"Recovered {recovered} orphaned jobs")
+        return recovered
+
+    def _claim(self, job_type: str) -> Optional[JobSchema]:
+        job_id = self._crud.connect.lmove(
+            self._queue_key(job_type),
+            self._processing_key(self.worker_id),
+            "RIGHT",
+            "LEFT",
+        )
+        if job_id is None:
+            return None
+        raw = self._crud.get(self._job_key(job_id.decode("utf-8")))
+        if raw is None:
+            self._crud.connect.lrem(self._processing_key(self.worker_id), 1, job_id)
+            return None
+        return JobSchema.model_validate(raw)
+
+    def _release(self, job: JobSchema, requeue: bool = False, delay: float = 0):
+        pipe = self._crud.connect.pipeline()
+        pipe.lrem(self._processing_key(self.worker_id), 1, job.id)
+        if delay > 0:
+            pipe.zadd(self._delayed_key, {f"{job.type}:{job.id}": time.time() + delay})
+        elif requeue:
+            pipe.rpush(self._queue_key(job.type), job.id)
+        pipe.execute()
+
+    async def _maintenance_loop(self):
+        interval = self.settings.JOB_WORKER_HEARTBEAT
+        last_heartbeat = 0.0
+        while True:
+            try:
+                now = time.time()
+                await run_blocking(
+                    self._promote,
+                    keys=[self._delayed_key],
+                    args=[now, 100, self._queue_key("")],
+                    pool="db",
+                )
+                if now - last_heartbeat >= interval:
+                    await run_blocking(self._heartbeat, pool="db")
+                    await run_blocking(self._recover_orphans, pool="db")
+                    last_heartbeat = now
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Redis障害・サーキットオープン・実行プールの混雑でもループは継続する
+                logger.error(f"Job queue maintenance failed: {e}")
+            await asyncio.sleep(self.settings.JOB_POLL_INTERVAL)
+
+    async def _worker(self, job_type: str):
+        while True:
+            try:
+                job = await run_blocking(self._claim, job_type, pool="db")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to claim job of type {job_type}: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.settings.JOB_POLL_INTERVAL)
+                continue
+            metrics.observe("jobs_queue_latency_seconds", time.time() - job.created_at)
+            async with self._semaphore:
+                try:
+                    await self._execute(job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # 結果の保存に失敗した場合など。処理中リストに残さずキューへ戻す
+                    logger.error(
+                        f"Job {job.id} ({job.type}) could not be processed: {e}"
+                    )
+                    try:
+                        await run_blocking(self._release, job, True, pool="db")
+                    except Exception as e:
+                        logger.error(f"Failed to requeue job {job.id}: {e}")
+
+    async def _execute(self, job: JobSchema):
+        handler = self._handlers.get(job.type)
+        if handler is None:
+            await run_blocking(self._release, job, True, pool="db")
+            return
+
+        job.status = "running"
+        job.attempts += 1
+        started_at = time.perf_counter()
+        try:
+            await self._save(job)
+            await asyncio.wait_for(handler.func(JobContext(self, job)), handler.timeout)
+        except asyncio.CancelledError:
+            # 停止時はキューに戻して再起動後に再実行
+            job.status = "queued"
+            job.attempts -= 1
+            await self._save(job)
+            await run_blocking(self._release, job, True, pool="db")
+            raise
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            metrics.inc("jobs_failed_attempts_total", type=job.type)
+            if job.attempts <= job.max_retries:
+                delay = handler.retry_delay(job.attempts)
+                job.status = "retrying"
+                logger.warning(
+                    f"Job {job.id} ({job.type}) failed, retrying in {delay:.0f}s: {e}"
+                )
+                await self._save(job)
+                # 待ち時間が0の場合は遅延キューを経由せず直接キューに戻す
+                await run_blocking(self._release, job, True, delay, pool="db")
+            else:
+                job.status = "failed"
+                logger.error(f"Job {job.id} ({job.type}) failed permanently: {e}")
+                await self._save(job, expire=self.settings.JOB_RESULT_TTL)
+                await run_blocking(self._release, job, pool="db")
+                metrics.inc("jobs_failed_total", type=job.type)
+                await self._followup(job, f"ジョブが失敗しました: {job.error}")
+            return
+        finally:
+            metrics.observe(
+                "jobs_run_seconds", time.perf_counter() - started_at, type=job.type
+            )
+
+        job.status = "succeeded"
+        job.progress = 1.0
+        await self._save(job, expire=self.settings.JOB_RESULT_TTL)
+        await run_blocking(self._release, job, pool="db")
+        metrics.inc("jobs_succeeded_total", type=job.type)
+        await self._followup(job, "ジョブが完了しました")
+
+    async def _followup(self, job: JobSchema, content: str):
+        interaction = job.interaction
+        if interaction is None or self.bot is None:
+            return
+        if interaction.expires_at <= time.time():
+            return
+        webhook = discord.Webhook.from_state(
+            data={
+                "id": interaction.application_id,
+                "type": 3,
+                "token": interaction.token,
+            },
+            state=self.bot._connection,
+        )
+        try:
+            await webhook.send(content, ephemeral=True)
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to send followup for job {job.id}: {e}")
+
+
+job_queue = JobQueue()
@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+
+from core import get_settings
+from utils.metrics import metrics
+from utils.rest import Priority
+
+settings = get_settings()
+
+logger = logging.getLogger("discord")
+
+_POLICY_ATTR = "__listener_policy__"
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_new", "coalesce")
+
+metrics.set_buckets(
+    "listener_wait_seconds", (0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+)
+
+
+@dataclass(frozen=True)
+class ListenerPolicy:
+    """
+    イベントリスナーの実行方針
+    concurrency: 同時に実行するハンドラーの上限
+    queue_size: 実行待ちの上限
+    overflow: 実行待ちが上限に達した場合の扱い
+        drop_oldest: 最も古いイベントを捨てる
+        drop_new: 新しいイベントを捨てる
+        coalesce: 同じkeyのイベントが実行待ちなら新しい引数で置き換える（上限時は新しいイベントを捨てる）
+    key: coalesce で使用する、イベントの引数からキーを求める関数
+    priority: ワーカーの割り当て順（INTERACTION > NORMAL > BACKGROUND）
+    """
+
+    concurrency: int = 1
+    queue_size: int = 1000
+    overflow: str = "drop_oldest"
+    key: Optional[Callable[..., Hashable]] = None
+    priority: Priority = Priority.NORMAL
+
+
+def listener_policy(
+    *,
+    concurrency: int = 1,
+    queue_size: int = 1000,
+    overflow: str = "drop_oldest",
+    key: Optional[Callable[..., Hashable]] = None,
+    priority: Priority = Priority.NORMAL,
+):
+    """
+    リスナーの同時実行数・実行待ちの上限・優先度を指定するデコレーター
+    指定したリスナーはタスクを無制限に作らず、listener_scheduler のワーカーで実行される
+    使用例:
+    @commands.Cog.listener()
+    @listener_policy(overflow="coalesce", key=lambda member: member.guild.id)
+    async def on_member_join(self, member): ...
+    """
+    if overflow not in OVERFLOW_POLICIES:
+        raise ValueError(f"Unknown overflow policy: {overflow}")
+    if overflow == "coalesce" and key is None:
+        raise ValueError("coalesce requires a key function")
+    policy = ListenerPolicy(
+        concurrency=concurrency,
+        queue_size=queue_size,
+        overflow=overflow,
+        key=key,
+        priority=priority,
+    )
+
+    def decorator(func):
+        setattr(func, _POLICY_ATTR, policy)
+        return func
+
+    return decorator
+
+
+def get_listener_policy(handler: Any) -> Optional[ListenerPolicy]:
+    return getattr(handler, _POLICY_ATTR, None)
+
+
+class _Job:
+    __slots__ = ("factory", "key", "enqueued_at")
+
+    def __init__(
+        self, factory: Callable[[], Awaitable[Any]], key: Optional[Hashable]
+    ) -> None:
+        self.factory = factory
+        self.key = key
+        self.enqueued_at = time.monotonic()
+
+
+class _Lane:
+    """
+    リスナーごとの実行待ちキュー
+    """
+
+    def __init__(self, name: str, policy: ListenerPolicy):
+        self.name = name
+        self.policy = policy
+        self.pending: Deque[_Job] = deque()
+        self.keyed: Dict[Hashable, _Job] = {}
+        self.running = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def ready(self) -> bool:
+        return bool(self.pending) and self.running < self.policy.concurrency
+
+
+class ListenerScheduler:
+    """
+    listener_policy を指定したリスナーを、リスナーごとの有限キューと共通のワーカーで実行する
+    イベントが集中してもハンドラーの同時実行数は workers 以下に抑えられ、あふれた分は
+    方針に従って捨てるかまとめる
+    ワーカーは優先度の高いリスナーから割り当て、BACKGROUNDが全ワーカーを占有しないよう1つは空けておく
+    方針を指定していないリスナー・アプリケーションコマンドは従来どおり即座に実行される
+    """
+
+    def __init__(self, workers: int = 32):
+        self.workers = workers
+        self._lanes: Dict[str, _Lane] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._background_running = 0
+
+    def submit(
+        self,
+        name: str,
+        policy: ListenerPolicy,
+        factory: Callable[[], Awaitable[Any]],
+        args: tuple = (),
+    ) -> bool:
+        """
+        実行を予約する。捨てられた場合はFalseを返す
+        factory は実行時に呼ばれ、ハンドラーのコルーチンを返す
+        """
+        self._ensure_workers()
+        lane = self._lanes.get(name)
+        if lane is None:
+            lane = self._lanes[name] = _Lane(name, policy)
+
+        key = None
+        if policy.overflow == "coalesce":
+            key = policy.key(*args)
+            queued = lane.keyed.get(key)
+            if queued is not None:
+                queued.factory = factory
+                lane.coalesced += 1
+                metrics.inc("listener_coalesced_total", listener=name)
+                return True
+
+        if len(lane.pending) >= policy.queue_size:
+            if policy.overflow != "drop_oldest":
+                self._drop(lane, "full")
+                return False
+            oldest = lane.pending.popleft()
+            if oldest.key is not None:
+                lane.keyed.pop(oldest.key, None)
+            self._drop(lane, "oldest")
+
+        job = _Job(factory, key)
+        lane.pending.append(job)
+        if key is not None:
+            lane.keyed[key] = job
+        metrics.set_gauge("listener_queue_depth", len(lane.pending), listener=name)
+        self._idle.clear()
+        self._wakeup.set()
+        return True
+
+    def _drop(self, lane: _Lane, reason: str) -> None:
+        lane.dropped += 1
+        metrics.inc("listener_dropped_total", listener=lane.name, reason=reason)
+        if lane.dropped == 1 or lane.dropped % 1000 == 0:
+            logger.warning(
+                f"Listener {lane.name} is overloaded; {lane.dropped} events dropped"
+            )
+
+    def _ensure_workers(self) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _next_lane(self) -> Optional[_Lane]:
+        best: Optional[_Lane] = None
+        for lane in self._lanes.values():
+            if not lane.ready():
+                continue
+            if (
+                lane.policy.priority >= Priority.BACKGROUND
+                and self._background_running >= max(1, self.workers - 1)
+            ):
+                continue
+            if best is None or (
+                lane.policy.priority,
+                lane.pending[0].enqueued_at,
+            ) < (best.policy.priority, best.pending[0].enqueued_at):
+                best = lane
+        return best
+
+    async def _worker(self) -> None:
+        while True:
+            lane = self._next_lane()
+            if lane is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            job = lane.pending.popleft()
+            if job.key is not None:
+                lane.keyed.pop(job.key, None)
+            metrics.set_gauge(
+                "listener_queue_depth", len(lane.pending), listener=lane.name
+            )
+            metrics.observe(
+                "listener_wait_seconds",
+                time.monotonic() - job.enqueued_at,
+                listener=lane.name,
+            )
+            background = lane.policy.priority >= Priority.BACKGROUND
+            lane.running += 1
+            if background:
+                self._background_running += 1
+            try:
+                await job.factory()
+            except Exception as e:
+                logger.error(f"Listener {lane.name} failed: {e}")
+            finally:
+                lane.running -= 1
+                if background:
+                    self._background_running -= 1
+                # 同時実行数の上限で待っていたキューを再開させる
+                self._wakeup.set()
+                if not any(
+                    lane.pending or lane.running for lane in self._lanes.values()
+                ):
+                    self._idle.set()
+
+    async def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        実行待ち・実行中のハンドラーがなくなるまで待つ（タイムアウトした場合はFalse）
+        """
+        if self._idle is None:
+            return True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        リスナーごとの実行待ち・実行中・破棄・集約件数
+        """
+        return {
+            name: {
+                "queued": len(lane.pending),
+                "running": lane.running,
+                "dropped": lane.dropped,
+                "coalesced": lane.coalesced,
+            }
+            for name, lane in self._lanes.items()
+        }
+
+
+listener_scheduler = ListenerScheduler(workers=settings.LISTENER_WORKERS)
@@ -0,0 +1,237 @@
+import logging
+import time
+from typing import Callable, Dict, Literal, Optional, Tuple
+
+import discord
+import redis
+from discord.ext import commands
+
+from core import get_settings
+from utils.circuit_breaker import CircuitOpenError
+from utils.executor import run_blocking
+from utils.metrics import metrics
+from utils.redis import RedisCrud
+
+logger = logging.getLogger("discord")
+
+Scope = Literal["user", "guild", "channel", "global"]
+Algorithm = Literal["fixed_window", "token_bucket"]
+
+# KEYS[1]: カウンターキー
+# ARGV: 上限, ウィンドウ(ms), 要求数
+# 戻り値: {付与数, ウィンドウ終了までの残り(ms)}
+FIXED_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1])) or 0
+local available = limit - current
+local granted = 0
+if available > 0 then
+    granted = math.min(available, requested)
+    redis.call('INCRBY', KEYS[1], granted)
+end
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl < 0 then
+    redis.call('PEXPIRE', KEYS[1], window)
+    ttl = window
+end
+return {granted, ttl}
+"""
+
+# KEYS[1]: バケットキー
+# ARGV: 容量, 補充レート(トークン/ms), 要求数
+# 戻り値: {付与数, 次のトークンまでの待機時間(ms)}
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now_ms
+tokens = math.min(capacity, tokens + math.max(0, now_ms - ts) * rate)
+local granted = math.min(math.floor(tokens), requested)
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now_ms)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate))
+local wait = 0
+if granted == 0 then
+    wait = math.ceil((1 - tokens) / rate)
+end
+return {granted, wait}
+"""
+
+# ローカル状態の掃除を行うエントリ数
+_LOCAL_STATE_PRUNE_SIZE = 10000
+
+
+class RateLimited(commands.CheckFailure):
+    """
+    レート制限に達した場合のエラー
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Rate limit exceeded for {name}. Retry in {retry_after:.1f}s")
+
+
+class _LocalState:
+    """
+    キーごとのプロセス内状態
+    permits: Redisから先取りした残り許可数
+    """
+
+    __slots__ = ("permits", "expires_at", "blocked_until")
+
+    def __init__(self):
+        self.permits = 0
+        self.expires_at = 0.0
+        self.blocked_until = 0.0
+
+
+class RateLimiter:
+    """
+    Redisを用いた分散レート制限
+    制限中のキーはプロセス内で拒否し、Redisへの往復を発生させない
+    lease > 1 の場合は許可をまとめて先取りし、以降の呼び出しをローカルで許可する
+    （プロセス間の精度と引き換えにRedisアクセスを1/leaseに削減）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: int,
+        per: float,
+        *,
+        scope: Scope = "user",
+        algorithm: Algorithm = "fixed_window",
+        lease: int = 1,
+    ):
+        if rate < 1 or per <= 0:
+            raise ValueError("rate must be >= 1 and per must be > 0")
+        self.name = name
+        self.rate = rate
+        self.per = per
+        self.scope = scope
+        self.algorithm = algorithm
+        self.lease = max(1, min(lease, rate))
+        self.settings = get_settings()
+        self._crud = RedisCrud(db=0)
+        self._script = self._crud.register_script(
+            FIXED_WINDOW_SCRIPT if algorithm == "fixed_window" else TOKEN_BUCKET_SCRIPT
+        )
+        self._local: Dict[str, _LocalState] = {}
+
+    def key_for(self, ctx: discord.ApplicationContext) -> str:
+        """
+        スコープに応じたRedisキーを生成
+        """
+        if self.scope == "user":
+            scope_id = str(ctx.author.id)
+        elif self.scope == "guild":
+            scope_id = str(ctx.guild.id) if ctx.guild else f"dm:{ctx.author.id}"
+        elif self.scope == "channel":
+            scope_id = str(ctx.channel.id) if ctx.channel else f"dm:{ctx.author.id}"
+        else:
+            scope_id = "global"
+        return f"ratelimit:{self.name}:{scope_id}"
+
+    def _call_script(self, key: str) -> Tuple[int, int]:
+        if self.algorithm == "fixed_window":
+            args = [self.rate, int(self.per * 1000), self.lease]
+        else:
+            args = [self.rate, self.rate / (self.per * 1000), self.lease]
+        granted, wait_ms = self._script(keys=[key], args=args)
+        return int(granted), int(wait_ms)
+
+    def _prune(self, now: float):
+        expired = [
+            key
+            for key, state in self._local.items()
+            if state.blocked_until <= now
+            and (state.permits == 0 or state.expires_at <= now)
+        ]
+        for key in expired:
+            del self._local[key]
+
+    async def acquire(self, ctx: discord.ApplicationContext) -> None:
+        """
+        許可を1つ取得する。制限中の場合はRateLimitedを送出
+        """
+        key = self.key_for(ctx)
+        now = time.monotonic()
+        state = self._local.get(key)
+
+        if state is not None:
+            if state.blocked_until > now:
+                metrics.inc("ratelimit_rejected_total", name=self.name, path="local")
+                raise RateLimited(self.name, state.blocked_until - now)
+            if state.permits > 0 and state.expires_at > now:
+                state.permits -= 1
+                metrics.inc("ratelimit_allowed_total", name=self.name, path="local")
+                return
+
+        try:
+            granted, wait_ms = await run_blocking(self._call_script, key, pool="db")
+        except (redis.RedisError, CircuitOpenError) as e:
+            if self.settings.RATE_LIMIT_FAIL_OPEN:
+                logger.warning(f"Rate limiter {self.name} bypassed: {e}")
+                return
+            raise
+
+        now = time.monotonic()
+        if state is None:
+            if len(self._local) >= _LOCAL_STATE_PRUNE_SIZE:
+                self._prune(now)
+            state = self._local.setdefault(key, _LocalState())
+
+        if granted <= 0:
+            state.permits = 0
+            state.blocked_until = now + wait_ms / 1000
+            metrics.inc("ratelimit_rejected_total", name=self.name, path="redis")
+            raise RateLimited(self.name, wait_ms / 1000)
+
+        state.permits = granted - 1
+        state.expires_at = now + (
+            wait_ms / 1000 if self.algorithm == "fixed_window" else self.per
+        )
+        metrics.inc("ratelimit_allowed_total", name=self.name, path="redis")
+
+
+def rate_limit(
+    rate: int,
+    per: float,
+    *,
+    scope: Scope = "user",
+    algorithm: Algorithm = "fixed_window",
+    lease: int = 1,
+    name: Optional[str] = None,
+) -> Callable:
+    """
+    コマンドにレート制限を適用するデコレーター
+    使用例:
+    @slash_command(name="export")
+    @rate_limit(3, 60, scope="guild")
+    async def export(self, ctx): ...
+    """
+
+    def decorator(func):
+        limiter = RateLimiter(
+            name or func.__qualname__,
+            rate,
+            per,
+            scope=scope,
+            algorithm=algorithm,
+            lease=lease,
+        )
+
+        async def predicate(ctx: discord.ApplicationContext) -> bool:
+            await limiter.acquire(ctx)
+            return True
+
+        return commands.check(predicate)(func)
+
+    return decorator
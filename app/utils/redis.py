@@ -1,25 +1,83 @@
 import json
-from typing import Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Set
 
 import redis
+from redis.client import Pipeline
+from redis.commands.core import Script
 
 from core import get_settings
+from utils.cache import LocalCache
+from utils.circuit_breaker import CircuitOpenError, get_breaker
+from utils.metrics import metrics
+from utils.tracing import tracer
 
 settings = get_settings()
 
+# 接続障害・タイムアウトのみをRedisの障害とみなす
+redis_breaker = get_breaker(
+    "redis",
+    is_failure=lambda e: isinstance(e, (redis.ConnectionError, redis.TimeoutError)),
+)
+
+# 障害中に古い値を返した後の再検証（呼び出し元を待たせないよう別スレッドで行う）
+_revalidator = ThreadPoolExecutor(max_workers=1, thread_name_prefix="redis-revalidate")
+_revalidating: Set[str] = set()
+_revalidating_lock = threading.Lock()
+
+
+class _TracedPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        with redis_breaker.guard():
+            if not tracer.active():
+                return super().execute(raise_on_error)
+            with tracer.span("PIPELINE", "redis", commands=len(self.command_stack)):
+                return super().execute(raise_on_error)
+
+
+class TracedRedis(redis.Redis):
+    """
+    コマンドごとにトレースのスパンを記録するRedisクライアント
+    全てのコマンド・パイプライン（Luaスクリプト・SCANを含む）は redis_breaker を通り、
+    サーキットが開いている間は接続を待たずにCircuitOpenErrorを送出する
+    Pub/Subの購読は対象外（購読側で再接続を行う）
+    """
+
+    def execute_command(self, *args, **options):
+        with redis_breaker.guard():
+            if not tracer.active():
+                return super().execute_command(*args, **options)
+            with tracer.span(str(args[0]), "redis"):
+                return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None) -> Pipeline:
+        return _TracedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
 
 class RedisCrud:
     """
     Redis基本操作クラス
     """
 
-    def __init__(self, db: int = 0):
+    def __init__(self, db: int = 0, fallback_cache: Optional[LocalCache] = None):
         """
         Redisインスタンス初期化
+        fallback_cache を指定すると、取得した値をローカルにも保持し、
+        Redis障害時はREDIS_STALE_TTL秒以内の古い値を返す（stale-while-revalidate）
+        サーキットが閉じていない間はRedisを待たずに古い値を返し、裏で再検証する
         """
-        self.connect = redis.Redis(
-            host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=db
+        self.connect = TracedRedis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=db,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
         )
+        self.fallback_cache = fallback_cache
+        self._cache_prefix = f"{db}:"
 
     def __enter__(self):
         return self
@@ -33,7 +91,18 @@ class RedisCrud:
         注: 複雑なオブジェクトはJSON形式で保存されており、
         基本型 (str, int, float, bool, list, dict) のみサポート
         """
-        data = self.connect.get(key)
+        data = None
+        if redis_breaker.state != "closed":
+            data = self._stale(key)
+            if data is not None:
+                self._revalidate(key)
+        if data is None:
+            try:
+                data = self._fetch(key)
+            except (CircuitOpenError, redis.ConnectionError, redis.TimeoutError):
+                data = self._stale(key)
+                if data is None:
+                    raise
         if data is None:
             return None
 
@@ -55,10 +124,10 @@ class RedisCrud:
             # JSON文字列に変換してバイト列としてエンコード
             json_data = json.dumps(value).encode("utf-8")
 
-            if expire is not None:
-                return self.connect.set(key, json_data, ex=expire)
-
-            return self.connect.set(key, json_data)
+            result = self.connect.set(key, json_data, ex=expire)
+            if self.fallback_cache is not None:
+                self.fallback_cache.set(self._cache_prefix + key, json_data)
+            return result
         except (TypeError, ValueError) as e:
             # シリアル化できないオブジェクトの場合はエラーログを出力
             print(f"Error encoding value for Redis key {key}: {str(e)}")
@@ -68,4 +137,66 @@ class RedisCrud:
         """
         データ削除
         """
+        self.discard_local(key)
         return self.connect.delete(key)
+
+    def discard_local(self, key: str) -> None:
+        """
+        ローカルキャッシュのみから削除（Redis側で別途削除した場合に使用）
+        """
+        if self.fallback_cache is not None:
+            self.fallback_cache.delete(self._cache_prefix + key)
+
+    def _fetch(self, key: str) -> Optional[bytes]:
+        """
+        Redisから取得し、ローカルキャッシュを更新する
+        """
+        data = self.connect.get(key)
+        if self.fallback_cache is not None:
+            if data is None:
+                self.fallback_cache.delete(self._cache_prefix + key)
+            else:
+                self.fallback_cache.set(self._cache_prefix + key, data)
+        return data
+
+    def _revalidate(self, key: str) -> None:
+        """
+        古い値を返したキーをバックグラウンドで取得し直す（同じキーの再検証は1件にまとめる）
+        half_open中はこの取得が試行となるため、復旧の確認でも呼び出し元は待たされない
+        """
+        cache_key = self._cache_prefix + key
+        with _revalidating_lock:
+            if cache_key in _revalidating:
+                return
+            _revalidating.add(cache_key)
+
+        def run() -> None:
+            try:
+                self._fetch(key)
+                metrics.inc("redis_revalidations_total", result="ok")
+            except (CircuitOpenError, redis.RedisError):
+                metrics.inc("redis_revalidations_total", result="error")
+            finally:
+                with _revalidating_lock:
+                    _revalidating.discard(cache_key)
+
+        _revalidator.submit(run)
+
+    def _stale(self, key: str) -> Optional[bytes]:
+        """
+        障害時にローカルキャッシュの古い値を取得する
+        """
+        if self.fallback_cache is None:
+            return None
+        cached = self.fallback_cache.get(self._cache_prefix + key)
+        if cached is None or cached[1] > settings.REDIS_STALE_TTL:
+            return None
+        metrics.inc("redis_stale_reads_total")
+        return cached[0]
+
+    def register_script(self, script: str) -> Script:
+        """
+        Luaスクリプトを登録
+        呼び出し時はEVALSHAを使用し、未ロードの場合は自動でEVALにフォールバックする
+        """
+        return self.connect.register_script(script)
@@ -0,0 +1,385 @@
+import asyncio
+import enum
+import logging
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import aiohttp
+import discord
+
+from core import get_settings
+from utils.metrics import metrics
+from utils.tracing import tracer
+
+T = TypeVar("T")
+
+logger = logging.getLogger("discord")
+
+settings = get_settings()
+
+_API_PATH_RE = re.compile(r"^/api/v\d+")
+# Discordのレート制限はchannel/guild/webhookのIDごとに分かれる（メジャーパラメータ）
+_MAJOR_RE = re.compile(r"^/(channels|guilds|webhooks)/(\d+)")
+_WEBHOOK_TOKEN_RE = re.compile(r"^/(webhooks|interactions)/(\d+)/[^/]+")
+_SNOWFLAKE_RE = re.compile(r"/\d{15,}")
+
+# バケット状態の掃除を行うエントリ数
+_BUCKET_PRUNE_SIZE = 10000
+
+# 呼び出しが事前に確保した予算（トレースで計上する際に差し引く）
+_prepaid: ContextVar[Optional[List[int]]] = ContextVar("rest_prepaid", default=None)
+
+
+class Priority(enum.IntEnum):
+    """
+    REST呼び出しの優先度（小さいほど優先）
+    INTERACTION はキューを経由せず即座に実行される
+    """
+
+    INTERACTION = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+@lru_cache(maxsize=4096)
+def _normalize(method: str, path: str) -> Tuple[str, str]:
+    """
+    (メトリクス用のルート, レート制限バケットのキー) を返す
+    """
+    path = _API_PATH_RE.sub("", path)
+    path = _WEBHOOK_TOKEN_RE.sub(r"/\1/\2/{token}", path)
+    major = _MAJOR_RE.match(path)
+    template = _SNOWFLAKE_RE.sub("/{id}", path)
+    route = f"{method} {template}"
+    if major:
+        return route, f"{route}:{major.group(2)}"
+    return route, route
+
+
+@dataclass
+class _Bucket:
+    remaining: int = 1
+    reset_at: float = 0.0
+
+
+@dataclass
+class _QueuedCall:
+    priority: Priority
+    func: Callable[..., Awaitable[Any]]
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    bucket: Optional[str]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class RestScheduler:
+    """
+    DiscordへのREST呼び出しのスケジューラー
+    - aiohttpのトレースで全リクエストのルート別レイテンシ・429・バケット残量を記録する
+    - グローバルレート制限の予算をトークンバケットで管理し、
+      BACKGROUNDはreserve分を残して使うことでインタラクション応答の予算を確保する
+    - NORMAL/BACKGROUNDは優先度ごとのキューを経由し、残量0のバケットはリセットまで待ってから送る
+      BACKGROUNDは実行中の数が上限に達している間はキューから取り出さず、NORMALを先に送る
+    py-cord自身の429処理はそのまま残り、このスケジューラーは429を起こさないための前段として働く
+    """
+
+    def __init__(
+        self,
+        *,
+        global_rate: float,
+        background_share: float,
+        workers: int,
+    ):
+        self.global_rate = global_rate
+        self.reserve = global_rate * (1 - background_share)
+        self.workers = workers
+        self._tokens = global_rate
+        self._refilled_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._buckets: Dict[str, _Bucket] = {}
+        self._queues: Dict[Priority, Deque[_QueuedCall]] = {
+            Priority.NORMAL: deque(),
+            Priority.BACKGROUND: deque(),
+        }
+        self._wakeup: Optional[asyncio.Event] = None
+        self._background_running = 0
+        self._tasks: List[asyncio.Task] = []
+        self.trace_config = self._create_trace_config()
+
+    # トレース
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        trace_config.freeze()
+        return trace_config
+
+    def attach(self, bot: discord.Client) -> None:
+        """
+        botのHTTPセッションにトレースを登録し、ワーカーを起動する
+        セッションは再接続時に作り直されるため on_connect のたびに呼ぶ
+        """
+        # py-cord 2.6 はセッションを公開していないため、名前修飾された非公開属性を参照する
+        session: Optional[aiohttp.ClientSession] = getattr(
+            bot.http, "_HTTPClient__session", None
+        )
+        if session is None:
+            logger.warning(
+                "Discord HTTP session not found; REST metrics and rate budget "
+                "tracking are disabled (requires py-cord 2.6.x)"
+            )
+        elif self.trace_config not in session._trace_configs:
+            session._trace_configs.append(self.trace_config)
+        if not self._tasks:
+            self._wakeup = asyncio.Event()
+            self._tasks = [
+                asyncio.create_task(self._worker()) for _ in range(self.workers)
+            ]
+
+    def stop(self) -> asyncio.Future:
+        """
+        ワーカーを停止する（キュー内の呼び出しはキャンセルされる）
+        直後の attach() で新しいワーカーを起動できるよう即座に切り離し、終了は戻り値で待つ
+        """
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for queue in self._queues.values():
+            while queue:
+                item = queue.popleft()
+                if not item.future.done():
+                    item.future.cancel()
+        return asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _on_request_start(
+        self, session, ctx: SimpleNamespace, params: aiohttp.TraceRequestStartParams
+    ):
+        ctx.started_at = time.monotonic()
+        ctx.span = None
+        if tracer.active():
+            route, _ = _normalize(params.method, params.url.path)
+            ctx.span = tracer.start_span(route, "rest")
+        prepaid = _prepaid.get()
+        if prepaid and prepaid[0] > 0:
+            prepaid[0] -= 1
+        else:
+            self._consume()
+
+    async def _on_request_end(
+        self, session, ctx: SimpleNamespace, params: aiohttp.TraceRequestEndParams
+    ):
+        route, bucket = _normalize(params.method, params.url.path)
+        response = params.response
+        status = response.status
+        tracer.finish_span(ctx.span, status=status)
+        metrics.observe(
+            "rest_request_seconds", time.monotonic() - ctx.started_at, route=route
+        )
+        metrics.inc("rest_requests_total", route=route, status=str(status))
+
+        headers = response.headers
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None:
+            if len(self._buckets) >= _BUCKET_PRUNE_SIZE:
+                self._prune_buckets()
+            state = self._buckets.setdefault(bucket, _Bucket())
+            state.remaining = int(remaining)
+            state.reset_at = time.monotonic() + float(reset_after)
+
+        if status == 429:
+            scope = headers.get("X-RateLimit-Scope", "user")
+            metrics.inc("rest_429_total", route=route, scope=scope)
+            retry_after = float(headers.get("Retry-After", 1))
+            if headers.get("X-RateLimit-Global") or scope == "global":
+                self._blocked_until = time.monotonic() + retry_after
+                self._tokens = 0
+            logger.warning(f"REST 429 on {route} ({scope}), retry after {retry_after}s")
+
+    async def _on_request_exception(
+        self, session, ctx: SimpleNamespace, params: aiohttp.TraceRequestExceptionParams
+    ):
+        route, _ = _normalize(params.method, params.url.path)
+        tracer.finish_span(ctx.span, error=type(params.exception).__name__)
+        metrics.inc("rest_requests_total", route=route, status="error")
+
+    # 予算管理
+
+    def _prune_buckets(self):
+        now = time.monotonic()
+        expired = [key for key, state in self._buckets.items() if state.reset_at <= now]
+        for key in expired:
+            del self._buckets[key]
+
+    def _refill(self, now: float):
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self._tokens = min(self.global_rate, self._tokens + elapsed * self.global_rate)
+
+    def _consume(self):
+        self._refill(time.monotonic())
+        self._tokens -= 1
+
+    def _wait_time(self, priority: Priority, bucket: Optional[str]) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        if self._blocked_until > now:
+            return self._blocked_until - now
+        if bucket is not None:
+            state = self._buckets.get(bucket)
+            if state is not None:
+                if state.reset_at <= now:
+                    del self._buckets[bucket]
+                elif state.remaining <= 0:
+                    return state.reset_at - now
+        floor = 1 + (self.reserve if priority >= Priority.BACKGROUND else 0)
+        if self._tokens < floor:
+            return (floor - self._tokens) / self.global_rate
+        return 0.0
+
+    def _bucket_for(self, route: Optional[Tuple[str, str]]) -> Optional[str]:
+        if route is None:
+            return None
+        method, path = route
+        return _normalize(method, path)[1]
+
+    # 呼び出し
+
+    async def call(
+        self,
+        func: Callable[..., Awaitable[T]],
+        *args: Any,
+        priority: Priority = Priority.NORMAL,
+        route: Optional[Tuple[str, str]] = None,
+        **kwargs: Any,
+    ) -> T:
+        """
+        REST呼び出しを優先度に従って実行する
+        route に ("POST", "/channels/123/messages") のように送信先を渡すと、
+        そのバケットの残量が0の間は送信を待つ
+        使用例:
+        await rest.call(guild.leave, priority=Priority.BACKGROUND)
+        """
+        metrics.inc("rest_scheduled_total", priority=priority.name.lower())
+        if priority == Priority.INTERACTION:
+            return await func(*args, **kwargs)
+        if not self._tasks:
+            # ワーカー起動前（接続前）は予算の確認のみ行ってその場で実行する
+            bucket = self._bucket_for(route)
+            while (wait := self._wait_time(priority, bucket)) > 0:
+                await asyncio.sleep(wait)
+            return await func(*args, **kwargs)
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(
+            _QueuedCall(
+                priority=priority,
+                func=func,
+                args=args,
+                kwargs=kwargs,
+                bucket=self._bucket_for(route),
+                future=future,
+            )
+        )
+        metrics.set_gauge("rest_queue_depth", self._queued())
+        self._wakeup.set()
+        return await future
+
+    def _queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _next(self) -> Optional[_QueuedCall]:
+        if self._queues[Priority.NORMAL]:
+            return self._queues[Priority.NORMAL].popleft()
+        # BACKGROUNDが全ワーカーを占有しないよう1つは空けておく
+        if self._queues[Priority.BACKGROUND] and self._background_running < max(
+            1, self.workers - 1
+        ):
+            return self._queues[Priority.BACKGROUND].popleft()
+        return None
+
+    async def _worker(self):
+        while True:
+            item = self._next()
+            if item is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            metrics.set_gauge("rest_queue_depth", self._queued())
+            background = item.priority >= Priority.BACKGROUND
+            if background:
+                self._background_running += 1
+            try:
+                if not item.future.done():
+                    await self._run(item)
+            except asyncio.CancelledError:
+                item.future.cancel()
+                raise
+            finally:
+                if background:
+                    self._background_running -= 1
+                    # 上限で待っていたBACKGROUNDを再開させる
+                    self._wakeup.set()
+
+    async def _run(self, item: _QueuedCall):
+        priority = item.priority
+        while (wait := self._wait_time(priority, item.bucket)) > 0:
+            await asyncio.sleep(wait)
+        if item.future.done():
+            return
+        self._tokens -= 1
+        state = self._buckets.get(item.bucket) if item.bucket else None
+        if state is not None:
+            # 応答を待たずに同じバケットへ送りすぎないよう先に減らしておく
+            state.remaining -= 1
+        metrics.observe(
+            "rest_queue_wait_seconds",
+            time.monotonic() - item.enqueued_at,
+            priority=priority.name.lower(),
+        )
+        token = _prepaid.set([1])
+        try:
+            result = await item.func(*item.args, **item.kwargs)
+        except Exception as e:
+            if not item.future.done():
+                item.future.set_exception(e)
+        else:
+            if not item.future.done():
+                item.future.set_result(result)
+        finally:
+            _prepaid.reset(token)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill(time.monotonic())
+        return {
+            "queued": self._queued(),
+            "tokens": round(self._tokens, 1),
+            "buckets": len(self._buckets),
+            "workers": len(self._tasks),
+        }
+
+
+rest = RestScheduler(
+    global_rate=settings.REST_GLOBAL_RATE,
+    background_share=settings.REST_BACKGROUND_SHARE,
+    workers=settings.REST_SCHEDULER_WORKERS,
+)
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Any, Dict, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -11,3 +11,32 @@ class SessionSchema(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     data: Dict[str, Any] = {}
+
+
+class JobInteractionSchema(BaseModel):
+    """
+    ジョブの進捗を返すインタラクション情報
+    """
+
+    application_id: int
+    token: str
+    expires_at: float
+
+
+class JobSchema(BaseModel):
+    """
+    バックグラウンドジョブスキーマ
+    """
+
+    id: str
+    type: str
+    payload: Dict[str, Any] = {}
+    status: Literal["queued", "running", "retrying", "succeeded", "failed"] = "queued"
+    attempts: int = 0
+    max_retries: int = 3
+    progress: float = 0.0
+    message: Optional[str] = None
+    error: Optional[str] = None
+    interaction: Optional[JobInteractionSchema] = None
+    created_at: float
+    updated_at: float
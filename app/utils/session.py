@@ -1,22 +1,97 @@
-from typing import Optional
+import logging
+import re
+import threading
+from typing import Dict, Iterator, List, Optional
+
+import redis
 
 from core import get_settings
+from utils.cache import LocalCache
+from utils.circuit_breaker import CircuitOpenError
+from utils.metrics import metrics
 from utils.redis import RedisCrud
 from utils.schemas import SessionSchema
 
 settings = get_settings()
 
+logger = logging.getLogger("discord")
+
+_GLOB_SPECIAL_RE = re.compile(r"([*?\[\]\\])")
+
+# Redis障害時に直近のセッションを返すためのローカルキャッシュ（プロセス内で共有）
+session_cache: LocalCache = LocalCache(max_size=settings.LOCAL_CACHE_MAX_SIZE)
+
+
+class SessionTtlRefresher:
+    """
+    読み取り時のTTL延長（スライディング有効期限）をまとめて行う
+    同じキーへの延長は次のフラッシュまで1件に集約し、パイプラインのEXPIREで一括送信する
+    """
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._crud = RedisCrud(db=0)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def touch(self, key: str, ttl: int) -> None:
+        """
+        TTL延長を予約する。溜まりすぎた場合はその場でフラッシュする
+        """
+        with self._lock:
+            self._pending[key] = ttl
+            full = len(self._pending) >= self.max_pending
+        if full:
+            try:
+                self.flush()
+            except (CircuitOpenError, redis.RedisError) as e:
+                logger.warning(f"Session TTL refresh failed: {e}")
+
+    def flush(self) -> int:
+        """
+        予約されたTTL延長を送信し、件数を返す
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            with self._crud.connect.pipeline(transaction=False) as pipe:
+                for key, ttl in pending.items():
+                    # 期限切れで消えたキー・有効期限のないキーにはEXPIREは作用しない
+                    pipe.expire(key, ttl, xx=True)
+                pipe.execute()
+        except Exception:
+            # 送信できなかった延長は次のフラッシュで再送する（その間の新しい予約を優先）
+            with self._lock:
+                for key, ttl in pending.items():
+                    self._pending.setdefault(key, ttl)
+            raise
+        metrics.observe("session_ttl_refresh_batch_size", len(pending))
+        return len(pending)
+
+
+session_refresher = SessionTtlRefresher()
+
 
 class SessionCrud:
     """
     セッション管理クラス
+    キーは "session:" 名前空間に格納され、読み取りのたびに有効期限が延長される
     """
 
-    def __init__(self):
+    NAMESPACE = "session"
+
+    def __init__(self, ttl: Optional[int] = None):
         """
         初期化
+        ttl: セッションの有効期限（秒）。未指定の場合は SESSION_TTL
         """
-        self.crud = RedisCrud(db=0)
+        self.crud = RedisCrud(db=0, fallback_cache=session_cache)
+        self.ttl = ttl or settings.SESSION_TTL
 
     def __enter__(self):
         return self
@@ -24,23 +99,78 @@ class SessionCrud:
     def __exit__(self, exc_type, exc_value, traceback):
         self.crud.__exit__(exc_type, exc_value, traceback)
 
-    def get(self, key: str) -> Optional[SessionSchema]:
+    @classmethod
+    def key(cls, key: str) -> str:
+        """
+        名前空間付きのRedisキーを取得
+        """
+        return f"{cls.NAMESPACE}:{key}"
+
+    def get(self, key: str, refresh: bool = True) -> Optional[SessionSchema]:
         """
         セッションデータ取得
+        refresh=True の場合、有効期限の延長を予約する
         """
-        raw = self.crud.get(key)
+        raw = self.crud.get(self.key(key))
         if raw is None:
             return None
+        if refresh:
+            session_refresher.touch(self.key(key), self.ttl)
         return SessionSchema.model_validate(raw)
 
     def set(self, key: str, value: SessionSchema, expire: int | None = None) -> bool:
         """
         セッションデータ設定
+        expire: 有効期限（秒）。未指定の場合は有効期限なし（読み取り時の延長も行われない）
         """
-        return self.crud.set(key, value.model_dump(), expire=expire)
+        return self.crud.set(self.key(key), value.model_dump(), expire=expire)
 
     def delete(self, key: str) -> int:
         """
         セッションデータ削除
         """
-        return self.crud.delete(key)
+        return self.crud.delete(self.key(key))
+
+    def scan(self, prefix: str = "") -> Iterator[List[bytes]]:
+        """
+        指定プレフィックスのセッションキーを小さなバッチで列挙する
+        KEYSと異なりRedisをブロックしない（列挙中に追加・削除されたキーは含まれない場合がある）
+        """
+        pattern = self.key(_GLOB_SPECIAL_RE.sub(r"\\\1", prefix)) + "*"
+        batch: List[bytes] = []
+        for key in self.crud.connect.scan_iter(
+            match=pattern, count=settings.SESSION_SCAN_BATCH
+        ):
+            batch.append(key)
+            if len(batch) >= settings.SESSION_SCAN_BATCH:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def stats(self, prefix: str = "") -> Dict[str, int]:
+        """
+        セッション数と使用メモリ量（バイト）を集計する
+        """
+        count = 0
+        size = 0
+        for batch in self.scan(prefix):
+            with self.crud.connect.pipeline(transaction=False) as pipe:
+                for key in batch:
+                    pipe.memory_usage(key)
+                usages = pipe.execute()
+            count += len(batch)
+            size += sum(usage or 0 for usage in usages)
+        return {"count": count, "bytes": size}
+
+    def purge(self, prefix: str = "") -> int:
+        """
+        指定プレフィックスのセッションを削除し、削除件数を返す
+        UNLINKによりメモリ解放はRedisのバックグラウンドで行われる
+        """
+        deleted = 0
+        for batch in self.scan(prefix):
+            deleted += self.crud.connect.unlink(*batch)
+            for key in batch:
+                self.crud.discard_local(key.decode("utf-8"))
+        return deleted
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import discord
+import psutil
+
+from core import get_settings
+from utils.metrics import metrics
+
+settings = get_settings()
+
+
+def memory_usage_mb() -> float:
+    """
+    プロセスのメモリ使用量（RSS、MB単位）
+    """
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+@dataclass(frozen=True)
+class StatsSample:
+    """
+    ある時点の集計値
+    """
+
+    timestamp: float
+    guilds: int
+    members: int
+    channels: int
+    shards: int
+    memory_mb: Optional[float] = None
+
+
+class BotStats:
+    """
+    サーバー・メンバー・チャンネル数をゲートウェイイベントから差分で保持する
+    サーバーごとの値を覚えておき、イベントのたびにそのサーバーの差分だけを合計に反映するため、
+    読み取りはサーバー数に依存しない（シャーディング時はシャードごとの合計も保持する）
+    """
+
+    def __init__(self, history_size: int = 1440):
+        self._lock = threading.Lock()
+        # guild_id -> (members, channels, shard_id)
+        self._guilds: Dict[int, Tuple[int, int, int]] = {}
+        # shard_id -> [guilds, members, channels]
+        self._shards: Dict[int, List[int]] = {}
+        self.members = 0
+        self.channels = 0
+        self.memory_mb: Optional[float] = None
+        self.history: Deque[StatsSample] = deque(maxlen=history_size)
+
+    @property
+    def guilds(self) -> int:
+        return len(self._guilds)
+
+    def _apply(self, guild_id: int, entry: Optional[Tuple[int, int, int]]) -> None:
+        previous = self._guilds.pop(guild_id, None)
+        if previous is not None:
+            members, channels, shard_id = previous
+            self.members -= members
+            self.channels -= channels
+            shard = self._shards[shard_id]
+            shard[0] -= 1
+            shard[1] -= members
+            shard[2] -= channels
+            if shard[0] == 0:
+                del self._shards[shard_id]
+        if entry is not None:
+            members, channels, shard_id = entry
+            self._guilds[guild_id] = entry
+            self.members += members
+            self.channels += channels
+            shard = self._shards.setdefault(shard_id, [0, 0, 0])
+            shard[0] += 1
+            shard[1] += members
+            shard[2] += channels
+
+    @staticmethod
+    def _entry(guild: discord.Guild) -> Tuple[int, int, int]:
+        return (
+            guild.member_count or 0,
+            len(guild._channels),
+            guild.shard_id or 0,
+        )
+
+    def update_guild(self, guild: discord.Guild) -> None:
+        """
+        サーバーの現在値を反映する（参加・利用可能化・メンバーやチャンネルの増減時）
+        """
+        if guild.unavailable:
+            self.remove_guild(guild.id)
+            return
+        entry = self._entry(guild)
+        with self._lock:
+            self._apply(guild.id, entry)
+
+    def remove_guild(self, guild_id: int) -> None:
+        """
+        サーバーを集計から除く（退出・利用不可時）
+        """
+        with self._lock:
+            self._apply(guild_id, None)
+
+    def reconcile(self, guilds: Iterable[discord.Guild]) -> int:
+        """
+        キャッシュ全体から数え直し、差分で保持していた値とのずれ（メンバー数の差）を返す
+        """
+        entries = {
+            guild.id: self._entry(guild) for guild in guilds if not guild.unavailable
+        }
+        with self._lock:
+            before = self.members
+            for guild_id in list(self._guilds):
+                if guild_id not in entries:
+                    self._apply(guild_id, None)
+            for guild_id, entry in entries.items():
+                if self._guilds.get(guild_id) != entry:
+                    self._apply(guild_id, entry)
+            return self.members - before
+
+    def sample(self, memory_mb: Optional[float] = None) -> StatsSample:
+        """
+        現在値を時系列に記録し、メトリクスのゲージを更新する
+        """
+        if memory_mb is not None:
+            self.memory_mb = memory_mb
+        with self._lock:
+            current = StatsSample(
+                timestamp=time.time(),
+                guilds=self.guilds,
+                members=self.members,
+                channels=self.channels,
+                shards=len(self._shards),
+                memory_mb=self.memory_mb,
+            )
+            shards = {
+                shard_id: list(values) for shard_id, values in self._shards.items()
+            }
+            self.history.append(current)
+        metrics.set_gauge("bot_guilds", current.guilds)
+        metrics.set_gauge("bot_members", current.members)
+        metrics.set_gauge("bot_channels", current.channels)
+        for shard_id, (guilds, members, _) in shards.items():
+            metrics.set_gauge("bot_shard_guilds", guilds, shard=shard_id)
+            metrics.set_gauge("bot_shard_members", members, shard=shard_id)
+        if current.memory_mb is not None:
+            metrics.set_gauge("process_memory_mb", current.memory_mb)
+        return current
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        現在値とシャードごとの内訳を取得
+        """
+        with self._lock:
+            return {
+                "guilds": self.guilds,
+                "members": self.members,
+                "channels": self.channels,
+                "shards": {
+                    shard_id: {"guilds": g, "members": m, "channels": c}
+                    for shard_id, (g, m, c) in sorted(self._shards.items())
+                },
+                "memory_mb": self.memory_mb,
+            }
+
+    def since(self, seconds: float) -> Optional[StatsSample]:
+        """
+        指定秒数前に最も近い記録を取得（記録がなければNone）
+        """
+        if not self.history:
+            return None
+        cutoff = time.time() - seconds
+        for sample in self.history:
+            if sample.timestamp >= cutoff:
+                return sample
+        return self.history[-1]
+
+    def series(self) -> List[Dict[str, object]]:
+        return [asdict(sample) for sample in self.history]
+
+
+bot_stats = BotStats(history_size=settings.STATS_HISTORY_SIZE)
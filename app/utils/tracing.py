@@ -0,0 +1,290 @@
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+from core import get_settings
+from utils.metrics import metrics
+
+settings = get_settings()
+
+_ids = itertools.count(1)
+
+
+class Span:
+    """
+    処理区間（kind: command / listener / sql / redis / rest など）
+    """
+
+    __slots__ = (
+        "name",
+        "kind",
+        "span_id",
+        "parent_id",
+        "start",
+        "end",
+        "thread",
+        "attrs",
+    )
+
+    def __init__(
+        self, name: str, kind: str, parent_id: Optional[int], attrs: Dict[str, Any]
+    ):
+        self.name = name
+        self.kind = kind
+        self.span_id = next(_ids)
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.thread = threading.get_ident()
+        self.attrs = attrs
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+
+class Trace:
+    """
+    1回のコマンド・リスナー実行に含まれるスパンの集まり
+    """
+
+    __slots__ = ("trace_id", "root", "spans", "started_at", "dropped")
+
+    def __init__(self, root: Span):
+        self.trace_id = root.span_id
+        self.root = root
+        self.spans: List[Span] = [root]
+        self.started_at = time.time()
+        self.dropped = 0
+
+    @property
+    def name(self) -> str:
+        return self.root.name
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms
+
+    def breakdown(self) -> Dict[str, float]:
+        """
+        種類ごとの合計時間（ミリ秒）
+        """
+        totals: Dict[str, float] = {}
+        for span in self.spans[1:]:
+            totals[span.kind] = totals.get(span.kind, 0.0) + span.duration_ms
+        return totals
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+def _active_trace() -> Optional[Trace]:
+    # トレース中に作られたタスク（ワーカー等）は終了後のトレースを引き継いでいるため除外する
+    trace = _current_trace.get()
+    if trace is None or trace.root.end is not None:
+        return None
+    return trace
+
+
+class _NoopScope:
+    """
+    サンプリングされていない場合のスコープ（何もしない）
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        return False
+
+
+_NOOP = _NoopScope()
+
+
+class _SpanScope:
+    __slots__ = ("tracer", "span", "token")
+
+    def __init__(self, tracer: "Tracer", span: Span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        _current_span.reset(self.token)
+        self.tracer.finish_span(
+            self.span, error=exc_type.__name__ if exc_type is not None else None
+        )
+        return False
+
+
+class _TraceScope(_SpanScope):
+    __slots__ = ("trace", "trace_token")
+
+    def __init__(self, tracer: "Tracer", trace: Trace):
+        super().__init__(tracer, trace.root)
+        self.trace = trace
+
+    def __enter__(self) -> Span:
+        self.trace_token = _current_trace.set(self.trace)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        super().__exit__(exc_type, exc_value, traceback)
+        _current_trace.reset(self.trace_token)
+        self.tracer._complete(self.trace)
+        return False
+
+
+class Tracer:
+    """
+    外部のコレクターを使わないプロセス内トレース
+    コマンド・リスナーの実行をルートに、SQL・Redis・REST呼び出しを子スパンとして記録し、
+    slow_ms以上かかったトレースを直近buffer_size件保持する（Chrome trace形式で出力可能）
+    サンプリングされていない場合、span() はコンテキスト変数の参照のみで何もしない
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        slow_ms: float = 500.0,
+        buffer_size: int = 50,
+        max_spans: int = 500,
+    ):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.max_spans = max_spans
+        self._slow: Deque[Trace] = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def active(self) -> bool:
+        """
+        現在のコンテキストがトレース中か（スパン名の計算を省くために使う）
+        """
+        return _active_trace() is not None
+
+    def trace(self, name: str, kind: str = "internal", **attrs: Any):
+        """
+        ルートスパンを開始するコンテキストマネージャ
+        既にトレース中の場合は子スパンになる
+        """
+        if _active_trace() is not None:
+            return self.span(name, kind, **attrs)
+        if not self.enabled or random.random() >= self.sample_rate:  # nosec B311
+            return _NOOP
+        return _TraceScope(self, Trace(Span(name, kind, None, attrs)))
+
+    def span(self, name: str, kind: str = "internal", **attrs: Any):
+        """
+        子スパンを開始するコンテキストマネージャ（トレース中でなければ何もしない）
+        """
+        span = self.start_span(name, kind, **attrs)
+        if span is None:
+            return _NOOP
+        return _SpanScope(self, span)
+
+    def start_span(
+        self, name: str, kind: str = "internal", **attrs: Any
+    ) -> Optional[Span]:
+        """
+        開始と終了が別のコールバックになるフック用（finish_span で終了する）
+        現在のスパンは変更しない
+        """
+        trace = _active_trace()
+        if trace is None:
+            return None
+        if len(trace.spans) >= self.max_spans:
+            trace.dropped += 1
+            return None
+        parent = _current_span.get()
+        span = Span(name, kind, parent.span_id if parent else None, attrs)
+        trace.spans.append(span)
+        return span
+
+    def finish_span(self, span: Optional[Span], **attrs: Any) -> None:
+        if span is None:
+            return
+        span.end = time.perf_counter()
+        for key, value in attrs.items():
+            if value is not None:
+                span.attrs[key] = value
+
+    def _complete(self, trace: Trace) -> None:
+        duration_ms = trace.duration_ms
+        metrics.inc("traces_total", kind=trace.root.kind)
+        if duration_ms < self.slow_ms:
+            return
+        metrics.inc("traces_slow_total", kind=trace.root.kind)
+        with self._lock:
+            self._slow.append(trace)
+
+    def recent(self, limit: Optional[int] = None) -> List[Trace]:
+        """
+        直近の遅いトレース（新しい順）
+        """
+        with self._lock:
+            traces = list(reversed(self._slow))
+        return traces[:limit] if limit is not None else traces
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slow.clear()
+
+    def export_chrome(self, traces: List[Trace]) -> Dict[str, Any]:
+        """
+        Chrome trace形式（chrome://tracing / Perfetto で開ける）に変換
+        トレースごとに1プロセス、スレッドごとに1行として表示される
+        """
+        events: List[Dict[str, Any]] = []
+        for pid, trace in enumerate(traces, start=1):
+            origin = trace.started_at * 1_000_000 - trace.root.start * 1_000_000
+            events.append(
+                {
+                    "name": "process_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "args": {"name": f"{trace.name} ({trace.duration_ms:.0f} ms)"},
+                }
+            )
+            for span in trace.spans:
+                end = span.end if span.end is not None else trace.root.end
+                events.append(
+                    {
+                        "name": span.name,
+                        "cat": span.kind,
+                        "ph": "X",
+                        "ts": origin + span.start * 1_000_000,
+                        "dur": ((end or span.start) - span.start) * 1_000_000,
+                        "pid": pid,
+                        "tid": span.thread,
+                        "args": {
+                            key: value
+                            if isinstance(value, (int, float, bool))
+                            else str(value)
+                            for key, value in span.attrs.items()
+                        },
+                    }
+                )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+tracer = Tracer(
+    sample_rate=settings.TRACE_SAMPLE_RATE,
+    slow_ms=settings.TRACE_SLOW_MS,
+    buffer_size=settings.TRACE_BUFFER_SIZE,
+    max_spans=settings.TRACE_MAX_SPANS,
+)
@@ -0,0 +1,49 @@
+"""create items table
+
+Revision ID: 3f1c2a9b7d10
+Revises:
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a9b7d10"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "items",
+        sa.Column("title", sa.String(length=100), nullable=False),
+        sa.Column("description", sa.String(length=255), nullable=True),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_items_owner_id"), "items", ["owner_id"], unique=False)
+    op.create_index(op.f("ix_items_title"), "items", ["title"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_items_title"), table_name="items")
+    op.drop_index(op.f("ix_items_owner_id"), table_name="items")
+    op.drop_table("items")
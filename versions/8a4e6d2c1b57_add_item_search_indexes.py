@@ -0,0 +1,48 @@
+"""add item search indexes
+
+Revision ID: 8a4e6d2c1b57
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8a4e6d2c1b57"
+down_revision: Union[str, None] = "3f1c2a9b7d10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # 大きなテーブルで書き込みをブロックしないようCONCURRENTLYで作成する
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_title_trgm "
+            "ON items USING gin (title gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_title_fts "
+            "ON items USING gin (to_tsvector('simple', title))"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_title_prefix "
+            'ON items ((lower(title) COLLATE "C"))'
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_owner_title_prefix "
+            'ON items (owner_id, (lower(title) COLLATE "C"))'
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_items_owner_title_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_items_title_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_items_title_fts")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_items_title_trgm")
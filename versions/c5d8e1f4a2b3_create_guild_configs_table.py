@@ -0,0 +1,62 @@
+"""create guild_configs table
+
+Revision ID: c5d8e1f4a2b3
+Revises: 8a4e6d2c1b57
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d8e1f4a2b3"
+down_revision: Union[str, None] = "8a4e6d2c1b57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "guild_configs",
+        sa.Column("guild_id", sa.BigInteger(), nullable=False),
+        sa.Column("prefix", sa.String(length=10), nullable=True),
+        sa.Column(
+            "locale",
+            sa.String(length=10),
+            server_default=sa.text("'ja'"),
+            nullable=False,
+        ),
+        sa.Column("log_channel_id", sa.BigInteger(), nullable=True),
+        sa.Column(
+            "settings",
+            postgresql.JSONB(astext_type=sa.Text()),
+            server_default=sa.text("'{}'"),
+            nullable=False,
+        ),
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_guild_configs_guild_id"), "guild_configs", ["guild_id"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_guild_configs_guild_id"), table_name="guild_configs")
+    op.drop_table("guild_configs")
@@ -0,0 +1,116 @@
+"""add item owner counts
+
+Revision ID: d7a3f9b2e614
+Revises: c5d8e1f4a2b3
+Create Date: 2026-10-19 11:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d7a3f9b2e614"
+down_revision: Union[str, None] = "c5d8e1f4a2b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 文ごとに変更行の差分を所有者単位で集計して反映する
+# 一括INSERT・executemanyのUPDATE/DELETEでも1文につき1回の更新で済む
+# 複数の所有者を更新する際のデッドロックを避けるためowner_id順に更新する
+APPLY_FUNCTION = """
+CREATE OR REPLACE FUNCTION item_owner_counts_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- 遷移テーブルはトリガーの種類ごとに存在するものだけを参照する
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM item_owner_counts;
+    ELSIF TG_OP = 'INSERT' THEN
+        INSERT INTO item_owner_counts AS c (owner_id, item_count)
+        SELECT owner_id, count(*) FROM new_items
+        GROUP BY owner_id ORDER BY owner_id
+        ON CONFLICT (owner_id)
+        DO UPDATE SET item_count = c.item_count + EXCLUDED.item_count;
+    ELSE
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO item_owner_counts AS c (owner_id, item_count)
+            SELECT owner_id, -count(*) FROM old_items
+            GROUP BY owner_id ORDER BY owner_id
+            ON CONFLICT (owner_id)
+            DO UPDATE SET item_count = c.item_count + EXCLUDED.item_count;
+        ELSE
+            INSERT INTO item_owner_counts AS c (owner_id, item_count)
+            SELECT owner_id, sum(delta) FROM (
+                SELECT owner_id, 1 AS delta FROM new_items
+                UNION ALL
+                SELECT owner_id, -1 AS delta FROM old_items
+            ) changes
+            GROUP BY owner_id HAVING sum(delta) <> 0 ORDER BY owner_id
+            ON CONFLICT (owner_id)
+            DO UPDATE SET item_count = c.item_count + EXCLUDED.item_count;
+        END IF;
+        -- 件数が減るのはold_itemsに含まれる所有者のみ
+        DELETE FROM item_owner_counts
+        WHERE item_count <= 0
+          AND owner_id IN (SELECT owner_id FROM old_items);
+    END IF;
+    RETURN NULL;
+END;
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "item_owner_counts",
+        sa.Column("owner_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("item_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("owner_id"),
+    )
+    op.create_index(
+        "ix_item_owner_counts_rank",
+        "item_owner_counts",
+        [sa.text("item_count DESC"), "owner_id"],
+        unique=False,
+    )
+
+    # 集計中に書き込まれた行を取りこぼさないよう、トリガー作成と集計の間は書き込みを止める
+    op.execute("LOCK TABLE items IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(APPLY_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER items_owner_counts_insert AFTER INSERT ON items "
+        "REFERENCING NEW TABLE AS new_items "
+        "FOR EACH STATEMENT EXECUTE FUNCTION item_owner_counts_apply()"
+    )
+    # 遷移テーブルは列指定（UPDATE OF owner_id）と併用できないため全てのUPDATEで発火する
+    # 所有者が変わらない行は差分が0になり、集計テーブルは更新されない
+    op.execute(
+        "CREATE TRIGGER items_owner_counts_update AFTER UPDATE ON items "
+        "REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items "
+        "FOR EACH STATEMENT EXECUTE FUNCTION item_owner_counts_apply()"
+    )
+    op.execute(
+        "CREATE TRIGGER items_owner_counts_delete AFTER DELETE ON items "
+        "REFERENCING OLD TABLE AS old_items "
+        "FOR EACH STATEMENT EXECUTE FUNCTION item_owner_counts_apply()"
+    )
+    op.execute(
+        "CREATE TRIGGER items_owner_counts_truncate AFTER TRUNCATE ON items "
+        "FOR EACH STATEMENT EXECUTE FUNCTION item_owner_counts_apply()"
+    )
+    op.execute(
+        "INSERT INTO item_owner_counts (owner_id, item_count) "
+        "SELECT owner_id, count(*) FROM items GROUP BY owner_id"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS items_owner_counts_truncate ON items")
+    op.execute("DROP TRIGGER IF EXISTS items_owner_counts_delete ON items")
+    op.execute("DROP TRIGGER IF EXISTS items_owner_counts_update ON items")
+    op.execute("DROP TRIGGER IF EXISTS items_owner_counts_insert ON items")
+    op.execute("DROP FUNCTION IF EXISTS item_owner_counts_apply()")
+    op.drop_index("ix_item_owner_counts_rank", table_name="item_owner_counts")
+    op.drop_table("item_owner_counts")
@@ -0,0 +1,98 @@
+"""add table change notify triggers
+
+Revision ID: e2b6c4d8f031
+Revises: d7a3f9b2e614
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b6c4d8f031"
+down_revision: Union[str, None] = "d7a3f9b2e614"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 変更された行のIDと、トリガー引数で指定した列の値を table_changes チャンネルに通知する
+# UPDATEでは変更前の値も old に含める
+# 通知はコミット時に送られ、ロールバックされた変更は通知されない
+NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION notify_table_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    rec jsonb;
+    old_rec jsonb;
+    payload jsonb;
+    col text;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := to_jsonb(OLD);
+    ELSE
+        rec := to_jsonb(NEW);
+    END IF;
+    payload := jsonb_build_object(
+        'table', TG_TABLE_NAME, 'op', TG_OP, 'id', rec -> 'id'
+    );
+    FOREACH col IN ARRAY TG_ARGV LOOP
+        payload := payload || jsonb_build_object(col, rec -> col);
+    END LOOP;
+    IF TG_OP = 'UPDATE' THEN
+        old_rec := to_jsonb(OLD);
+        payload := payload || jsonb_build_object('old', '{}'::jsonb);
+        FOREACH col IN ARRAY TG_ARGV LOOP
+            payload := jsonb_set(
+                payload, ARRAY['old', col], COALESCE(old_rec -> col, 'null')
+            );
+        END LOOP;
+    END IF;
+    PERFORM pg_notify('table_changes', payload::text);
+    RETURN NULL;
+END;
+$$
+"""
+
+# (テーブル, 通知に含める列, UPDATEは通知に含める列が変わった場合のみ通知するか)
+# NOTIFYを含むトランザクションはコミット時にグローバルなロックを取るため、
+# 書き込みバッファなどで頻繁に更新されるテーブルでは購読側が必要とする変更に絞る
+TABLES = (
+    ("items", ("owner_id",), True),
+    # updated_at は自プロセスの更新による通知を見分けるために使う
+    ("guild_configs", ("guild_id", "updated_at"), False),
+)
+
+
+def upgrade() -> None:
+    op.execute(NOTIFY_FUNCTION)
+    for table, columns, changed_only in TABLES:
+        args = ", ".join(f"'{column}'" for column in columns)
+        if not changed_only:
+            op.execute(
+                f"CREATE TRIGGER {table}_notify_change "
+                f"AFTER INSERT OR UPDATE OR DELETE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION notify_table_change({args})"
+            )
+            continue
+        op.execute(
+            f"CREATE TRIGGER {table}_notify_change "
+            f"AFTER INSERT OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION notify_table_change({args})"
+        )
+        changed = " OR ".join(
+            f"OLD.{column} IS DISTINCT FROM NEW.{column}" for column in columns
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_notify_update "
+            f"AFTER UPDATE OF {', '.join(columns)} ON {table} "
+            f"FOR EACH ROW WHEN ({changed}) "
+            f"EXECUTE FUNCTION notify_table_change({args})"
+        )
+
+
+def downgrade() -> None:
+    for table, _, _ in reversed(TABLES):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_update ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_change ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_table_change()")